@@ -0,0 +1,89 @@
+"""Module for sending analysis requests to a running `serve` process."""
+import http.client
+import json
+import os
+import socket
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+DEFAULT_SOCKET_PATH = os.getenv("ANALYSIS_SOCKET", "analysis.sock")
+TOKEN_ENV = "ANALYSIS_TOKEN"
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        """Initialize the connection; it is opened on the first request.
+
+        Args:
+            socket_path: Filesystem path of the server socket.
+            timeout: Socket timeout in seconds.
+        """
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+class ServerBusy(Exception):
+    """Raised when the server kept rejecting a request as overloaded."""
+
+def analyze_remote(image_bytes: bytes, user_id: str, socket_path: Optional[str] = None, url: Optional[str] = None,
+                   timeout: float = 30.0, retries: int = 3, token: Optional[str] = None) -> Dict:
+    """Analyze an encoded image on the analysis server.
+
+    Overload responses (503), and connections the server broke off before
+    answering, are retried after the server's Retry-After delay (1 second
+    for broken connections), at most `retries` times.
+
+    Args:
+        image_bytes: Encoded image file contents (JPEG, PNG, ...).
+        user_id: Identifier of the user, recorded in the server's audit log.
+        socket_path: Server Unix socket; defaults to ANALYSIS_SOCKET.
+        url: Server base URL such as "http://127.0.0.1:8765"; overrides the socket.
+        timeout: Socket timeout in seconds.
+        retries: Attempts left after an overload response.
+        token: Shared secret required by TCP servers; defaults to ANALYSIS_TOKEN.
+
+    Returns:
+        Response with "faces" (count) and "matches" (records with distance).
+
+    Raises:
+        ServerBusy: If the server stayed overloaded.
+        RuntimeError: If the server rejected the request.
+    """
+    headers = {"Content-Type": "application/octet-stream", "X-User-Id": user_id}
+    token = token or os.getenv(TOKEN_ENV)
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    for attempt in range(retries + 1):
+        if url:
+            parts = urlsplit(url)
+            conn = http.client.HTTPConnection(parts.hostname or "127.0.0.1", parts.port or 80, timeout=timeout)
+        else:
+            conn = UnixHTTPConnection(socket_path or DEFAULT_SOCKET_PATH, timeout=timeout)
+        try:
+            conn.request("POST", "/analyze", body=image_bytes, headers=headers)
+            response = conn.getresponse()
+            payload = json.loads(response.read() or b"{}")
+        except (BrokenPipeError, ConnectionResetError) as e:
+            # خادم مُثقل قد يغلق الاتصال قبل قراءة الجسم كاملاً
+            if attempt < retries:
+                time.sleep(1)
+                continue
+            raise ServerBusy(f"Server closed the connection: {e}")
+        finally:
+            conn.close()
+        if response.status == 200:
+            return payload
+        if response.status == 503 and attempt < retries:
+            time.sleep(float(response.getheader("Retry-After", 1)))
+            continue
+        if response.status == 503:
+            raise ServerBusy(payload.get("error", "Server overloaded"))
+        raise RuntimeError(payload.get("error", f"HTTP {response.status}"))
+    raise ServerBusy("Server overloaded")
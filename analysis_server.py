@@ -0,0 +1,333 @@
+"""Module for serving image analysis to local clients from a warm process."""
+import hmac
+import json
+import os
+import queue
+import signal
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+import cv2
+import numpy as np
+from analysis_client import DEFAULT_SOCKET_PATH, TOKEN_ENV
+from audit_log import log_audit
+from detector_registry import IMAGE_DETECTOR_CONFIG, warm_up
+from image_processor import detect_faces_batch, identify_faces_batch
+from logging_config import get_logger
+from metrics import QUEUE_DEPTH, SERVE_REQUESTS, STAGE_SECONDS
+from typing import Dict, List, Optional, Tuple
+
+logger = get_logger()
+
+RECORD_FIELDS = ("name", "age", "nationality", "crime", "danger_level")
+DEFAULT_SERVE_BATCH_SIZE = int(os.getenv("SERVE_MAX_BATCH", 8))
+DEFAULT_SERVE_WAIT_MS = int(os.getenv("SERVE_MAX_WAIT_MS", 10))
+DEFAULT_SERVE_QUEUE_SIZE = int(os.getenv("SERVE_QUEUE_SIZE", 64))
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv("SERVE_REQUEST_TIMEOUT", 30))
+MAX_IMAGE_BYTES = int(os.getenv("SERVE_MAX_IMAGE_BYTES", 32 * 1024 * 1024))
+DRAIN_CHUNK_BYTES = 64 * 1024
+
+class Overloaded(Exception):
+    """Raised when the request queue is full."""
+
+class AnalysisBatcher:
+    """Single analysis thread grouping concurrent requests into micro-batches.
+
+    Requests wait in a bounded queue; a batch is closed after
+    `max_batch_size` images or `max_wait_ms` after its first one. Faces of
+    the whole batch are matched in one watchlist query. A full queue rejects
+    new requests immediately instead of letting latency grow.
+    """
+
+    def __init__(self, offline_mode: bool, max_batch_size: int = DEFAULT_SERVE_BATCH_SIZE,
+                 max_wait_ms: int = DEFAULT_SERVE_WAIT_MS, max_queue: int = DEFAULT_SERVE_QUEUE_SIZE):
+        """Start the analysis thread.
+
+        Args:
+            offline_mode: Whether to use offline database.
+            max_batch_size: Maximum images per batch.
+            max_wait_ms: Maximum time to fill a batch after its first image.
+            max_queue: Maximum queued requests before rejecting new ones.
+        """
+        self.offline_mode = offline_mode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Optional[Tuple[np.ndarray, Future]]]" = queue.Queue(maxsize=max(1, max_queue))
+        self._stats = {"batches": 0, "images": 0, "rejected": 0}
+        self._closed = False
+        self._detector = warm_up(*IMAGE_DETECTOR_CONFIG)
+        QUEUE_DEPTH.set_function(self._queue.qsize, queue="serve_requests")
+        self._thread = threading.Thread(target=self._run, name="AnalysisBatcher", daemon=True)
+        self._thread.start()
+
+    def saturated(self) -> bool:
+        """Whether new requests would currently be rejected."""
+        return self._queue.full()
+
+    def submit(self, image: np.ndarray) -> Future:
+        """Queue an image for analysis.
+
+        Args:
+            image: BGR image.
+
+        Returns:
+            Future resolving to the image's [(record, distance), ...] matches
+            and its face count.
+
+        Raises:
+            Overloaded: If the queue is full.
+        """
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((image, future))
+        except queue.Full:
+            self._stats["rejected"] += 1
+            raise Overloaded("Analysis queue is full")
+        return future
+
+    def _collect(self) -> List[Tuple[np.ndarray, Future]]:
+        """Gather the next batch, skipping requests whose client gave up."""
+        item = self._queue.get()
+        if item is None:
+            return []
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+
+    def _run(self) -> None:
+        """Analyze batches until closed."""
+        while True:
+            batch = self._collect()
+            if not batch and self._closed and self._queue.empty():
+                return
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                images = [image for image, _ in batch]
+                locations = detect_faces_batch(self._detector, images)
+                matches = identify_faces_batch(list(zip(images, locations)), self.offline_mode)
+                for (_, future), image_locations, image_matches in zip(batch, locations, matches):
+                    future.set_result(([m for m in image_matches if m], len(image_locations)))
+            except Exception as e:
+                logger.error("Analysis batch failed: %s", e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self._stats["batches"] += 1
+            self._stats["images"] += len(batch)
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage="serve_batch")
+
+    def stats(self) -> Dict:
+        """Batch counts, mean batch size and current queue depth."""
+        stats = dict(self._stats, queued=self._queue.qsize())
+        stats["mean_batch"] = round(stats["images"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Finish queued requests and stop the analysis thread."""
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        QUEUE_DEPTH.set_function(None, queue="serve_requests")
+
+class _AnalysisHandler(BaseHTTPRequestHandler):
+    """POST /analyze with an encoded image body; GET /health for statistics."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reject(self, status: int, result: str, error: str, headers: Optional[Dict[str, str]] = None) -> None:
+        SERVE_REQUESTS.inc(result=result)
+        self.close_connection = True
+        self._send_json(status, {"error": error}, dict(headers or {}, Connection="close"))
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/health":
+            self._send_json(404, {"error": "Not found"})
+            return
+        self._send_json(200, {"status": "ok", **self.server.batcher.stats()})
+
+    def _peer_identity(self) -> str:
+        """Verified caller for the audit log: the peer uid on Unix sockets, the token holder's address over TCP."""
+        kind, detail = self.client_address[:2]
+        if kind == "unix":
+            return f"uid:{detail}" if detail is not None else "uid:unknown"
+        return f"token@{kind}"
+
+    def _authorized(self) -> bool:
+        """Check the bearer token on servers that require one (TCP); Unix sockets rely on file permissions."""
+        token = self.server.token
+        if token is None:
+            return True
+        scheme, _, supplied = (self.headers.get("Authorization") or "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(supplied.strip().encode(), token.encode())
+
+    def _discard_body(self, length: int) -> None:
+        """Read and drop a request body so the client sees the response instead of a broken pipe."""
+        while length > 0:
+            chunk = self.rfile.read(min(length, DRAIN_CHUNK_BYTES))
+            if not chunk:
+                return
+            length -= len(chunk)
+
+    def do_POST(self) -> None:
+        if self.path.split("?")[0] != "/analyze":
+            self._reject(404, "rejected", "Not found")
+            return
+        batcher: AnalysisBatcher = self.server.batcher
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self._reject(400, "rejected", "Invalid Content-Length")
+            return
+        if not 0 < length <= MAX_IMAGE_BYTES:
+            self._reject(413 if length > 0 else 400, "rejected", "Missing or oversized image")
+            return
+        if not self._authorized():
+            self._discard_body(length)
+            self._reject(401, "unauthorized", "Missing or invalid token", {"WWW-Authenticate": "Bearer"})
+            return
+        # الرفض دون فك ترميز الصورة أو إدراجها، لكن بعد استهلاك الجسم حتى يصل 503 إلى العميل
+        if batcher.saturated():
+            self._discard_body(length)
+            self._reject(503, "overloaded", "Server overloaded", {"Retry-After": "1"})
+            return
+        data = self.rfile.read(length)
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            self._reject(400, "rejected", "Invalid image")
+            return
+        claimed_user = self.headers.get("X-User-Id", "unknown")
+        start = time.perf_counter()
+        try:
+            future = batcher.submit(image)
+        except Overloaded:
+            self._reject(503, "overloaded", "Server overloaded", {"Retry-After": "1"})
+            return
+        try:
+            matches, faces = future.result(timeout=self.server.request_timeout)
+        except FutureTimeout:
+            future.cancel()
+            self._reject(504, "timeout", "Analysis timed out")
+            return
+        except Exception as e:
+            self._reject(500, "error", str(e))
+            return
+        SERVE_REQUESTS.inc(result="ok")
+        # المستخدم المُعلن من العميل غير موثّق، فيُسجَّل في التفاصيل لا كهوية
+        log_audit("serve_analyze", self._peer_identity(),
+                  f"Claimed user (unverified): {claimed_user}, faces: {faces}, matches: {len(matches)}")
+        self._send_json(200, {"faces": faces,
+                              "matches": [dict(zip(RECORD_FIELDS, record), distance=round(distance, 4))
+                                          for record, distance in matches],
+                              "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)})
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+class _TCPHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server on a TCP port with a deep accept backlog."""
+
+    request_queue_size = 128
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """Threaded HTTP server on a Unix domain socket."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", _peer_uid(request))
+
+def _peer_uid(sock: socket.socket) -> Optional[int]:
+    """Uid of the process at the other end of a Unix socket (SO_PEERCRED), or None where unsupported."""
+    try:
+        credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    except (AttributeError, OSError):
+        return None
+    _, uid, _ = struct.unpack("3i", credentials)
+    return uid
+
+def serve(offline_mode: bool, socket_path: Optional[str] = None, port: Optional[int] = None,
+          host: str = "127.0.0.1", max_batch_size: int = DEFAULT_SERVE_BATCH_SIZE,
+          max_wait_ms: int = DEFAULT_SERVE_WAIT_MS, max_queue: int = DEFAULT_SERVE_QUEUE_SIZE,
+          request_timeout: float = DEFAULT_REQUEST_TIMEOUT) -> None:
+    """Serve analysis requests until interrupted or sent SIGTERM.
+
+    Listens on a Unix socket readable only by the current user, or on a
+    localhost TCP port when `port` is given. Over TCP any local user could
+    connect, so every /analyze request must carry the ANALYSIS_TOKEN shared
+    secret as a bearer token.
+
+    Args:
+        offline_mode: Whether to use offline database.
+        socket_path: Unix socket path; defaults to ANALYSIS_SOCKET.
+        port: TCP port to listen on instead of the socket.
+        host: TCP bind address.
+        max_batch_size: Maximum images per batch.
+        max_wait_ms: Maximum time to fill a batch after its first image.
+        max_queue: Maximum queued requests before answering 503.
+        request_timeout: Seconds a request may wait for its result.
+
+    Raises:
+        ValueError: If `port` is given and ANALYSIS_TOKEN is not set.
+    """
+    token = None
+    if port is not None:
+        token = os.getenv(TOKEN_ENV)
+        if not token:
+            raise ValueError(f"{TOKEN_ENV} must be set to serve over TCP")
+    batcher = AnalysisBatcher(offline_mode, max_batch_size, max_wait_ms, max_queue)
+    if port is not None:
+        server = _TCPHTTPServer((host, port), _AnalysisHandler)
+        address = f"http://{host}:{server.server_port}"
+    else:
+        socket_path = socket_path or DEFAULT_SOCKET_PATH
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, _AnalysisHandler)
+        os.chmod(socket_path, 0o600)
+        address = f"unix:{socket_path}"
+    server.batcher = batcher
+    server.token = token
+    server.request_timeout = request_timeout
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logger.info(f"Analysis server listening on {address}")
+    print(f"Serving analysis on {address} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        if port is None and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logger.info(f"Analysis server stopped: {batcher.stats()}")
@@ -1,10 +1,341 @@
 """Module for secure audit logging."""
+import atexit
+import base64
+import glob
+import os
+import queue
+import re
 import sqlite3
-from datetime import datetime
-from encryption import encrypt_data
-from logging_config import configure_logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from encryption import decrypt_many, encrypt_many
+from logging_config import get_logger
+from metrics import QUEUE_DEPTH, STAGE_SECONDS
+from typing import Dict, Iterator, List, Optional, Tuple
 
-logger = configure_logging()
+logger = get_logger()
+
+DURABILITY_MODES = ("event", "group")
+PARTITION_MODES = ("month", "day")
+_FLUSH = "flush"
+
+DEFAULT_AUDIT_DIR = os.getenv("AUDIT_DIR", "audit_log")
+DEFAULT_AUDIT_PARTITION = os.getenv("AUDIT_PARTITION", "month").lower()
+DEFAULT_AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", 0))
+
+_PARTITION_FILE = re.compile(r"^audit-(\d{4}-\d{2}(?:-\d{2})?)\.db$")
+
+AUDIT_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS audit (
+        id INTEGER PRIMARY KEY,
+        ts INTEGER NOT NULL,
+        action TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        details BLOB NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS audit_ts ON audit (ts);
+    CREATE INDEX IF NOT EXISTS audit_user_ts ON audit (user_id, ts);
+    CREATE INDEX IF NOT EXISTS audit_action_ts ON audit (action, ts);
+"""
+
+def _partition_bounds(key: str) -> Tuple[int, int]:
+    """UTC start and end, in microseconds since the epoch, of a "YYYY-MM" or "YYYY-MM-DD" partition."""
+    parts = [int(p) for p in key.split("-")]
+    start = datetime(parts[0], parts[1], parts[2] if len(parts) == 3 else 1, tzinfo=timezone.utc)
+    if len(parts) == 3:
+        end = start + timedelta(days=1)
+    else:
+        end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp() * 1_000_000), int(end.timestamp() * 1_000_000)
+
+class AuditStore:
+    """Audit events in one SQLite file per UTC month or day.
+
+    Every partition has an integer primary key and indexes on the event time
+    (microseconds since the epoch, UTC), on (user_id, time) and on
+    (action, time), so range, user and action queries only touch the
+    matching partitions and rows. Details are stored as raw AES-GCM blobs.
+    Retention deletes whole partition files once their period has ended
+    more than `retention_days` ago.
+    """
+
+    def __init__(self, root: str = DEFAULT_AUDIT_DIR, partition: str = DEFAULT_AUDIT_PARTITION,
+                 retention_days: int = DEFAULT_AUDIT_RETENTION_DAYS):
+        """Initialize the store, creating its directory.
+
+        Args:
+            root: Directory holding the partition files.
+            partition: "month" or "day" for new partitions.
+            retention_days: Days to keep ended partitions; 0 keeps them forever.
+        """
+        if partition not in PARTITION_MODES:
+            raise ValueError(f"Invalid audit partition mode: {partition}")
+        self.root = root
+        self.partition = partition
+        self.retention_days = retention_days
+        os.makedirs(root, exist_ok=True)
+
+    def partition_key(self, ts: int) -> str:
+        """Partition of an event time in microseconds since the epoch."""
+        moment = datetime.fromtimestamp(ts / 1_000_000, tz=timezone.utc)
+        return moment.strftime("%Y-%m-%d" if self.partition == "day" else "%Y-%m")
+
+    def path(self, key: str) -> str:
+        """File of a partition."""
+        return os.path.join(self.root, f"audit-{key}.db")
+
+    def partitions(self) -> List[Tuple[str, int, int]]:
+        """Existing partitions, oldest first.
+
+        Returns:
+            List of (key, start, end) with bounds in microseconds since the epoch.
+        """
+        keys = []
+        for path in glob.glob(os.path.join(self.root, "audit-*.db")):
+            match = _PARTITION_FILE.match(os.path.basename(path))
+            if match:
+                keys.append((match.group(1), *_partition_bounds(match.group(1))))
+        return sorted(keys, key=lambda p: (p[1], p[2]))
+
+    def connect(self, key: str) -> sqlite3.Connection:
+        """Open a partition for writing, creating its schema."""
+        conn = sqlite3.connect(self.path(key), timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(AUDIT_SCHEMA)
+        return conn
+
+    def insert(self, conn: sqlite3.Connection, rows: List[Tuple[int, str, str, bytes]]) -> None:
+        """Insert (ts, action, user_id, encrypted details) rows in one transaction."""
+        with conn:
+            conn.executemany("INSERT INTO audit (ts, action, user_id, details) VALUES (?, ?, ?, ?)", rows)
+
+    def apply_retention(self, now: Optional[int] = None) -> List[str]:
+        """Delete partitions that ended more than `retention_days` ago.
+
+        Args:
+            now: Current time in microseconds since the epoch.
+
+        Returns:
+            Keys of the deleted partitions.
+        """
+        if self.retention_days <= 0:
+            return []
+        now = time.time_ns() // 1000 if now is None else now
+        cutoff = now - self.retention_days * 86_400_000_000
+        removed = []
+        for key, _, end in self.partitions():
+            if end > cutoff:
+                continue
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self.path(key) + suffix)
+                except FileNotFoundError:
+                    pass
+            removed.append(key)
+        if removed:
+            logger.info(f"Audit retention removed partitions: {', '.join(removed)}")
+        return removed
+
+    def query(self, since: Optional[int] = None, until: Optional[int] = None, user_id: Optional[str] = None,
+              action: Optional[str] = None, batch_size: int = 1000) -> Iterator[List[Tuple[int, str, str, bytes]]]:
+        """Stream matching rows in time order, in batches.
+
+        Args:
+            since: Inclusive lower bound in microseconds since the epoch.
+            until: Exclusive upper bound in microseconds since the epoch.
+            user_id: Only events of this user.
+            action: Only events of this action.
+            batch_size: Rows per batch.
+
+        Yields:
+            Lists of (ts, action, user_id, encrypted details).
+        """
+        clauses, params = [], []
+        for clause, value in (("ts >= ?", since), ("ts < ?", until), ("user_id = ?", user_id), ("action = ?", action)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = "SELECT ts, action, user_id, details FROM audit"
+        sql += (" WHERE " + " AND ".join(clauses) if clauses else "") + " ORDER BY ts, id"
+        for key, start, end in self.partitions():
+            if (since is not None and end <= since) or (until is not None and start >= until):
+                continue
+            conn = sqlite3.connect(f"file:{self.path(key)}?mode=ro", uri=True, timeout=5)
+            try:
+                cursor = conn.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                conn.close()
+
+class AuditWriter:
+    """Background writer that group-commits audit events to SQLite.
+
+    Events are queued by `log` and written by one thread over persistent
+    connections to the current partitions of an AuditStore. In "group" mode
+    a transaction is committed every `batch_size` events or
+    `flush_interval_ms` milliseconds, whichever comes first. In "event" mode
+    every event is committed on its own and `log` returns only once it is
+    on disk.
+    """
+
+    def __init__(self, root: str = DEFAULT_AUDIT_DIR, durability: str = "group",
+                 batch_size: int = 100, flush_interval_ms: int = 200, max_queue: int = 10000,
+                 partition: str = DEFAULT_AUDIT_PARTITION, retention_days: int = DEFAULT_AUDIT_RETENTION_DAYS):
+        """Initialize the writer and start its background thread.
+
+        Args:
+            root: Directory of the audit partition files.
+            durability: "event" (commit per event) or "group" (group commit).
+            batch_size: Maximum events per transaction in group mode.
+            flush_interval_ms: Maximum delay before a partial batch is committed.
+            max_queue: Maximum queued events before `log` blocks.
+            partition: "month" or "day" partitions.
+            retention_days: Days to keep ended partitions; 0 keeps them forever.
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Invalid audit durability mode: {durability}")
+        self.store = AuditStore(root, partition, retention_days)
+        self.durability = durability
+        self.batch_size = 1 if durability == "event" else max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self.pid = os.getpid()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        # يحمي فحص الإغلاق والإدراج معاً حتى لا يُدرج حدث بعد علامة التوقف
+        self._state_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="AuditWriter", daemon=True)
+        self._thread.start()
+
+    def log(self, action: str, user_id: str, details: str) -> None:
+        """Queue an audit event.
+
+        Args:
+            action: Type of action (e.g., 'analyze_image').
+            user_id: Identifier of the user performing the action.
+            details: Details of the event.
+
+        Raises:
+            RuntimeError: If the writer is closed.
+        """
+        written = threading.Event() if self.durability == "event" else None
+        with self._state_lock:
+            if self._closed:
+                raise RuntimeError("Audit writer is closed")
+            self._queue.put((time.time_ns() // 1000, action, user_id, details, written))
+        if written:
+            written.wait()
+
+    def flush(self) -> None:
+        """Commit queued events now and block until they are on disk; no-op once closed."""
+        with self._state_lock:
+            if self._closed:
+                return
+            self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self) -> None:
+        """Flush pending events and stop the background thread."""
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self) -> list:
+        """Collect up to `batch_size` events, waiting at most `flush_interval` after the first.
+
+        A flush or stop marker ends the batch early.
+        """
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while isinstance(batch[-1], tuple) and len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=max(remaining, 0)) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, conns: Dict[str, sqlite3.Connection], events: list) -> None:
+        """Encrypt a batch of events and insert it into its partitions."""
+        encrypted = encrypt_many(event[3].encode() for event in events)
+        rows: Dict[str, list] = {}
+        for (ts, action, user_id, _, _), details in zip(events, encrypted):
+            rows.setdefault(self.store.partition_key(ts), []).append((ts, action, user_id, details))
+        for key, partition_rows in rows.items():
+            if key not in conns:
+                # انتقال إلى فترة جديدة: تُغلق الأقسام القديمة وتُطبَّق سياسة الاحتفاظ
+                for old in [k for k in conns if k < key]:
+                    conns.pop(old).close()
+                conns[key] = self.store.connect(key)
+                self.store.apply_retention()
+            with STAGE_SECONDS.time(stage="audit_commit"):
+                self.store.insert(conns[key], partition_rows)
+        logger.info("Audit logged: %d event(s)", len(events))
+
+    def _run(self) -> None:
+        """Background loop writing queued events until closed."""
+        conns: Dict[str, sqlite3.Connection] = {}
+        while True:
+            batch = self._next_batch()
+            events = [item for item in batch if isinstance(item, tuple)]
+            try:
+                if events:
+                    self._write(conns, events)
+            except Exception as e:
+                logger.error("Audit log error: %s", e)
+            finally:
+                for event in events:
+                    if event[4]:
+                        event[4].set()
+                for _ in batch:
+                    self._queue.task_done()
+            if None in batch:
+                break
+        for conn in conns.values():
+            conn.close()
+        self._release_leftovers()
+
+    def _release_leftovers(self) -> None:
+        """Wake any caller still waiting on an item queued after the stop marker."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, tuple) and item[4]:
+                item[4].set()
+            self._queue.task_done()
+
+_writer: Optional[AuditWriter] = None
+_writer_lock = threading.Lock()
+
+def get_audit_writer() -> AuditWriter:
+    """Get the process-wide audit writer, starting it on first use.
+
+    Settings come from AUDIT_DURABILITY ("event" or "group"), AUDIT_BATCH_SIZE,
+    AUDIT_FLUSH_MS, AUDIT_DIR, AUDIT_PARTITION ("month" or "day") and
+    AUDIT_RETENTION_DAYS. The writer is flushed and closed at interpreter exit.
+
+    Returns:
+        Shared AuditWriter instance.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.pid != os.getpid():
+            _writer = AuditWriter(durability=os.getenv("AUDIT_DURABILITY", "group").lower(),
+                                  batch_size=int(os.getenv("AUDIT_BATCH_SIZE", 100)),
+                                  flush_interval_ms=int(os.getenv("AUDIT_FLUSH_MS", 200)))
+            atexit.register(_writer.close)
+            QUEUE_DEPTH.set_function(_writer._queue.qsize, queue="audit")
+        return _writer
 
 def log_audit(action: str, user_id: str, details: str) -> None:
     """Log an audit event to a secure SQLite database.
@@ -15,21 +346,89 @@ def log_audit(action: str, user_id: str, details: str) -> None:
         details: Details of the event.
     """
     try:
-        conn = sqlite3.connect("audit_log.db", timeout=5)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS audit (
-                timestamp TEXT,
-                action TEXT,
-                user_id TEXT,
-                details TEXT
-            )
-        """)
-        encrypted_details = encrypt_data(details)
-        cursor.execute("INSERT INTO audit VALUES (?, ?, ?, ?)",
-                       (datetime.now().isoformat(), action, user_id, encrypted_details))
-        conn.commit()
-        conn.close()
-        logger.info(f"Audit logged: {action} by {user_id}")
+        with STAGE_SECONDS.time(stage="log_audit"):
+            get_audit_writer().log(action, user_id, details)
     except Exception as e:
-        logger.error(f"Audit log error: {e}")
\ No newline at end of file
+        logger.error("Audit log error: %s", e)
+
+def iter_audit_events(store: Optional[AuditStore] = None, since: Optional[float] = None,
+                      until: Optional[float] = None, user_id: Optional[str] = None, action: Optional[str] = None,
+                      batch_size: int = 1000) -> Iterator[Dict]:
+    """Stream decrypted audit events in time order.
+
+    Rows are read and decrypted `batch_size` at a time, so memory stays
+    bounded whatever the size of the log. A batch that fails to decrypt is
+    retried row by row and unreadable details are returned as None.
+
+    Args:
+        store: Audit store; defaults to the AUDIT_DIR one.
+        since: Inclusive lower bound, seconds since the epoch.
+        until: Exclusive upper bound, seconds since the epoch.
+        user_id: Only events of this user.
+        action: Only events of this action.
+        batch_size: Rows per read and decryption batch.
+
+    Yields:
+        Events with ISO timestamp, action, user_id and details.
+    """
+    store = store or AuditStore()
+    since_us = None if since is None else int(since * 1_000_000)
+    until_us = None if until is None else int(until * 1_000_000)
+    for rows in store.query(since_us, until_us, user_id, action, batch_size):
+        try:
+            details = [d.decode() for d in decrypt_many(row[3] for row in rows)]
+        except Exception:
+            details = []
+            for row in rows:
+                try:
+                    details.append(decrypt_many([row[3]])[0].decode())
+                except Exception:
+                    details.append(None)
+        for (ts, row_action, row_user, _), text in zip(rows, details):
+            yield {"timestamp": datetime.fromtimestamp(ts / 1_000_000, tz=timezone.utc).astimezone().isoformat(),
+                   "action": row_action, "user_id": row_user, "details": text}
+
+def import_legacy_audit(legacy_path: str, store: Optional[AuditStore] = None, batch_size: int = 1000) -> int:
+    """Copy events from the old single-table audit database into partitions.
+
+    Legacy timestamps are naive local-time ISO strings and details are
+    base64 text; both are converted, the ciphertext itself is kept.
+
+    Args:
+        legacy_path: Path to the old audit_log.db.
+        store: Destination store; defaults to the AUDIT_DIR one.
+        batch_size: Rows per transaction.
+
+    Returns:
+        Number of events imported.
+    """
+    store = store or AuditStore()
+    source = sqlite3.connect(f"file:{legacy_path}?mode=ro", uri=True)
+    conns: Dict[str, sqlite3.Connection] = {}
+    imported = 0
+    try:
+        cursor = source.execute("SELECT timestamp, action, user_id, details FROM audit ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            grouped: Dict[str, list] = {}
+            for timestamp, action, user_id, details in rows:
+                try:
+                    ts = int(datetime.fromisoformat(timestamp).timestamp() * 1_000_000)
+                    blob = base64.b64decode(details)
+                except (TypeError, ValueError) as e:
+                    logger.warning("Skipping unreadable legacy audit row at %s: %s", timestamp, e)
+                    continue
+                grouped.setdefault(store.partition_key(ts), []).append((ts, action or "", user_id or "", blob))
+            for key, partition_rows in grouped.items():
+                if key not in conns:
+                    conns[key] = store.connect(key)
+                store.insert(conns[key], partition_rows)
+                imported += len(partition_rows)
+    finally:
+        source.close()
+        for conn in conns.values():
+            conn.close()
+    logger.info(f"Imported {imported} legacy audit events from {legacy_path}")
+    return imported
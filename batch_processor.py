@@ -0,0 +1,168 @@
+"""Module for analyzing large sets of images with a pool of warm worker processes."""
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from logging_config import get_logger
+from typing import Dict, Iterator, List, Optional, Set
+
+logger = get_logger()
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+RECORD_FIELDS = ("name", "age", "nationality", "crime", "danger_level")
+
+def collect_image_paths(source: str) -> List[str]:
+    """Expand a batch source into a list of image paths.
+
+    Args:
+        source: Directory (searched recursively), newline-delimited file list,
+            or glob pattern.
+
+    Returns:
+        Sorted list of image paths for directories and globs, or the file
+        list in its original order.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(root, name)
+                 for root, _, names in os.walk(source)
+                 for name in names if name.lower().endswith(IMAGE_EXTENSIONS)]
+        return sorted(paths)
+    if os.path.isfile(source) and not source.lower().endswith(IMAGE_EXTENSIONS):
+        with open(source, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    return sorted(glob.glob(source, recursive=True))
+
+def load_completed(output_path: str) -> Set[str]:
+    """Read the paths already analyzed successfully in a JSONL results file.
+
+    Failed images are not counted, so a resumed run retries them.
+
+    Args:
+        output_path: Path to an existing results file.
+
+    Returns:
+        Set of image paths that have a successful result line.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+                if result["status"] == "ok":
+                    completed.add(result["path"])
+            except (ValueError, KeyError):
+                # سطر غير مكتمل من تشغيل مُنقطع
+                continue
+    return completed
+
+def _ends_with_newline(path: str) -> bool:
+    """Check whether a file ends with a newline."""
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+def _init_worker(offline_mode: bool, key: bytes) -> None:
+    """Install the parent's key and warm the detector and watchlist index once per worker."""
+    from detector_registry import IMAGE_DETECTOR_CONFIG, warm_up
+    from encryption import install_key
+    from face_matcher import get_matcher
+    from logging_config import configure_logging
+    configure_logging()
+    install_key(key)
+    warm_up(*IMAGE_DETECTOR_CONFIG)
+    try:
+        get_matcher(offline_mode)
+    except Exception as e:
+        logger.error(f"Worker watchlist preload failed: {e}")
+
+def _analyze_path(path: str, offline_mode: bool) -> Dict:
+    """Analyze one image file inside a worker process."""
+    import cv2
+    from image_processor import analyze_image_strict
+    start = time.perf_counter()
+    image = cv2.imread(path)
+    if image is None:
+        return {"path": path, "status": "error", "error": "Invalid image", "matches": []}
+    # الأخطاء تصل إلى iter_batch_results فتُسجَّل كـ error وتُعاد عند الاستئناف
+    results = analyze_image_strict(image, offline_mode=offline_mode)
+    return {"path": path, "status": "ok",
+            "matches": [dict(zip(RECORD_FIELDS, record)) for record in results],
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+def iter_batch_results(paths: List[str], offline_mode: bool = False,
+                       workers: Optional[int] = None) -> Iterator[Dict]:
+    """Analyze images in worker processes, yielding results as they finish.
+
+    At most two tasks per worker are in flight, so memory stays bounded for
+    arbitrarily long path lists.
+
+    Args:
+        paths: Image paths to analyze.
+        offline_mode: Whether to use offline database.
+        workers: Number of worker processes; defaults to the CPU count.
+
+    Yields:
+        One result dict per image, in completion order.
+    """
+    from encryption import export_key
+    workers = workers or os.cpu_count() or 1
+    context = multiprocessing.get_context("spawn")
+    pending = {}
+    remaining = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(offline_mode, export_key())) as executor:
+        while True:
+            while len(pending) < workers * 2:
+                path = next(remaining, None)
+                if path is None:
+                    break
+                pending[executor.submit(_analyze_path, path, offline_mode)] = path
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error("Batch analysis failed for %s: %s", path, e)
+                    yield {"path": path, "status": "error", "error": str(e), "matches": []}
+
+def run_batch(source: str, output_path: str, offline_mode: bool = False,
+              workers: Optional[int] = None, resume: bool = True) -> Dict:
+    """Analyze every image of a batch source and stream results to JSONL.
+
+    Args:
+        source: Directory, newline-delimited file list, or glob pattern.
+        output_path: JSONL file receiving one result per line.
+        offline_mode: Whether to use offline database.
+        workers: Number of worker processes; defaults to the CPU count.
+        resume: Skip images already present in `output_path`.
+
+    Returns:
+        Summary with counts, elapsed seconds and images per second.
+    """
+    paths = collect_image_paths(source)
+    completed = load_completed(output_path) if resume else set()
+    todo = [p for p in paths if p not in completed]
+    logger.info(f"Batch: {len(paths)} images, {len(paths) - len(todo)} already done")
+
+    summary = {"total": len(paths), "skipped": len(paths) - len(todo),
+               "processed": 0, "errors": 0, "matches": 0}
+    start = time.perf_counter()
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        if out.tell() and not _ends_with_newline(output_path):
+            out.write("\n")
+        for result in iter_batch_results(todo, offline_mode, workers):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            summary["processed"] += 1
+            summary["errors"] += result["status"] != "ok"
+            summary["matches"] += len(result["matches"])
+    summary["elapsed_s"] = round(time.perf_counter() - start, 3)
+    summary["images_per_sec"] = round(summary["processed"] / summary["elapsed_s"], 2) if summary["elapsed_s"] else 0.0
+    return summary
@@ -0,0 +1,81 @@
+"""CLI startup budget check.
+
+Times `main.py --help` and an argument error in fresh interpreters and
+verifies that importing `main` pulls in none of the heavy dependencies.
+Exits non-zero when the budget is exceeded, so it can gate CI.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget-ms 100 --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("cv2", "mtcnn", "tensorflow", "psycopg2", "tqdm", "cryptography", "numpy", "dotenv")
+
+IMPORT_PROBE = f"""
+import json, sys, time
+sys.path.insert(0, {ROOT!r})
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"import_ms": elapsed * 1000,
+                  "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+def run_wall(argv: List[str], runs: int) -> float:
+    """Median wall-clock milliseconds of a command over several runs."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def probe_import(runs: int) -> Dict:
+    """Median in-process import time of `main` and the heavy modules it loaded."""
+    samples, heavy = [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(result["import_ms"])
+        heavy.update(result["heavy"])
+    return {"import_ms": statistics.median(samples), "heavy": sorted(heavy)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check CLI startup time against a budget")
+    parser.add_argument("--budget-ms", type=float, default=100.0,
+                        help="Maximum milliseconds above bare interpreter startup")
+    parser.add_argument("--runs", type=int, default=7, help="Runs per measurement (median is reported)")
+    args = parser.parse_args()
+
+    interpreter_ms = run_wall([sys.executable, "-c", "pass"], args.runs)
+    help_ms = run_wall([sys.executable, "main.py", "--help"], args.runs)
+    error_ms = run_wall([sys.executable, "main.py", "--no-such-option"], args.runs)
+    probe = probe_import(args.runs)
+
+    print(f"interpreter startup: {interpreter_ms:.1f} ms")
+    print(f"import main:         {probe['import_ms']:.1f} ms")
+    print(f"main.py --help:      {help_ms:.1f} ms ({help_ms - interpreter_ms:.1f} ms over interpreter)")
+    print(f"argument error:      {error_ms:.1f} ms ({error_ms - interpreter_ms:.1f} ms over interpreter)")
+
+    failures = []
+    if probe["heavy"]:
+        failures.append(f"heavy modules imported by main: {', '.join(probe['heavy'])}")
+    for label, elapsed in (("--help", help_ms), ("argument error", error_ms)):
+        if elapsed - interpreter_ms > args.budget_ms:
+            failures.append(f"{label} took {elapsed - interpreter_ms:.1f} ms over interpreter "
+                            f"(budget {args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""End-to-end pipeline benchmarks on synthetic data.
+
+Runs without cameras, network or PostgreSQL: the offline SQLite store and
+an in-memory watchlist stand in for the database. Every stage reports
+p50/p95/p99 latency and throughput; results are written as JSON so runs can
+be compared with --compare.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --quick --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="ips-bench-")
+
+# بيئة معزولة: لا قاعدة بيانات حقيقية ولا مفاتيح إنتاج
+os.environ.setdefault("ENCRYPTION_PASSWORD", "benchmark-only-password")
+os.environ.setdefault("ENCRYPTION_SALT", "YmVuY2htYXJrLXNhbHQtMQ==")
+os.environ["OFFLINE_DB_PATH"] = os.path.join(WORKDIR, "offline_cache.db")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import synthetic
+
+STAGES = ("detector_construction", "detect_faces", "embedding", "encrypt_data", "search_database",
+          "detect_large", "match", "log_audit", "analyze_image", "live_feed", "analyze_video")
+
+def measure(fn: Callable[[int], object], iterations: int, warmup: int = 1) -> Dict:
+    """Time repeated calls and summarize the latency distribution.
+
+    Args:
+        fn: Callable receiving the iteration number.
+        iterations: Number of timed calls.
+        warmup: Untimed calls before measuring.
+
+    Returns:
+        Latency percentiles in milliseconds and throughput in calls/second.
+    """
+    for i in range(warmup):
+        fn(i)
+    samples = np.empty(iterations)
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        samples[i] = time.perf_counter() - t0
+    total = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(samples * 1000, [50, 95, 99])
+    return {"iterations": iterations, "p50_ms": round(p50, 4), "p95_ms": round(p95, 4),
+            "p99_ms": round(p99, 4), "mean_ms": round(samples.mean() * 1000, 4),
+            "ops_per_sec": round(iterations / total, 2) if total else None}
+
+def bench_detector_construction(args) -> List[Dict]:
+    from mtcnn import MTCNN
+    from detector_registry import IMAGE_DETECTOR_CONFIG
+    stats = measure(lambda i: MTCNN(min_face_size=IMAGE_DETECTOR_CONFIG[0], scale_factor=IMAGE_DETECTOR_CONFIG[1]),
+                    iterations=2 if args.quick else 5, warmup=0)
+    return [{"stage": "detector_construction", "params": {}, **stats}]
+
+def bench_detect_faces(args) -> List[Dict]:
+    from detector_registry import IMAGE_DETECTOR_CONFIG, warm_up
+    from image_processor import detect_faces
+    detector = warm_up(*IMAGE_DETECTOR_CONFIG)
+    results = []
+    for width, height in ((640, 480), (1920, 1080)):
+        images = [synthetic.make_image(width, height, faces=2, seed=i) for i in range(4)]
+        stats = measure(lambda i: detect_faces(detector, images[i % len(images)], mode="fixed"),
+                        args.iterations // 2 or 1)
+        results.append({"stage": "detect_faces", "params": {"resolution": f"{width}x{height}"}, **stats})
+    return results
+
+def _recall(found: List[tuple], truth: List[tuple], min_iou: float = 0.3) -> float:
+    """Share of ground-truth boxes matched by a detection with IoU of at least `min_iou`."""
+    def iou(a: tuple, b: tuple) -> float:
+        inter = max(min(a[2], b[2]) - max(a[0], b[0]), 0) * max(min(a[1], b[1]) - max(a[3], b[3]), 0)
+        union = (a[2] - a[0]) * (a[1] - a[3]) + (b[2] - b[0]) * (b[1] - b[3]) - inter
+        return inter / union if union > 0 else 0.0
+    return sum(any(iou(t, f) >= min_iou for f in found) for t in truth) / len(truth) if truth else 1.0
+
+def bench_detect_large(args) -> List[Dict]:
+    from detector_registry import IMAGE_DETECTOR_CONFIG, warm_up
+    from image_processor import detect_faces
+    detector = warm_up(*IMAGE_DETECTOR_CONFIG)
+    sizes = [48, 56, 64, 80, 96, 128, 200, 320]
+    resolutions = ((1920, 1080), (4000, 3000)) if args.quick else ((1920, 1080), (4000, 3000), (6000, 4000))
+    results = []
+    for width, height in resolutions:
+        scenes = [synthetic.make_scene(width, height, sizes, seed=i) for i in range(2)]
+        for mode in ("fixed", "adaptive"):
+            found = [detect_faces(detector, image, mode=mode) for image, _ in scenes]
+            recall = sum(_recall(f, truth) for f, (_, truth) in zip(found, scenes)) / len(scenes)
+            stats = measure(lambda i: detect_faces(detector, scenes[i % len(scenes)][0], mode=mode),
+                            max(args.iterations // 10, 2))
+            results.append({"stage": "detect_large", "params": {"resolution": f"{width}x{height}", "mode": mode},
+                            **stats, "recall": round(recall, 3)})
+    return results
+
+def bench_embedding(args) -> List[Dict]:
+    from image_processor import compute_embedding
+    crops = synthetic.make_face_crops(16)
+    stats = measure(lambda i: compute_embedding(crops[i % len(crops)]), args.iterations * 10)
+    return [{"stage": "embedding", "params": {}, **stats}]
+
+def bench_encrypt_data(args) -> List[Dict]:
+    from embedding_format import pack
+    from encryption import encrypt_bytes, encrypt_data, get_key
+    from image_processor import compute_embedding
+    get_key()
+    embedding = compute_embedding(synthetic.make_face_crops(1)[0])
+    legacy = str(embedding.astype(np.uint8).tolist())
+    packed = pack(embedding)
+    return [
+        {"stage": "encrypt_data", "params": {"payload": "legacy_text", "bytes": len(legacy)},
+         **measure(lambda i: encrypt_data(legacy), args.iterations * 10)},
+        {"stage": "encrypt_data", "params": {"payload": "packed_int8", "bytes": len(packed)},
+         **measure(lambda i: encrypt_bytes(packed), args.iterations * 10)},
+    ]
+
+def bench_search_database(args) -> List[Dict]:
+    from database_manager import get_offline_store, search_database
+    from encryption import encrypt_data
+    conn = get_offline_store().connection()
+    query = encrypt_data(str(list(range(64))))
+    results = []
+    for size in args.watchlist_sizes:
+        with conn:
+            conn.execute("DELETE FROM offline_wanted")
+            conn.executemany("INSERT INTO offline_wanted (id, face_encoding, name) VALUES (?, ?, ?)",
+                             ((i, f"encoding-{i:08d}" * 64, f"Person {i}") for i in range(size)))
+        stats = measure(lambda i: search_database(None, query, offline_mode=True), args.iterations)
+        results.append({"stage": "search_database", "params": {"watchlist": size}, **stats})
+    return results
+
+def _synthetic_matcher(size: int):
+    from face_matcher import FaceMatcher
+    matrix, records = synthetic.make_watchlist(size)
+    matcher = FaceMatcher(lambda: (range(size), matrix, records), refresh_seconds=float("inf"))
+    matcher.reload()
+    return matcher
+
+def bench_match(args) -> List[Dict]:
+    results = []
+    queries = synthetic.make_watchlist(8, seed=99)[0]
+    for size in args.watchlist_sizes:
+        matcher = _synthetic_matcher(size)
+        for batch in (1, 8):
+            stats = measure(lambda i: matcher.match(queries[:batch]), args.iterations * 5)
+            results.append({"stage": "match", "params": {"watchlist": size, "batch": batch}, **stats})
+    return results
+
+def bench_log_audit(args) -> List[Dict]:
+    from audit_log import AuditWriter
+    results = []
+    for mode in ("event", "group"):
+        writer = AuditWriter(os.path.join(WORKDIR, f"audit_{mode}"), durability=mode)
+        iterations = args.iterations * (2 if mode == "event" else 20)
+        start = time.perf_counter()
+        stats = measure(lambda i: writer.log("benchmark", "bench", f"event {i}"), iterations)
+        writer.flush()
+        stats["ops_per_sec"] = round(iterations / (time.perf_counter() - start), 2)
+        writer.close()
+        results.append({"stage": "log_audit", "params": {"durability": mode}, **stats})
+    return results
+
+def bench_analyze_image(args) -> List[Dict]:
+    from detector_registry import IMAGE_DETECTOR_CONFIG, warm_up
+    from face_matcher import set_matcher
+    from image_processor import analyze_image
+    warm_up(*IMAGE_DETECTOR_CONFIG)
+    images = [synthetic.make_image(640, 480, faces=2, seed=i) for i in range(4)]
+    results = []
+    for size in args.watchlist_sizes:
+        set_matcher(True, _synthetic_matcher(size))
+        stats = measure(lambda i: analyze_image(images[i % len(images)], offline_mode=True), args.iterations // 2 or 1)
+        results.append({"stage": "analyze_image", "params": {"watchlist": size}, **stats})
+    return results
+
+def bench_live_feed(args) -> List[Dict]:
+    from detector_registry import LIVE_FEED_DETECTOR_CONFIG, warm_up
+    from face_matcher import set_matcher
+    from live_feed import FrameScheduler, process_frames
+    from motion_gate import MotionGate
+    detector = warm_up(*LIVE_FEED_DETECTOR_CONFIG)
+    set_matcher(True, _synthetic_matcher(max(args.watchlist_sizes)))
+    results = []
+    for cameras, motion_gate in ((c, g) for c in args.cameras for g in (False, True)):
+        gate = MotionGate() if motion_gate else None
+        scheduler = FrameScheduler()
+        stop_event = threading.Event()
+        feed = synthetic.SyntheticCameras(scheduler, cameras)
+        feed.start()
+        timer = threading.Timer(args.duration, stop_event.set)
+        start = time.perf_counter()
+        timer.start()
+        process_frames(detector, stop_event, True, scheduler, motion_gate=gate)
+        elapsed = time.perf_counter() - start
+        feed.stop()
+        stats = scheduler.stats()
+        processed = sum(s["processed"] for s in stats.values())
+        captured = sum(s["captured"] for s in stats.values())
+        dropped = sum(s["dropped"] for s in stats.values())
+        results.append({"stage": "live_feed", "params": {"cameras": cameras, "motion_gate": motion_gate},
+                        "iterations": processed,
+                        "p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None,
+                        "ops_per_sec": round(processed / elapsed, 2),
+                        "drop_ratio": round(dropped / captured, 4) if captured else 0.0})
+    return results
+
+def bench_analyze_video(args) -> List[Dict]:
+    from video_processor import run_video
+    path = os.path.join(WORKDIR, "synthetic.mp4")
+    synthetic.write_video(path, seconds=args.video_seconds, fps=25)
+    results, reference = [], None
+    for workers, sample_fps in ((w, f) for f in (None, 5.0) for w in sorted({1, args.video_workers})):
+        output = os.path.join(WORKDIR, f"video_{workers}_{sample_fps}.jsonl")
+        summary = run_video(path, output, offline_mode=True, workers=workers, sample_fps=sample_fps,
+                            segment_seconds=args.video_seconds / max(args.video_workers, 1))
+        with open(output, encoding="utf-8") as f:
+            frames = [json.loads(line)["frame"] for line in f]
+        # الترتيب الزمني يجب أن يطابق التشغيل المتسلسل
+        if workers == 1:
+            reference = frames
+        elif frames != reference:
+            raise RuntimeError(f"parallel output differs from sequential ({workers} workers, fps={sample_fps})")
+        results.append({"stage": "analyze_video", "params": {"workers": workers, "sample_fps": sample_fps},
+                        "iterations": summary["sampled"],
+                        "p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None,
+                        "ops_per_sec": summary["frames_per_sec"], "segments": summary["segments"]})
+    return results
+
+def _result_key(result: Dict) -> str:
+    return result["stage"] + json.dumps(result["params"], sort_keys=True)
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> int:
+    """Print per-stage changes against a previous run.
+
+    Args:
+        results: Current results.
+        baseline_path: JSON file written by an earlier run.
+        tolerance: Relative slowdown reported as a regression.
+
+    Returns:
+        Number of regressions.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {_result_key(r): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\n{'stage':<22} {'params':<40} {'metric':<12} {'before':>10} {'after':>10} {'change':>8}")
+    for result in results:
+        before = baseline.get(_result_key(result))
+        if not before:
+            continue
+        metric = "p50_ms" if result["p50_ms"] is not None else "ops_per_sec"
+        old, new = before.get(metric), result.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old if metric == "p50_ms" else (old - new) / old
+        flag = " REGRESSION" if change > tolerance else ""
+        regressions += bool(flag)
+        print(f"{result['stage']:<22} {json.dumps(result['params']):<40} {metric:<12} "
+              f"{old:>10.3f} {new:>10.3f} {change:>+7.1%}{flag}")
+    return regressions
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the image analysis pipeline")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to run")
+    parser.add_argument("--iterations", type=int, default=50, help="Base iterations per stage")
+    parser.add_argument("--watchlist-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--cameras", type=int, nargs="+", default=[1, 4, 8], help="Simulated camera counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per live-feed run")
+    parser.add_argument("--video-seconds", type=float, default=60.0, help="Length of the synthetic video")
+    parser.add_argument("--video-workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for the parallel video run")
+    parser.add_argument("--quick", action="store_true", help="Small sizes and few iterations")
+    parser.add_argument("--output", type=str, default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", type=str, default=None, help="Previous results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Slowdown reported as regression")
+    args = parser.parse_args()
+    if args.quick:
+        args.iterations = min(args.iterations, 10)
+        args.watchlist_sizes = [s for s in args.watchlist_sizes if s <= 1000] or [100]
+        args.cameras = args.cameras[:2]
+        args.duration = min(args.duration, 2.0)
+        args.video_seconds = min(args.video_seconds, 20.0)
+
+    results = []
+    for stage in args.stages:
+        print(f"Running {stage}...", flush=True)
+        try:
+            stage_results = globals()[f"bench_{stage}"](args)
+        except Exception as e:
+            print(f"  skipped: {e}")
+            continue
+        for result in stage_results:
+            recall = f", recall={result['recall']}" if "recall" in result else ""
+            print(f"  {json.dumps(result['params'])}: p50={result['p50_ms']} ms p95={result['p95_ms']} ms "
+                  f"p99={result['p99_ms']} ms, {result['ops_per_sec']} ops/s{recall}")
+        results.extend(stage_results)
+
+    report = {"meta": {"timestamp": time.time(), "revision": git_revision(), "python": platform.python_version(),
+                       "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                       "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")}},
+              "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Synthetic images, watchlists and camera streams for benchmarks."""
+import threading
+import time
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+def draw_face(image: np.ndarray, center: Tuple[int, int], size: int, rng: np.random.Generator) -> None:
+    """Draw a simple frontal face (skin ellipse, eyes, nose, mouth) in place.
+
+    Args:
+        image: BGR image to draw on.
+        center: Face centre (x, y).
+        size: Face height in pixels.
+        rng: Random generator for skin tone variation.
+    """
+    x, y = center
+    skin = tuple(int(c) for c in rng.integers([90, 120, 170], [140, 170, 230]))
+    cv2.ellipse(image, (x, y), (int(size * 0.38), size // 2), 0, 0, 360, skin, -1)
+    eye_dx, eye_y = int(size * 0.16), y - int(size * 0.1)
+    for ex in (x - eye_dx, x + eye_dx):
+        cv2.ellipse(image, (ex, eye_y), (max(size // 14, 2), max(size // 24, 1)), 0, 0, 360, (245, 245, 245), -1)
+        cv2.circle(image, (ex, eye_y), max(size // 30, 1), (40, 30, 20), -1)
+    cv2.line(image, (x, eye_y + size // 12), (x, y + size // 10), (70, 90, 140), max(size // 40, 1))
+    cv2.ellipse(image, (x, y + int(size * 0.22)), (int(size * 0.14), max(size // 30, 1)), 0, 0, 180,
+                (60, 60, 150), max(size // 40, 1))
+
+def make_image(width: int = 640, height: int = 480, faces: int = 2, seed: int = 0) -> np.ndarray:
+    """Generate a noisy background with synthetic faces.
+
+    Args:
+        width: Image width.
+        height: Image height.
+        faces: Number of faces to draw.
+        seed: Random seed.
+
+    Returns:
+        BGR image as uint8 array.
+    """
+    rng = np.random.default_rng(seed)
+    image = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (7, 7), 0)
+    size = max(min(height // 3, width // (faces * 2 + 1)), 24)
+    for i in range(faces):
+        center = (int(width * (i + 1) / (faces + 1)), height // 2)
+        draw_face(image, center, size, rng)
+    return image
+
+def make_scene(width: int, height: int, sizes: List[int], seed: int = 0
+               ) -> Tuple[np.ndarray, List[Tuple[int, int, int, int]]]:
+    """Generate a large noisy image with faces of given sizes at known, non-overlapping positions.
+
+    Args:
+        width: Image width.
+        height: Image height.
+        sizes: Height in pixels of each face to draw.
+        seed: Random seed.
+
+    Returns:
+        Tuple of (BGR image, ground-truth boxes as (top, right, bottom, left)).
+    """
+    rng = np.random.default_rng(seed)
+    image = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (7, 7), 0)
+    boxes: List[Tuple[int, int, int, int]] = []
+    for size in sorted(sizes, reverse=True):
+        half_w, half_h = int(size * 0.38), size // 2
+        for _ in range(100):
+            x = int(rng.integers(half_w + 1, width - half_w - 1))
+            y = int(rng.integers(half_h + 1, height - half_h - 1))
+            box = (y - half_h, x + half_w, y + half_h, x - half_w)
+            if all(box[0] > b[2] or box[2] < b[0] or box[3] > b[1] or box[1] < b[3] for b in boxes):
+                draw_face(image, (x, y), size, rng)
+                boxes.append(box)
+                break
+    return image, boxes
+
+def make_face_crops(count: int, size: int = 96, seed: int = 0) -> List[np.ndarray]:
+    """Generate single-face crops.
+
+    Args:
+        count: Number of crops.
+        size: Crop side length.
+        seed: Random seed.
+
+    Returns:
+        List of BGR crops.
+    """
+    return [make_image(size, size, faces=1, seed=seed + i) for i in range(count)]
+
+def make_watchlist(size: int, dim: int = 3072, seed: int = 0) -> Tuple[np.ndarray, List[tuple]]:
+    """Generate a random watchlist of raw embeddings and records.
+
+    Args:
+        size: Number of entries.
+        dim: Embedding dimension.
+        seed: Random seed.
+
+    Returns:
+        Tuple of (embedding matrix, records).
+    """
+    rng = np.random.default_rng(seed)
+    matrix = rng.integers(0, 255, (size, dim)).astype(np.float32)
+    records = [(f"Person {i}", 20 + i % 50, "N/A", "N/A", ("low", "medium", "high")[i % 3]) for i in range(size)]
+    return matrix, records
+
+def write_video(path: str, seconds: float = 10.0, fps: float = 25.0, width: int = 640, height: int = 480,
+                faces: int = 2, seed: int = 0) -> int:
+    """Write a video of synthetic faces drifting across a static background.
+
+    Args:
+        path: Output file; ".avi" is written as MJPG, anything else as mp4v.
+        seconds: Video length.
+        fps: Frames per second.
+        width: Frame width.
+        height: Frame height.
+        faces: Number of faces.
+        seed: Random seed.
+
+    Returns:
+        Number of frames written.
+    """
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (7, 7), 0)
+    size = max(min(height // 3, width // (faces * 2 + 1)), 24)
+    fourcc = cv2.VideoWriter_fourcc(*("MJPG" if path.lower().endswith(".avi") else "mp4v"))
+    writer = cv2.VideoWriter(path, fourcc, fps, (width, height))
+    count = int(seconds * fps)
+    for i in range(count):
+        frame = background.copy()
+        for face in range(faces):
+            x = int(width * (face + 1) / (faces + 1) + size * 0.5 * np.sin(i / fps + face))
+            draw_face(frame, (x, height // 2), size, np.random.default_rng(seed + face))
+        writer.write(frame)
+    writer.release()
+    return count
+
+class SyntheticCameras:
+    """Threads pushing synthetic frames into a frame scheduler at a fixed rate."""
+
+    def __init__(self, scheduler, cameras: int, fps: float = 30.0, width: int = 640, height: int = 480):
+        """Prepare one frame set per camera.
+
+        Args:
+            scheduler: FrameScheduler receiving frames.
+            cameras: Number of simulated cameras.
+            fps: Frames per second per camera.
+            width: Frame width.
+            height: Frame height.
+        """
+        self.scheduler = scheduler
+        self.interval = 1.0 / fps
+        self.frames = {cam: [make_image(width, height, faces=1 + cam % 3, seed=cam * 10 + i) for i in range(4)]
+                       for cam in range(cameras)}
+        self.stop_event = threading.Event()
+        self._threads = []
+        for cam in self.frames:
+            scheduler.register(cam)
+
+    def _run(self, cam: int) -> None:
+        """Push frames for one camera until stopped."""
+        i = 0
+        while not self.stop_event.is_set():
+            self.scheduler.put(cam, self.frames[cam][i % len(self.frames[cam])].copy())
+            i += 1
+            time.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start all camera threads."""
+        for cam in self.frames:
+            thread = threading.Thread(target=self._run, args=(cam,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stop all camera threads."""
+        self.stop_event.set()
+        for thread in self._threads:
+            thread.join()
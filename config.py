@@ -1,10 +1,10 @@
 """Module for centralized configuration settings."""
 import os
 from dotenv import load_dotenv
-from logging_config import configure_logging
+from logging_config import get_logger
 from typing import Optional
 
-logger = configure_logging()
+logger = get_logger()
 
 class Config:
     """Class to manage system configuration settings."""
@@ -67,4 +67,21 @@ class Config:
         """
         return getattr(self, key, default)
 
-config = Config()
\ No newline at end of file
+_config: Optional[Config] = None
+
+def get_config() -> Config:
+    """Get the shared configuration, loading and validating it on first use.
+
+    Returns:
+        Config instance.
+    """
+    global _config
+    if _config is None:
+        _config = Config()
+    return _config
+
+def __getattr__(name: str):
+    """Build the module-level `config` lazily so importing this module never raises."""
+    if name == "config":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -2,19 +2,32 @@
 import psycopg2
 import sqlite3
 import os, time
+import json
+import random
+import threading
+import numpy as np
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from logging_config import configure_logging
-from encryption import encrypt_data, decrypt_data
+from logging_config import get_logger
+from metrics import STAGE_SECONDS
+from embedding_format import pack, unpack
+from encryption import encrypt_bytes, decrypt_bytes, decrypt_data
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
 
-logger = configure_logging()
+logger = get_logger()
 load_dotenv()
 
-def connect_to_db(max_retries: int = 3, retry_delay: int = 2) -> psycopg2.extensions.connection:
+def connect_to_db(max_retries: int = 3, retry_delay: float = 0.5,
+                  max_delay: float = 5.0) -> psycopg2.extensions.connection:
     """Connect to PostgreSQL database with SSL.
 
+    Retries use exponential backoff with full jitter, so concurrent workers
+    do not reconnect in lockstep.
+
     Args:
         max_retries: Maximum connection attempts.
-        retry_delay: Delay between retries in seconds.
+        retry_delay: Base delay between retries in seconds.
+        max_delay: Upper bound for a single retry delay in seconds.
 
     Returns:
         Database connection object or None if failed.
@@ -38,11 +51,209 @@ def connect_to_db(max_retries: int = 3, retry_delay: int = 2) -> psycopg2.extens
             retries += 1
             logger.error(f"Database connection failed (Attempt {retries}/{max_retries}): {e}")
             if retries < max_retries:
-                time.sleep(retry_delay)
+                time.sleep(random.uniform(0, min(max_delay, retry_delay * 2 ** (retries - 1))))
             else:
                 logger.error("Max retries reached")
                 return None
 
+class ConnectionPool:
+    """Thread-safe pool of database connections with health checks.
+
+    Connections come from the `connect` factory, so the pool works with any
+    DB-API connection (e.g. `connect_to_db` for PostgreSQL, or a SQLite
+    connection opened with `check_same_thread=False` as a local stand-in).
+    """
+
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 5,
+                 health_check_interval: float = 30.0, checkout_timeout: float = 10.0):
+        """Initialize the pool and open `min_size` connections.
+
+        Args:
+            connect: Factory returning a new connection (or None on failure).
+            min_size: Number of connections opened up front.
+            max_size: Maximum number of open connections.
+            health_check_interval: Idle seconds after which a connection is
+                checked with `SELECT 1` before being handed out.
+            checkout_timeout: Default seconds to wait for a free connection.
+        """
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError("Pool size must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.pid = os.getpid()
+        self._idle: List[Tuple[Any, float]] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        for _ in range(min_size):
+            self._idle.append((self._open(), time.monotonic()))
+            self._size += 1
+
+    def _open(self) -> Any:
+        """Open a new connection through the factory."""
+        conn = self._connect()
+        if conn is None:
+            raise ConnectionError("Unable to open database connection")
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn: Any) -> bool:
+        """Check that a connection is still usable."""
+        if getattr(conn, "closed", 0):
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: Any) -> None:
+        """Close a connection, ignoring errors."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _release_slot(self) -> None:
+        """Give back a connection slot after a connection was dropped."""
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def getconn(self, timeout: Optional[float] = None) -> Any:
+        """Check out a connection, waiting if the pool is exhausted.
+
+        Args:
+            timeout: Seconds to wait; defaults to `checkout_timeout`.
+
+        Returns:
+            Open database connection.
+        """
+        deadline = time.monotonic() + (self.checkout_timeout if timeout is None else timeout)
+        conn, last_used = None, 0.0
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise ConnectionError("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a database connection")
+                self._cond.wait(remaining)
+
+        if conn is not None:
+            if time.monotonic() - last_used < self.health_check_interval or self._is_healthy(conn):
+                return conn
+            logger.warning("Replacing unhealthy pooled connection")
+            self._close_quietly(conn)
+        try:
+            return self._open()
+        except Exception:
+            self._release_slot()
+            raise
+
+    def putconn(self, conn: Any, discard: bool = False) -> None:
+        """Return a connection to the pool.
+
+        Args:
+            conn: Connection obtained from `getconn`.
+            discard: Close the connection instead of reusing it.
+        """
+        with self._cond:
+            if discard or self._closed or getattr(conn, "closed", 0):
+                self._close_quietly(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Check out a connection for the current thread.
+
+        Nested use in the same thread reuses the same connection. The
+        outermost block commits on success and rolls back on error.
+
+        Args:
+            timeout: Seconds to wait for a free connection.
+
+        Yields:
+            Open database connection.
+        """
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            yield held
+            return
+        conn = self.getconn(timeout)
+        self._local.held = conn
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self._local.held = None
+            self.putconn(conn, discard=broken)
+
+    def closeall(self) -> None:
+        """Close idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._close_quietly(conn)
+            self._size -= len(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Get the process-wide PostgreSQL connection pool, creating it on first use.
+
+    Pool bounds come from DB_POOL_MIN and DB_POOL_MAX. A pool inherited
+    through fork is dropped (not closed) so the child opens its own sockets.
+
+    Returns:
+        Shared ConnectionPool instance.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool(connect_to_db,
+                                   min_size=int(os.getenv("DB_POOL_MIN", 1)),
+                                   max_size=int(os.getenv("DB_POOL_MAX", 5)))
+            logger.info(f"Database pool ready (min={_pool.min_size}, max={_pool.max_size})")
+        return _pool
+
+def close_pool() -> None:
+    """Close the process-wide connection pool if one was created."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.closeall()
+            logger.info("Database pool closed")
+        _pool = None
+
 def init_offline_db() -> sqlite3.Connection:
     """Initialize SQLite database for offline mode.
 
@@ -50,27 +261,276 @@ def init_offline_db() -> sqlite3.Connection:
         SQLite connection object or None if failed.
     """
     try:
-        conn = sqlite3.connect("offline_cache.db", timeout=5)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS offline_wanted (
-                id INTEGER PRIMARY KEY,
-                face_encoding TEXT,
-                name TEXT,
-                age INTEGER,
-                nationality TEXT,
-                crime TEXT,
-                danger_level TEXT
-            )
-        """)
-        conn.commit()
+        conn = sqlite3.connect(os.getenv("OFFLINE_DB_PATH", "offline_cache.db"), timeout=5)
+        OfflineStore._init_schema(conn)
         return conn
     except Exception as e:
         logger.error(f"Offline DB init error: {e}")
         return None
 
+def decode_legacy_encoding(encrypted_encoding: str) -> np.ndarray:
+    """Decode an encrypted `str(list)` face encoding into a vector.
+
+    Args:
+        encrypted_encoding: Base64 AES-GCM ciphertext of a JSON-style list.
+
+    Returns:
+        Face encoding as float32 vector.
+    """
+    return np.asarray(json.loads(decrypt_data(encrypted_encoding)), dtype=np.float32)
+
+def decode_stored_embedding(embedding: Optional[bytes],
+                            legacy_encoding: Optional[str]) -> Tuple[Optional[np.ndarray], bool]:
+    """Decode a stored embedding from either the binary or the legacy column.
+
+    Args:
+        embedding: Encrypted packed embedding, or None.
+        legacy_encoding: Encrypted `str(list)` encoding, or None.
+
+    Returns:
+        Tuple of (float32 vector or None, whether the row needs migration).
+    """
+    if embedding is not None:
+        plain = decrypt_bytes(bytes(embedding))
+        return unpack(plain), False
+    if legacy_encoding:
+        return decode_legacy_encoding(legacy_encoding), True
+    return None, False
+
+class OfflineStore:
+    """Long-lived SQLite watchlist store for offline mode.
+
+    Each thread gets its own persistent connection in WAL mode. Embeddings
+    are stored as encrypted BLOBs in the `embedding_format` layout keyed by
+    the integer primary key, and the whole table is bulk-loaded once for
+    in-memory matching.
+    """
+
+    def __init__(self, path: str = "offline_cache.db"):
+        """Initialize the store and its schema.
+
+        Args:
+            path: Path to the SQLite database file.
+        """
+        self.path = path
+        self.pid = os.getpid()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._init_schema(self.connection())
+
+    def connection(self) -> sqlite3.Connection:
+        """Get the calling thread's persistent connection.
+
+        Returns:
+            SQLite connection in WAL mode.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _init_schema(conn: sqlite3.Connection) -> None:
+        """Create the watchlist table and add the embedding column to old files."""
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS offline_wanted (
+                    id INTEGER PRIMARY KEY,
+                    face_encoding TEXT,
+                    name TEXT,
+                    age INTEGER,
+                    nationality TEXT,
+                    crime TEXT,
+                    danger_level TEXT,
+                    embedding BLOB
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(offline_wanted)")}
+            if "embedding" not in columns:
+                conn.execute("ALTER TABLE offline_wanted ADD COLUMN embedding BLOB")
+            conn.execute("CREATE TABLE IF NOT EXISTS sync_state (source TEXT PRIMARY KEY, watermark TEXT NOT NULL)")
+
+    def upsert_many(self, entries: Iterable[Tuple[int, np.ndarray, str, int, str, str, str]]) -> int:
+        """Insert or replace watchlist entries in a single transaction.
+
+        Args:
+            entries: Iterable of (id, embedding, name, age, nationality, crime, danger_level).
+
+        Returns:
+            Number of written rows.
+        """
+        rows = [(entry_id, encrypt_bytes(pack(embedding)), *record)
+                for entry_id, embedding, *record in entries]
+        conn = self.connection()
+        with conn:
+            conn.executemany("""
+                INSERT INTO offline_wanted (id, embedding, name, age, nationality, crime, danger_level)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET embedding = excluded.embedding, face_encoding = NULL,
+                    name = excluded.name, age = excluded.age, nationality = excluded.nationality,
+                    crime = excluded.crime, danger_level = excluded.danger_level
+            """, rows)
+        return len(rows)
+
+    def load_all(self) -> Tuple[List[int], List[np.ndarray], List[tuple]]:
+        """Bulk-load every watchlist entry into memory.
+
+        Rows that only have a legacy encoding are decoded and their embedding
+        BLOB is rewritten in the current format so later loads skip that path.
+
+        Returns:
+            Tuple of (ids, embeddings, records) aligned by position.
+        """
+        conn = self.connection()
+        rows = conn.execute("""
+            SELECT id, embedding, face_encoding, name, age, nationality, crime, danger_level
+            FROM offline_wanted ORDER BY id
+        """).fetchall()
+        ids, vectors, records, backfill = [], [], [], []
+        for entry_id, blob, legacy_encoding, *record in rows:
+            try:
+                vector, stale = decode_stored_embedding(blob, legacy_encoding)
+                if vector is None:
+                    continue
+                if stale:
+                    backfill.append((encrypt_bytes(pack(vector)), entry_id))
+            except Exception as e:
+                logger.error(f"Skipping unreadable offline entry {entry_id}: {e}")
+                continue
+            ids.append(entry_id)
+            vectors.append(vector)
+            records.append(tuple(record))
+        if backfill:
+            with conn:
+                conn.executemany("UPDATE offline_wanted SET embedding = ? WHERE id = ?", backfill)
+            logger.info(f"Backfilled {len(backfill)} offline embeddings")
+        return ids, vectors, records
+
+    def sync_state(self, source: str) -> Optional[str]:
+        """Get the watermark of the last sync from a source.
+
+        Args:
+            source: Name of the synced source table.
+
+        Returns:
+            Stored watermark, or None if never synced.
+        """
+        row = self.connection().execute("SELECT watermark FROM sync_state WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def apply_sync(self, source: str, batches: Iterable[List[tuple]], deleted_ids: Iterable[int],
+                   watermark: Union[None, str, Callable[[], Optional[str]]],
+                   replace_all: bool = False) -> Tuple[int, int]:
+        """Apply upstream deletions and streamed rows in a single transaction.
+
+        Deletions are applied first, so a row deleted and re-inserted upstream
+        ends up present. Embeddings and legacy encodings are copied as stored upstream
+        (already encrypted), so no row is decrypted here.
+
+        Args:
+            source: Name of the synced source table.
+            batches: Iterable of row lists (id, embedding, face_encoding, name,
+                age, nationality, crime, danger_level); consumed inside the
+                transaction.
+            deleted_ids: Ids removed upstream.
+            watermark: New watermark, stored only if every batch applied;
+                may be a callable evaluated after the batches are consumed.
+            replace_all: Delete local rows absent from `batches` (full sync).
+
+        Returns:
+            Tuple of (upserted rows, deleted rows).
+        """
+        conn = self.connection()
+        upserted = deleted = 0
+        with conn:
+            if replace_all:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS sync_seen (id INTEGER PRIMARY KEY)")
+                conn.execute("DELETE FROM sync_seen")
+            deleted += conn.executemany("DELETE FROM offline_wanted WHERE id = ?",
+                                        [(entry_id,) for entry_id in deleted_ids]).rowcount
+            for rows in batches:
+                conn.executemany("""
+                    INSERT INTO offline_wanted (id, embedding, face_encoding, name, age, nationality, crime, danger_level)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET embedding = excluded.embedding,
+                        face_encoding = excluded.face_encoding, name = excluded.name, age = excluded.age,
+                        nationality = excluded.nationality, crime = excluded.crime,
+                        danger_level = excluded.danger_level
+                """, rows)
+                if replace_all:
+                    conn.executemany("INSERT OR IGNORE INTO sync_seen (id) VALUES (?)", [(row[0],) for row in rows])
+                upserted += len(rows)
+            if replace_all:
+                deleted += conn.execute("DELETE FROM offline_wanted WHERE id NOT IN (SELECT id FROM sync_seen)").rowcount
+                conn.execute("DELETE FROM sync_seen")
+            watermark = watermark() if callable(watermark) else watermark
+            if watermark is not None:
+                conn.execute("""
+                    INSERT INTO sync_state (source, watermark) VALUES (?, ?)
+                    ON CONFLICT(source) DO UPDATE SET watermark = excluded.watermark
+                """, (source, watermark))
+        return upserted, deleted
+
+    def migrate_embeddings(self, clear_legacy: bool = False) -> int:
+        """Rewrite every embedding in the current binary format in one transaction.
+
+        Args:
+            clear_legacy: Also drop the legacy TEXT encodings once converted.
+
+        Returns:
+            Number of updated rows.
+        """
+        conn = self.connection()
+        rows = conn.execute("SELECT id, embedding, face_encoding FROM offline_wanted").fetchall()
+        updates = []
+        for entry_id, blob, legacy_encoding in rows:
+            try:
+                vector, stale = decode_stored_embedding(blob, legacy_encoding)
+            except Exception as e:
+                logger.error(f"Skipping unreadable offline entry {entry_id}: {e}")
+                continue
+            if vector is not None and (stale or (clear_legacy and legacy_encoding)):
+                updates.append((encrypt_bytes(pack(vector)) if stale else blob, entry_id))
+        clear = ", face_encoding = NULL" if clear_legacy else ""
+        with conn:
+            conn.executemany(f"UPDATE offline_wanted SET embedding = ?{clear} WHERE id = ?", updates)
+        logger.info(f"Migrated {len(updates)} offline embeddings")
+        return len(updates)
+
+    def close(self) -> None:
+        """Close every connection opened by this store."""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+_offline_store: Optional[OfflineStore] = None
+_offline_store_lock = threading.Lock()
+
+def get_offline_store() -> OfflineStore:
+    """Get the process-wide offline store, opening it on first use.
+
+    Returns:
+        Shared OfflineStore instance.
+    """
+    global _offline_store
+    with _offline_store_lock:
+        if _offline_store is None or _offline_store.pid != os.getpid():
+            _offline_store = OfflineStore(os.getenv("OFFLINE_DB_PATH", "offline_cache.db"))
+        return _offline_store
+
 def search_database(db: psycopg2.extensions.connection, face_encoding: str, offline_mode: bool = False) -> tuple:
-    """Search database for a matching face encoding.
+    """Search database for a matching face encoding, recording its latency.
 
     Args:
         db: Database connection (None if offline).
@@ -80,21 +540,23 @@ def search_database(db: psycopg2.extensions.connection, face_encoding: str, offl
     Returns:
         Tuple of (name, age, nationality, crime, danger_level) or None.
     """
+    with STAGE_SECONDS.time(stage="search_database"):
+        return _search_database(db, face_encoding, offline_mode)
+
+def _search_database(db: psycopg2.extensions.connection, face_encoding: str, offline_mode: bool = False) -> tuple:
+    """Run the lookup behind `search_database`."""
     if offline_mode:
         try:
-            conn = init_offline_db()
-            if not conn:
-                return None
+            conn = get_offline_store().connection()
             cursor = conn.cursor()
             cursor.execute("SELECT name, age, nationality, crime, danger_level FROM offline_wanted WHERE face_encoding = ?", (face_encoding,))
             result = cursor.fetchone()
-            conn.close()
             if result:
-                logger.info(f"Offline match: {result[0]}")
+                logger.info("Offline match: %s", result[0])
                 return result
             return None
         except Exception as e:
-            logger.error(f"Offline search error: {e}")
+            logger.error("Offline search error: %s", e)
             return None
     else:
         try:
@@ -102,9 +564,171 @@ def search_database(db: psycopg2.extensions.connection, face_encoding: str, offl
                 cursor.execute("SELECT name, age, nationality, crime, danger_level FROM wanted_individuals WHERE face_encoding = %s", (face_encoding,))
                 result = cursor.fetchone()
                 if result:
-                    logger.info(f"Online match: {result[0]}")
+                    logger.info("Online match: %s", result[0])
                     return result
                 return None
         except Exception as e:
-            logger.error(f"Online search error: {e}")
-            return None
\ No newline at end of file
+            logger.error("Online search error: %s", e)
+            return None
+
+def fetch_watchlist(db: psycopg2.extensions.connection) -> list:
+    """Fetch every online watchlist entry for building the in-memory match index.
+
+    Tables not yet migrated to the binary `face_embedding` column are read
+    through the legacy column only.
+
+    Args:
+        db: Database connection.
+
+    Returns:
+        List of (id, face_embedding, face_encoding, name, age, nationality, crime, danger_level) rows.
+    """
+    columns = "face_encoding, name, age, nationality, crime, danger_level FROM wanted_individuals"
+    try:
+        with db.cursor() as cursor:
+            cursor.execute(f"SELECT id, face_embedding, {columns}")
+            return cursor.fetchall()
+    except psycopg2.errors.UndefinedColumn:
+        db.rollback()
+        with db.cursor() as cursor:
+            cursor.execute(f"SELECT id, NULL, {columns}")
+            return cursor.fetchall()
+
+def migrate_online_embeddings(db: psycopg2.extensions.connection, clear_legacy: bool = False,
+                              batch_size: int = 500) -> int:
+    """Add the binary `face_embedding` column and convert legacy rows.
+
+    Rows are streamed through a server-side cursor and updated in batches
+    within one transaction. `wanted_individuals` must have an `id` key.
+
+    Args:
+        db: Database connection.
+        clear_legacy: Also drop the legacy `face_encoding` text once converted.
+        batch_size: Rows fetched and updated per round trip.
+
+    Returns:
+        Number of updated rows.
+    """
+    from psycopg2.extras import execute_batch
+    clear = ", face_encoding = NULL" if clear_legacy else ""
+    updated = 0
+    with db.cursor() as cursor:
+        cursor.execute("ALTER TABLE wanted_individuals ADD COLUMN IF NOT EXISTS face_embedding BYTEA")
+    with db.cursor(name="embedding_migration") as reader, db.cursor() as writer:
+        reader.itersize = batch_size
+        reader.execute("SELECT id, face_embedding, face_encoding FROM wanted_individuals "
+                       "WHERE face_embedding IS NULL OR face_encoding IS NOT NULL")
+        while True:
+            rows = reader.fetchmany(batch_size)
+            if not rows:
+                break
+            updates = []
+            for entry_id, blob, legacy_encoding in rows:
+                try:
+                    vector, stale = decode_stored_embedding(blob, legacy_encoding)
+                except Exception as e:
+                    logger.error(f"Skipping unreadable watchlist entry {entry_id}: {e}")
+                    continue
+                if vector is not None and (stale or (clear_legacy and legacy_encoding)):
+                    new_blob = encrypt_bytes(pack(vector)) if stale else bytes(blob)
+                    updates.append((psycopg2.Binary(new_blob), entry_id))
+            execute_batch(writer, f"UPDATE wanted_individuals SET face_embedding = %s{clear} WHERE id = %s",
+                          updates, page_size=batch_size)
+            updated += len(updates)
+    db.commit()
+    logger.info(f"Migrated {updated} online embeddings")
+    return updated
+
+def prepare_watchlist_sync(db: psycopg2.extensions.connection) -> None:
+    """Add change tracking to `wanted_individuals` for incremental syncs.
+
+    Adds an indexed `updated_at` column maintained by a trigger, and a
+    `wanted_individuals_deleted` tombstone table filled on DELETE.
+    Idempotent.
+
+    Args:
+        db: Database connection.
+    """
+    with db.cursor() as cursor:
+        cursor.execute("ALTER TABLE wanted_individuals ADD COLUMN IF NOT EXISTS face_embedding BYTEA")
+        cursor.execute("ALTER TABLE wanted_individuals "
+                       "ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()")
+        cursor.execute("CREATE INDEX IF NOT EXISTS wanted_individuals_updated_at_idx "
+                       "ON wanted_individuals (updated_at, id)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS wanted_individuals_deleted (
+                id BIGINT PRIMARY KEY,
+                deleted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS wanted_individuals_deleted_at_idx "
+                       "ON wanted_individuals_deleted (deleted_at)")
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION wanted_individuals_track_changes() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    INSERT INTO wanted_individuals_deleted (id, deleted_at) VALUES (OLD.id, now())
+                    ON CONFLICT (id) DO UPDATE SET deleted_at = excluded.deleted_at;
+                    RETURN OLD;
+                END IF;
+                NEW.updated_at := now();
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute("DROP TRIGGER IF EXISTS wanted_individuals_changes ON wanted_individuals")
+        cursor.execute("CREATE TRIGGER wanted_individuals_changes "
+                       "BEFORE INSERT OR UPDATE OR DELETE ON wanted_individuals "
+                       "FOR EACH ROW EXECUTE FUNCTION wanted_individuals_track_changes()")
+    db.commit()
+    logger.info("Watchlist change tracking prepared")
+
+def fetch_watchlist_deletions(db: psycopg2.extensions.connection, since: Optional[Any]) -> List[Tuple[int, Any]]:
+    """Fetch watchlist tombstones recorded since a point in time.
+
+    Args:
+        db: Database connection.
+        since: Lower bound on `deleted_at`, or None for all.
+
+    Returns:
+        List of (id, deleted_at); empty if change tracking is not prepared.
+    """
+    try:
+        with db.cursor() as cursor:
+            if since is None:
+                cursor.execute("SELECT id, deleted_at FROM wanted_individuals_deleted")
+            else:
+                cursor.execute("SELECT id, deleted_at FROM wanted_individuals_deleted WHERE deleted_at >= %s",
+                               (since,))
+            return cursor.fetchall()
+    except psycopg2.errors.UndefinedTable:
+        db.rollback()
+        logger.warning("No watchlist tombstone table; deletions are not synced (run sync-watchlist --prepare)")
+        return []
+
+def iter_watchlist_changes(db: psycopg2.extensions.connection, since: Optional[Any],
+                           batch_size: int = 1000) -> Iterator[List[tuple]]:
+    """Stream watchlist rows changed since a point in time through a server-side cursor.
+
+    Args:
+        db: Database connection.
+        since: Lower bound on `updated_at`, or None for every row.
+        batch_size: Rows fetched per round trip.
+
+    Yields:
+        Lists of (id, face_embedding, face_encoding, name, age, nationality,
+        crime, danger_level, updated_at) rows in `updated_at` order.
+    """
+    query = ("SELECT id, face_embedding, face_encoding, name, age, nationality, crime, danger_level, updated_at "
+             "FROM wanted_individuals")
+    with db.cursor(name="watchlist_sync") as reader:
+        reader.itersize = batch_size
+        if since is None:
+            reader.execute(f"{query} ORDER BY updated_at, id")
+        else:
+            reader.execute(f"{query} WHERE updated_at >= %s ORDER BY updated_at, id", (since,))
+        while True:
+            rows = reader.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
@@ -0,0 +1,65 @@
+"""Module for sharing MTCNN face detectors across the process."""
+import threading
+import time
+import numpy as np
+from mtcnn import MTCNN
+from logging_config import get_logger
+from typing import Dict, Tuple
+
+logger = get_logger()
+
+DetectorKey = Tuple[int, float]
+
+# إعدادات المُكتشف الافتراضية لتحليل الصور وللبث المباشر
+IMAGE_DETECTOR_CONFIG: DetectorKey = (40, 0.8)
+LIVE_FEED_DETECTOR_CONFIG: DetectorKey = (20, 0.709)
+
+_detectors: Dict[DetectorKey, MTCNN] = {}
+_warmed_up: set = set()
+_registry_lock = threading.Lock()
+
+def get_detector(min_face_size: int = 40, scale_factor: float = 0.8) -> MTCNN:
+    """Get the shared MTCNN detector for a configuration, building it on first use.
+
+    Args:
+        min_face_size: Minimum face size in pixels.
+        scale_factor: Image pyramid scale factor.
+
+    Returns:
+        Shared MTCNN detector for this configuration.
+    """
+    key = (int(min_face_size), float(scale_factor))
+    detector = _detectors.get(key)
+    if detector is not None:
+        return detector
+    with _registry_lock:
+        detector = _detectors.get(key)
+        if detector is None:
+            start = time.perf_counter()
+            detector = MTCNN(min_face_size=key[0], scale_factor=key[1])
+            _detectors[key] = detector
+            logger.info(f"Detector {key} built in {time.perf_counter() - start:.2f}s")
+    return detector
+
+def warm_up(min_face_size: int = 40, scale_factor: float = 0.8) -> MTCNN:
+    """Build a detector and run one inference so the first real call is fast.
+
+    Args:
+        min_face_size: Minimum face size in pixels.
+        scale_factor: Image pyramid scale factor.
+
+    Returns:
+        Warmed-up MTCNN detector.
+    """
+    detector = get_detector(min_face_size, scale_factor)
+    key = (int(min_face_size), float(scale_factor))
+    if key in _warmed_up:
+        return detector
+    try:
+        start = time.perf_counter()
+        detector.detect_faces(np.zeros((240, 320, 3), dtype=np.uint8))
+        _warmed_up.add(key)
+        logger.info(f"Detector {key} warmed up in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        logger.error(f"Detector warm-up failed: {e}")
+    return detector
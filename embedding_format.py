@@ -0,0 +1,114 @@
+"""Module for the versioned binary face-embedding format.
+
+Layout (little-endian)::
+
+    magic   2s   b"FE"
+    version B    format version (1)
+    dtype   B    1 = float16, 2 = int8
+    dim     I    number of components
+    scale   f    int8 dequantization scale (1.0 for float16)
+    data    dim * itemsize bytes
+
+Vectors are mean-centered and L2-normalized before packing, so int8 values
+are quantized against a known range and the payload loads with
+`np.frombuffer` without parsing.
+"""
+import struct
+import numpy as np
+from typing import Iterable, Tuple
+
+MAGIC = b"FE"
+VERSION = 1
+HEADER = struct.Struct("<2sBBIf")
+HEADER_SIZE = HEADER.size
+DTYPES = {1: np.dtype("<f2"), 2: np.dtype("i1")}
+DTYPE_CODES = {"float16": 1, "int8": 2}
+DEFAULT_DTYPE = "int8"
+
+def normalize_embeddings(vectors: np.ndarray) -> np.ndarray:
+    """Mean-center and L2-normalize embeddings row by row.
+
+    Args:
+        vectors: Array of shape (n, dim) or (dim,).
+
+    Returns:
+        Contiguous float32 array of the same shape with unit-norm rows.
+    """
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    matrix = matrix - matrix.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+    return matrix if np.ndim(vectors) > 1 else matrix[0]
+
+def is_packed(data: bytes) -> bool:
+    """Check whether a buffer starts with the embedding format header."""
+    return len(data) >= HEADER_SIZE and data[:2] == MAGIC
+
+def pack(vector: np.ndarray, dtype: str = DEFAULT_DTYPE) -> bytes:
+    """Normalize and serialize an embedding.
+
+    Args:
+        vector: Raw embedding of shape (dim,).
+        dtype: Storage type, "int8" or "float16".
+
+    Returns:
+        Header followed by the quantized vector.
+    """
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    unit = normalize_embeddings(np.ravel(vector))
+    scale = 1.0
+    if dtype == "int8":
+        peak = float(np.abs(unit).max())
+        scale = peak / 127 if peak else 1.0
+        payload = np.round(unit / scale).astype(np.int8)
+    else:
+        payload = unit.astype("<f2")
+    return HEADER.pack(MAGIC, VERSION, DTYPE_CODES[dtype], unit.size, scale) + payload.tobytes()
+
+def view(data: bytes) -> Tuple[np.ndarray, float]:
+    """Map a packed embedding without copying.
+
+    Args:
+        data: Packed embedding.
+
+    Returns:
+        Tuple of (read-only stored vector, dequantization scale).
+
+    Raises:
+        ValueError: If the buffer is not a packed embedding or is truncated.
+    """
+    if not is_packed(data):
+        raise ValueError("Unrecognized embedding format")
+    magic, version, code, dim, scale = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or code not in DTYPES:
+        raise ValueError("Unrecognized embedding format")
+    return np.frombuffer(data, dtype=DTYPES[code], count=dim, offset=HEADER_SIZE), scale
+
+def unpack(data: bytes) -> np.ndarray:
+    """Deserialize an embedding to float32.
+
+    Args:
+        data: Packed embedding.
+
+    Returns:
+        Embedding as float32 vector.
+
+    Raises:
+        ValueError: If the buffer is not a packed embedding or is truncated.
+    """
+    vector, scale = view(data)
+    return vector.astype(np.float32) * np.float32(scale)
+
+def unpack_many(buffers: Iterable[bytes]) -> np.ndarray:
+    """Deserialize several same-length embeddings into one matrix.
+
+    Args:
+        buffers: Packed embeddings.
+
+    Returns:
+        Float32 matrix of shape (n, dim).
+    """
+    vectors = [unpack(data) for data in buffers]
+    return np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
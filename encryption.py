@@ -1,25 +1,207 @@
 """Module for secure encryption and decryption using AES-256-GCM."""
 import os
 import base64
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+import hashlib
+import hmac
+import json
+import threading
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import hashes
-from logging_config import configure_logging
+from logging_config import get_logger
+from metrics import STAGE_SECONDS
+from typing import Iterable, List, Optional, Tuple
 
-logger = configure_logging()
+logger = get_logger()
 
-def initialize_cipher() -> bytes:
-    """Initialize AES-256 key from environment variables."""
+IV_SIZE = 16
+TAG_SIZE = 16
+
+_key: Optional[bytes] = None
+_aead: Optional[AESGCM] = None
+_key_lock = threading.Lock()
+
+def initialize_cipher(salt: Optional[bytes] = None) -> bytes:
+    """Derive the AES-256 key from environment variables.
+
+    Args:
+        salt: Salt to use; defaults to ENCRYPTION_SALT.
+
+    Returns:
+        32-byte derived key.
+    """
     password = os.getenv("ENCRYPTION_PASSWORD")
     if not password:
         logger.error("Encryption password not set")
         raise ValueError("Encryption password required")
-    
-    salt = base64.b64decode(os.getenv("ENCRYPTION_SALT", base64.b64encode(os.urandom(16)).decode()))
+
+    if salt is None:
+        salt = _configured_salt()
     kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=1000000)
     return kdf.derive(password.encode())
 
-encryption_key = initialize_cipher()
+def _configured_salt() -> bytes:
+    """Return ENCRYPTION_SALT, or a fresh random salt with a warning if it is unset."""
+    salt = os.getenv("ENCRYPTION_SALT")
+    if salt:
+        return base64.b64decode(salt)
+    logger.warning("ENCRYPTION_SALT not set, data encrypted by this process will not be readable by others")
+    return os.urandom(16)
+
+def _key_check(key: bytes) -> str:
+    """Bind a cached key to the current encryption password."""
+    return hmac.new(key, os.getenv("ENCRYPTION_PASSWORD", "").encode(), hashlib.sha256).hexdigest()
+
+def _read_key_cache(path: str) -> Optional[Tuple[bytes, bytes]]:
+    """Read (salt, key) from the key cache if it is private and still valid."""
+    try:
+        info = os.stat(path)
+        if info.st_uid != os.getuid() or info.st_mode & 0o077:
+            logger.warning("Ignoring key cache with unsafe owner or permissions")
+            return None
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+        salt, key = base64.b64decode(cached["salt"]), base64.b64decode(cached["key"])
+        configured = os.getenv("ENCRYPTION_SALT")
+        if configured and base64.b64decode(configured) != salt:
+            return None
+        if not hmac.compare_digest(cached["check"], _key_check(key)):
+            return None
+        return salt, key
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable key cache: {e}")
+        return None
+
+def _write_key_cache(path: str, salt: bytes, key: bytes) -> None:
+    """Write (salt, key) to the key cache, readable by the owner only."""
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"salt": base64.b64encode(salt).decode(), "key": base64.b64encode(key).decode(),
+                       "check": _key_check(key)}, f)
+    except Exception as e:
+        logger.warning(f"Unable to write key cache: {e}")
+
+def get_key() -> bytes:
+    """Get the AES-256 key, deriving it on first use.
+
+    The 1,000,000-iteration PBKDF2 runs at most once per process. If
+    ENCRYPTION_KEY_CACHE names a file (e.g. under $XDG_RUNTIME_DIR), the
+    derived key is shared through it for the rest of the host session; the
+    file is created with mode 0600 and ignored if anyone else can read it.
+
+    Returns:
+        32-byte AES key.
+    """
+    global _key
+    if _key is not None:
+        return _key
+    with _key_lock:
+        if _key is None:
+            cache_path = os.getenv("ENCRYPTION_KEY_CACHE")
+            cached = _read_key_cache(cache_path) if cache_path else None
+            if cached:
+                _key = cached[1]
+            else:
+                salt = _configured_salt()
+                _key = initialize_cipher(salt)
+                if cache_path:
+                    _write_key_cache(cache_path, salt, _key)
+        return _key
+
+def export_key() -> bytes:
+    """Return the derived key for handing to worker processes."""
+    return get_key()
+
+def install_key(key: bytes) -> None:
+    """Install a key derived by a parent process so this process skips PBKDF2.
+
+    Args:
+        key: 32-byte AES key from `export_key`.
+    """
+    global _key, _aead
+    if len(key) != 32:
+        raise ValueError("Encryption key must be 32 bytes")
+    with _key_lock:
+        _key, _aead = key, None
+
+def _get_aead() -> AESGCM:
+    """Get the reusable AES-GCM context for the current key."""
+    global _aead
+    aead = _aead
+    if aead is None:
+        aead = _aead = AESGCM(get_key())
+    return aead
+
+def __getattr__(name: str):
+    """Keep `encryption.encryption_key` working without deriving at import."""
+    if name == "encryption_key":
+        return get_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def encrypt_many(items: Iterable[bytes]) -> List[bytes]:
+    """Encrypt several byte strings with one AES-GCM context.
+
+    Args:
+        items: Byte strings to encrypt.
+
+    Returns:
+        Raw encrypted data (IV + tag + ciphertext) for each item.
+    """
+    try:
+        aead = _get_aead()
+        encrypted = []
+        with STAGE_SECONDS.time(stage="encrypt"):
+            for data in items:
+                iv = os.urandom(IV_SIZE)
+                sealed = aead.encrypt(iv, data, None)
+                encrypted.append(iv + sealed[-TAG_SIZE:] + sealed[:-TAG_SIZE])
+        return encrypted
+    except Exception as e:
+        logger.error("Encryption failed: %s", e)
+        raise
+
+def decrypt_many(items: Iterable[bytes]) -> List[bytes]:
+    """Decrypt several byte strings with one AES-GCM context.
+
+    Args:
+        items: Raw encrypted data (IV + tag + ciphertext).
+
+    Returns:
+        Decrypted bytes for each item.
+    """
+    try:
+        aead = _get_aead()
+        with STAGE_SECONDS.time(stage="decrypt"):
+            return [aead.decrypt(data[:IV_SIZE], data[IV_SIZE + TAG_SIZE:] + data[IV_SIZE:IV_SIZE + TAG_SIZE], None)
+                    for data in items]
+    except Exception as e:
+        logger.error("Decryption failed: %s", e)
+        raise
+
+def encrypt_bytes(data: bytes) -> bytes:
+    """Encrypt binary data using AES-256-GCM.
+
+    Args:
+        data: Bytes to encrypt.
+
+    Returns:
+        Raw encrypted data (IV + tag + ciphertext).
+    """
+    return encrypt_many([data])[0]
+
+def decrypt_bytes(data: bytes) -> bytes:
+    """Decrypt binary data using AES-256-GCM.
+
+    Args:
+        data: Raw encrypted data (IV + tag + ciphertext).
+
+    Returns:
+        Decrypted bytes.
+    """
+    return decrypt_many([data])[0]
 
 def encrypt_data(data: str) -> str:
     """Encrypt data using AES-256-GCM.
@@ -30,15 +212,7 @@ def encrypt_data(data: str) -> str:
     Returns:
         Base64-encoded encrypted data (IV + tag + ciphertext).
     """
-    try:
-        iv = os.urandom(16)
-        cipher = Cipher(algorithms.AES(encryption_key), modes.GCM(iv))
-        encryptor = cipher.encryptor()
-        encrypted = encryptor.update(data.encode()) + encryptor.finalize()
-        return base64.b64encode(iv + encryptor.tag + encrypted).decode()
-    except Exception as e:
-        logger.error(f"Encryption failed: {e}")
-        raise
+    return base64.b64encode(encrypt_bytes(data.encode())).decode()
 
 def decrypt_data(data: str) -> str:
     """Decrypt data using AES-256-GCM.
@@ -49,12 +223,4 @@ def decrypt_data(data: str) -> str:
     Returns:
         Decrypted string.
     """
-    try:
-        raw = base64.b64decode(data)
-        iv, tag, encrypted = raw[:16], raw[16:32], raw[32:]
-        cipher = Cipher(algorithms.AES(encryption_key), modes.GCM(iv, tag))
-        decryptor = cipher.decryptor()
-        return (decryptor.update(encrypted) + decryptor.finalize()).decode()
-    except Exception as e:
-        logger.error(f"Decryption failed: {e}")
-        raise
\ No newline at end of file
+    return decrypt_bytes(base64.b64decode(data)).decode()
\ No newline at end of file
@@ -0,0 +1,263 @@
+"""Module for in-memory nearest-neighbour matching against the watchlist."""
+import os
+import threading
+import time
+import numpy as np
+from database_manager import decode_stored_embedding, fetch_watchlist, get_offline_store, get_pool
+from embedding_format import normalize_embeddings
+from logging_config import get_logger
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = get_logger()
+
+DEFAULT_MATCH_THRESHOLD = float(os.getenv("MATCH_THRESHOLD", 0.5))
+DEFAULT_REFRESH_SECONDS = float(os.getenv("WATCHLIST_REFRESH_SECONDS", 300))
+
+Record = Tuple[str, int, str, str, str]
+IndexSnapshot = Tuple[np.ndarray, np.ndarray, Tuple[Record, ...]]
+WatchlistLoader = Callable[[], Tuple[Sequence[int], np.ndarray, List[Record]]]
+WatchlistChange = Tuple[int, np.ndarray, Record]
+
+def load_watchlist_index(offline_mode: bool = False) -> Tuple[List[int], np.ndarray, List[Record]]:
+    """Load all watchlist embeddings and records from the database.
+
+    Args:
+        offline_mode: Whether to read from the offline SQLite database.
+
+    Returns:
+        Tuple of (ids, embedding matrix, records) aligned by row.
+    """
+    if offline_mode:
+        ids, vectors, records = get_offline_store().load_all()
+    else:
+        with get_pool().connection() as db:
+            rows = fetch_watchlist(db)
+        ids, vectors, records = [], [], []
+        for entry_id, face_embedding, face_encoding, *record in rows:
+            try:
+                vector, _ = decode_stored_embedding(face_embedding, face_encoding)
+            except Exception as e:
+                logger.error(f"Skipping unreadable watchlist entry {entry_id}: {e}")
+                continue
+            if vector is not None:
+                ids.append(entry_id)
+                vectors.append(vector)
+                records.append(tuple(record))
+
+    if not vectors:
+        return [], np.empty((0, 0), dtype=np.float32), []
+    dims = {v.shape[0] for v in vectors}
+    if len(dims) > 1:
+        dim = max(dims, key=lambda d: sum(v.shape[0] == d for v in vectors))
+        logger.warning(f"Dropping watchlist entries whose dimension is not {dim}")
+        kept = [(i, v, r) for i, v, r in zip(ids, vectors, records) if v.shape[0] == dim]
+        ids, vectors, records = [i for i, _, _ in kept], [v for _, v, _ in kept], [r for _, _, r in kept]
+    return ids, np.stack(vectors), records
+
+class FaceMatcher:
+    """Vectorized top-k matcher over an in-memory watchlist matrix.
+
+    The watchlist is held as one contiguous (n, dim) float32 matrix of unit-norm
+    rows, so a batch of queries is answered with a single matrix product. The
+    matrix, ids and records form one immutable (matrix, ids, records)
+    snapshot; a reload builds a new one and swaps it in with a single
+    assignment, so readers never block and never mix two generations.
+    """
+
+    def __init__(self, loader: WatchlistLoader, threshold: float = DEFAULT_MATCH_THRESHOLD,
+                 top_k: int = 1, refresh_seconds: float = DEFAULT_REFRESH_SECONDS):
+        """Initialize the matcher without loading the watchlist.
+
+        Args:
+            loader: Callable returning (ids, embedding matrix, records).
+            threshold: Maximum Euclidean distance for a match.
+            top_k: Default number of candidates per query.
+            refresh_seconds: Age after which `reload_if_stale` reloads.
+        """
+        self._loader = loader
+        self.threshold = threshold
+        self.top_k = top_k
+        self.refresh_seconds = refresh_seconds
+        self._reload_lock = threading.Lock()
+        self._index: IndexSnapshot = (np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=np.int64), ())
+        self._loaded_at: Optional[float] = None
+        self.generation = 0
+
+    @property
+    def size(self) -> int:
+        """Number of watchlist entries currently loaded."""
+        return len(self._index[2])
+
+    def reload(self) -> int:
+        """Load the watchlist and atomically swap in the new index.
+
+        Returns:
+            Number of loaded entries.
+        """
+        with self._reload_lock:
+            return self._reload_locked()
+
+    def _reload_locked(self) -> int:
+        """Load and swap in the index; the caller holds `_reload_lock`."""
+        ids, matrix, records = self._loader()
+        matrix = normalize_embeddings(matrix) if len(records) else np.empty((0, 0), dtype=np.float32)
+        self._index = (matrix, np.asarray(ids, dtype=np.int64), tuple(records))
+        self._loaded_at = time.monotonic()
+        self.generation += 1
+        logger.info(f"Watchlist index loaded: {len(records)} entries")
+        return len(records)
+
+    def apply_changes(self, upserts: Sequence[WatchlistChange], deleted_ids: Iterable[int] = ()) -> int:
+        """Patch the loaded index with changed and deleted entries and swap it in.
+
+        Only the changed rows are normalized; the rest of the matrix is
+        reused, so small syncs cost far less than a `reload`.
+
+        Args:
+            upserts: (id, raw embedding, record) for new or changed entries.
+            deleted_ids: Ids of removed entries.
+
+        Returns:
+            Number of entries in the patched index.
+        """
+        deleted_ids = list(deleted_ids)
+        with self._reload_lock:
+            if self._loaded_at is None:
+                return 0
+            old_matrix, old_ids, old_records = self._index
+            dim = old_matrix.shape[1] if old_records else None
+            fresh = [(i, v, r) for i, v, r in upserts if dim is None or v.shape[0] == dim]
+            if dim is None and fresh:
+                fresh = [(i, v, r) for i, v, r in fresh if v.shape[0] == fresh[0][1].shape[0]]
+            if len(fresh) < len(upserts):
+                logger.warning(f"Dropping {len(upserts) - len(fresh)} changed entries with a different dimension")
+
+            changed = np.asarray([i for i, _, _ in upserts] + list(deleted_ids), dtype=np.int64)
+            keep = ~np.isin(old_ids, changed)
+            ids = old_ids[keep]
+            records = [record for record, kept in zip(old_records, keep) if kept]
+            matrix = old_matrix[keep] if len(records) else None
+            if fresh:
+                new_matrix = normalize_embeddings(np.stack([v for _, v, _ in fresh]))
+                matrix = new_matrix if matrix is None else np.concatenate([matrix, new_matrix])
+                ids = np.concatenate([ids, np.asarray([i for i, _, _ in fresh], dtype=np.int64)])
+                records.extend(tuple(r) for _, _, r in fresh)
+            if matrix is None:
+                matrix = np.empty((0, 0), dtype=np.float32)
+            self._index = (matrix, ids, tuple(records))
+            self.generation += 1
+            logger.info(f"Watchlist index patched: {len(fresh)} changed, {len(deleted_ids)} deleted, "
+                        f"{len(records)} entries")
+            return len(records)
+
+    def reload_if_stale(self) -> None:
+        """Reload the index if it was never loaded or is older than `refresh_seconds`.
+
+        Concurrent callers wait for a single reload instead of each reloading.
+        """
+        if not self._is_stale():
+            return
+        with self._reload_lock:
+            if not self._is_stale():
+                return
+            try:
+                self._reload_locked()
+            except Exception as e:
+                logger.error(f"Watchlist reload failed: {e}")
+                if self._loaded_at is None:
+                    raise
+
+    def _is_stale(self) -> bool:
+        """Whether the index was never loaded or is older than `refresh_seconds`."""
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    def match(self, queries: np.ndarray, top_k: Optional[int] = None,
+              threshold: Optional[float] = None) -> List[List[Tuple[Record, float]]]:
+        """Find the nearest watchlist entries for a batch of query embeddings.
+
+        Args:
+            queries: Array of shape (m, dim) or (dim,) of raw embeddings.
+            top_k: Number of candidates per query; defaults to `self.top_k`.
+            threshold: Maximum distance; defaults to `self.threshold`.
+
+        Returns:
+            For each query, a list of (record, distance) sorted by distance,
+            containing only candidates within the threshold.
+        """
+        matrix, _, records = self._index
+        queries = np.atleast_2d(queries)
+        if not records or queries.shape[0] == 0:
+            return [[] for _ in range(queries.shape[0])]
+        if queries.shape[1] != matrix.shape[1]:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match index {matrix.shape[1]}")
+
+        top_k = min(top_k or self.top_k, len(records))
+        threshold = self.threshold if threshold is None else threshold
+        similarities = normalize_embeddings(queries) @ matrix.T
+        if top_k < len(records):
+            candidates = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+        else:
+            candidates = np.broadcast_to(np.arange(len(records)), similarities.shape)
+        candidate_sims = np.take_along_axis(similarities, candidates, axis=1)
+        order = np.argsort(-candidate_sims, axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        distances = np.sqrt(np.clip(2.0 - 2.0 * np.take_along_axis(candidate_sims, order, axis=1), 0.0, None))
+
+        results = []
+        for row_idx, row_dist in zip(candidates, distances):
+            results.append([(records[i], float(d)) for i, d in zip(row_idx, row_dist) if d <= threshold])
+        return results
+
+_matchers: Dict[bool, FaceMatcher] = {}
+_matchers_lock = threading.Lock()
+
+def get_matcher(offline_mode: bool = False) -> FaceMatcher:
+    """Get the process-wide matcher for the online or offline watchlist.
+
+    The index is loaded on first use and reloaded once it is older than
+    `WATCHLIST_REFRESH_SECONDS`.
+
+    Args:
+        offline_mode: Whether to match against the offline watchlist.
+
+    Returns:
+        Loaded FaceMatcher instance.
+    """
+    with _matchers_lock:
+        matcher = _matchers.get(offline_mode)
+        if matcher is None:
+            matcher = FaceMatcher(lambda: load_watchlist_index(offline_mode))
+            _matchers[offline_mode] = matcher
+    matcher.reload_if_stale()
+    return matcher
+
+def set_matcher(offline_mode: bool, matcher: FaceMatcher) -> None:
+    """Install a preloaded matcher as the process-wide one (e.g. a synthetic watchlist).
+
+    Args:
+        offline_mode: Which watchlist the matcher replaces.
+        matcher: Matcher to return from `get_matcher`.
+    """
+    with _matchers_lock:
+        _matchers[offline_mode] = matcher
+
+def apply_watchlist_changes(upserts: Sequence[WatchlistChange], deleted_ids: Iterable[int] = (),
+                            reload: bool = False) -> None:
+    """Bring every matcher loaded in this process up to date after a watchlist sync.
+
+    Args:
+        upserts: (id, raw embedding, record) for new or changed entries.
+        deleted_ids: Ids of removed entries.
+        reload: Reload the indexes from the database instead of patching.
+    """
+    deleted_ids = list(deleted_ids)
+    with _matchers_lock:
+        matchers = list(_matchers.values())
+    for matcher in matchers:
+        try:
+            if reload:
+                matcher.reload()
+            else:
+                matcher.apply_changes(upserts, deleted_ids)
+        except Exception as e:
+            logger.error(f"Watchlist index refresh failed: {e}")
@@ -0,0 +1,151 @@
+"""Module for tracking faces across frames and caching their identification."""
+import itertools
+import os
+import time
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+Location = Tuple[int, int, int, int]
+Match = Tuple[Tuple[str, int, str, str, str], float]
+
+DEFAULT_REIDENTIFY_SECONDS = float(os.getenv("TRACK_REIDENTIFY_SECONDS", 2.0))
+DEFAULT_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", 0.3))
+
+class Track:
+    """A face followed across frames, with its cached identification."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, location: Location, confidence: float):
+        """Initialize a new track.
+
+        Args:
+            location: Face box (top, right, bottom, left).
+            confidence: Detector confidence of the first detection.
+        """
+        self.track_id = next(self._ids)
+        self.location = location
+        self.confidence = confidence
+        self.missed = 0
+        self.match: Optional[Match] = None
+        self.identified_at: Optional[float] = None
+        self.identified_confidence = 0.0
+
+def _iou_matrix(a: Sequence[Location], b: Sequence[Location]) -> np.ndarray:
+    """Compute pairwise IoU between two lists of (top, right, bottom, left) boxes."""
+    boxes_a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    top = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    right = np.minimum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    bottom = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    left = np.maximum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    inter = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (boxes_a[:, 1] - boxes_a[:, 3]) * (boxes_a[:, 2] - boxes_a[:, 0])
+    area_b = (boxes_b[:, 1] - boxes_b[:, 3]) * (boxes_b[:, 2] - boxes_b[:, 0])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+def _centroid_distance(a: Location, b: Location) -> float:
+    """Distance between box centres relative to the size of box `a`."""
+    size = max(a[1] - a[3], a[2] - a[0], 1)
+    dy = (a[0] + a[2] - b[0] - b[2]) / 2
+    dx = (a[1] + a[3] - b[1] - b[3]) / 2
+    return float(np.hypot(dx, dy)) / size
+
+class FaceTracker:
+    """Greedy IoU/centroid tracker for one camera.
+
+    Detections are matched to existing tracks by IoU, falling back to
+    centroid distance for fast motion. A track is re-identified only when it
+    is new, when `reidentify_seconds` have passed, or when the detector's
+    confidence dropped by more than `confidence_drop` since the last lookup.
+    """
+
+    def __init__(self, iou_threshold: float = DEFAULT_IOU_THRESHOLD, max_missed: int = 10,
+                 max_centroid_distance: float = 0.5, reidentify_seconds: float = DEFAULT_REIDENTIFY_SECONDS,
+                 confidence_drop: float = 0.1):
+        """Initialize an empty tracker.
+
+        Args:
+            iou_threshold: Minimum IoU to continue a track.
+            max_missed: Frames a track survives without detections.
+            max_centroid_distance: Fallback centre distance, relative to box size.
+            reidentify_seconds: Maximum age of a cached identification.
+            confidence_drop: Confidence decrease that forces re-identification.
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.max_centroid_distance = max_centroid_distance
+        self.reidentify_seconds = reidentify_seconds
+        self.confidence_drop = confidence_drop
+        self.tracks: List[Track] = []
+
+    def update(self, locations: Sequence[Location], confidences: Optional[Sequence[float]] = None) -> List[Track]:
+        """Assign this frame's detections to tracks.
+
+        Args:
+            locations: Face boxes (top, right, bottom, left).
+            confidences: Detector confidence per box; defaults to 1.0.
+
+        Returns:
+            Track for each detection, in detection order.
+        """
+        confidences = list(confidences) if confidences is not None else [1.0] * len(locations)
+        assigned: List[Optional[Track]] = [None] * len(locations)
+        free_tracks = set(range(len(self.tracks)))
+
+        if self.tracks and locations:
+            iou = _iou_matrix([t.location for t in self.tracks], locations)
+            for flat in np.argsort(-iou, axis=None):
+                t_idx, d_idx = divmod(int(flat), len(locations))
+                if iou[t_idx, d_idx] < self.iou_threshold:
+                    break
+                if t_idx in free_tracks and assigned[d_idx] is None:
+                    assigned[d_idx] = self.tracks[t_idx]
+                    free_tracks.discard(t_idx)
+
+        for d_idx, location in enumerate(locations):
+            if assigned[d_idx] is None and free_tracks:
+                t_idx = min(free_tracks, key=lambda i: _centroid_distance(self.tracks[i].location, location))
+                if _centroid_distance(self.tracks[t_idx].location, location) <= self.max_centroid_distance:
+                    assigned[d_idx] = self.tracks[t_idx]
+                    free_tracks.discard(t_idx)
+            if assigned[d_idx] is None:
+                assigned[d_idx] = Track(location, confidences[d_idx])
+                self.tracks.append(assigned[d_idx])
+            track = assigned[d_idx]
+            track.location, track.confidence, track.missed = location, confidences[d_idx], 0
+
+        for t_idx in free_tracks:
+            self.tracks[t_idx].missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return assigned
+
+    def needs_identification(self, track: Track, now: Optional[float] = None) -> bool:
+        """Check whether a track's cached identification must be refreshed.
+
+        Args:
+            track: Track returned by `update`.
+            now: Current time from `time.monotonic`; defaults to now.
+
+        Returns:
+            True if the track should be looked up again.
+        """
+        if track.identified_at is None:
+            return True
+        now = time.monotonic() if now is None else now
+        return (now - track.identified_at >= self.reidentify_seconds
+                or track.confidence < track.identified_confidence - self.confidence_drop)
+
+    @staticmethod
+    def record_identification(track: Track, match: Optional[Match], now: Optional[float] = None) -> None:
+        """Cache the identification result of a track.
+
+        Args:
+            track: Track that was looked up.
+            match: Best (record, distance) match, or None.
+            now: Current time from `time.monotonic`; defaults to now.
+        """
+        track.match = match
+        track.identified_at = time.monotonic() if now is None else now
+        track.identified_confidence = track.confidence
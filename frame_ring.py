@@ -0,0 +1,356 @@
+"""Module for passing camera frames between processes through shared memory."""
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from logging_config import get_logger
+from metrics import CAMERA_FRAMES
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+logger = get_logger()
+
+DEFAULT_RING_SLOTS = int(os.getenv("FRAME_RING_SLOTS", 8))
+DEFAULT_MAX_FRAME_AGE = float(os.getenv("FRAME_MAX_AGE_SECONDS", 1.0))
+
+# أعمدة جدول التحكم لكل كاميرا، وأعمدة ترويسة كل خانة
+_LATEST_SEQ, _LATEST_SLOT, _FULL_DROPS = range(3)
+_SLOT_SEQ, _SLOT_TIME, _SLOT_PINS = range(3)
+
+class FrameRing:
+    """Fixed-slot frame buffers in one shared memory block.
+
+    Every camera owns `slots` frame buffers of (height, width, 3) uint8 and
+    has a single writer. The writer fills a free slot in place and then
+    publishes it with an increasing sequence number; readers take the latest
+    published slot as a zero-copy view and pin it until released. A slot
+    is reused only when it is neither pinned nor the latest one, so a view
+    is never overwritten while in use. A per-camera lock guards only slot
+    selection, publication and pinning, never the frame copy.
+    """
+
+    def __init__(self, cameras: int, slots: int = DEFAULT_RING_SLOTS, width: int = 640, height: int = 480,
+                 name: Optional[str] = None, locks: Optional[Sequence] = None, ready=None):
+        """Create a new ring, or attach to an existing one when `name` is given.
+
+        Args:
+            cameras: Number of cameras.
+            slots: Frame buffers per camera (at least 3).
+            width: Frame width.
+            height: Frame height.
+            name: Shared memory block to attach to.
+            locks: Per-camera locks of an existing ring.
+            ready: Event of an existing ring, set whenever a frame is published.
+        """
+        self.cameras, self.slots, self.width, self.height = cameras, max(slots, 3), width, height
+        self.owner = name is None
+        control_size = cameras * 3 * 8
+        header_size = cameras * self.slots * 3 * 8
+        frames_size = cameras * self.slots * height * width * 3
+        self._shm = shared_memory.SharedMemory(name=name, create=self.owner,
+                                               size=control_size + header_size + frames_size)
+        buf = self._shm.buf
+        self.control = np.ndarray((cameras, 3), dtype=np.int64, buffer=buf)
+        self.headers = np.ndarray((cameras, self.slots, 3), dtype=np.int64, buffer=buf, offset=control_size)
+        self.frames = np.ndarray((cameras, self.slots, height, width, 3), dtype=np.uint8, buffer=buf,
+                                 offset=control_size + header_size)
+        if self.owner:
+            self.control[:] = 0
+            self.control[:, _LATEST_SLOT] = -1
+            self.headers[:] = 0
+        context = multiprocessing.get_context("spawn")
+        self.locks = list(locks) if locks is not None else [context.Lock() for _ in range(cameras)]
+        self.ready = ready if ready is not None else context.Event()
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self._shm.name
+
+    def __getstate__(self) -> Dict:
+        # تُمرَّر الحلقة إلى العمليات الفرعية بالاسم، ويُعاد الربط بالذاكرة المشتركة نفسها
+        return {"cameras": self.cameras, "slots": self.slots, "width": self.width, "height": self.height,
+                "name": self.name, "locks": self.locks, "ready": self.ready}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(**state)
+
+    def write(self, position: int, frame: np.ndarray) -> bool:
+        """Copy a frame into a free slot, resizing it in place, and publish it.
+
+        Args:
+            position: Camera position in the ring.
+            frame: BGR frame of any size.
+
+        Returns:
+            False if every slot was pinned and the frame was dropped.
+        """
+        import cv2
+        lock, headers, control = self.locks[position], self.headers[position], self.control[position]
+        with lock:
+            latest = control[_LATEST_SLOT]
+            slot = next((s for s in range(self.slots) if s != latest and headers[s, _SLOT_PINS] == 0), None)
+            if slot is None:
+                control[_FULL_DROPS] += 1
+                return False
+            headers[slot, _SLOT_SEQ] = -1
+        target = self.frames[position, slot]
+        if frame.shape == target.shape:
+            np.copyto(target, frame)
+        else:
+            cv2.resize(frame, (self.width, self.height), dst=target)
+        with lock:
+            seq = control[_LATEST_SEQ] + 1
+            headers[slot, _SLOT_TIME] = time.time_ns()
+            headers[slot, _SLOT_SEQ] = seq
+            control[_LATEST_SLOT] = slot
+            control[_LATEST_SEQ] = seq
+        self.ready.set()
+        return True
+
+    def latest_seq(self, position: int) -> int:
+        """Sequence number of the newest published frame of a camera (0 if none)."""
+        return int(self.control[position, _LATEST_SEQ])
+
+    def acquire(self, position: int, after_seq: int = 0) -> Optional[Tuple[np.ndarray, int, int, float]]:
+        """Pin the newest frame of a camera if it is newer than `after_seq`.
+
+        Args:
+            position: Camera position in the ring.
+            after_seq: Last sequence number already consumed.
+
+        Returns:
+            Tuple of (read-only view, sequence number, slot, capture time in
+            seconds), or None if nothing newer was published.
+        """
+        with self.locks[position]:
+            seq, slot = int(self.control[position, _LATEST_SEQ]), int(self.control[position, _LATEST_SLOT])
+            if seq <= after_seq or slot < 0:
+                return None
+            self.headers[position, slot, _SLOT_PINS] += 1
+            captured_at = self.headers[position, slot, _SLOT_TIME] / 1e9
+        view = self.frames[position, slot]
+        view.flags.writeable = False
+        return view, seq, slot, captured_at
+
+    def release(self, position: int, slot: int) -> None:
+        """Unpin a slot returned by `acquire`.
+
+        Args:
+            position: Camera position in the ring.
+            slot: Slot to unpin.
+        """
+        with self.locks[position]:
+            if self.headers[position, slot, _SLOT_PINS] > 0:
+                self.headers[position, slot, _SLOT_PINS] -= 1
+
+    def view(self, position: int, slot: int) -> np.ndarray:
+        """Read-only view of a pinned slot, e.g. in a worker process."""
+        view = self.frames[position, slot]
+        view.flags.writeable = False
+        return view
+
+    def full_drops(self, position: int) -> int:
+        """Frames the writer dropped because every slot was pinned."""
+        return int(self.control[position, _FULL_DROPS])
+
+    def close(self) -> None:
+        """Detach from the shared memory; the owner also frees it."""
+        self.control = self.headers = self.frames = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # ما زالت هناك عروض حيّة للإطارات؛ تُحرَّر الذاكرة عند انتهاء العملية
+            pass
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+class SharedFrameScheduler:
+    """Frame scheduler reading the latest frame of each camera from a FrameRing.
+
+    Drop-in replacement for `live_feed.FrameScheduler` when capture runs in
+    other processes: `get` hands out zero-copy read-only views in
+    round-robin order, and each frame stays pinned until `release`. Frames
+    older than `max_age` are skipped as stale.
+    """
+
+    zero_copy = True
+
+    def __init__(self, ring: FrameRing, camera_indices: Sequence[int], max_age: float = DEFAULT_MAX_FRAME_AGE):
+        """Initialize the scheduler.
+
+        Args:
+            ring: Frame ring written by the capture processes.
+            camera_indices: Camera index of each ring position.
+            max_age: Maximum frame age in seconds.
+        """
+        self.ring = ring
+        self.max_age = max_age
+        self._positions = {cam_idx: position for position, cam_idx in enumerate(camera_indices)}
+        self._cameras = list(camera_indices)
+        self._last_seq = [0] * len(self._cameras)
+        self._next = 0
+        self._closed = False
+        self._pinned: Dict[int, Tuple[int, int]] = {}
+        self._stats = {cam_idx: {"captured": 0, "dropped": 0, "processed": 0, "stale": 0}
+                       for cam_idx in self._cameras}
+
+    def register(self, cam_idx: int) -> None:
+        """Cameras are fixed by the ring layout; kept for interface parity."""
+        if cam_idx not in self._positions:
+            raise ValueError(f"Camera {cam_idx} has no slot in the frame ring")
+
+    def _take(self) -> Optional[Tuple[np.ndarray, int]]:
+        """Pin the next camera's newest unseen frame in round-robin order."""
+        count = len(self._cameras)
+        for offset in range(count):
+            position = (self._next + offset) % count
+            item = self.ring.acquire(position, self._last_seq[position])
+            if item is None:
+                continue
+            view, seq, slot, captured_at = item
+            cam_idx = self._cameras[position]
+            stats = self._stats[cam_idx]
+            new = seq - self._last_seq[position]
+            self._last_seq[position] = seq
+            stats["captured"] += new
+            stats["dropped"] += new - 1
+            CAMERA_FRAMES.inc(new, camera=cam_idx, state="captured")
+            if new > 1:
+                CAMERA_FRAMES.inc(new - 1, camera=cam_idx, state="dropped")
+            if time.time() - captured_at > self.max_age:
+                self.ring.release(position, slot)
+                stats["stale"] += 1
+                continue
+            self._next = (position + 1) % count
+            stats["processed"] += 1
+            CAMERA_FRAMES.inc(camera=cam_idx, state="processed")
+            self._pinned[id(view)] = (position, slot)
+            return view, cam_idx
+        return None
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[np.ndarray, int]]:
+        """Wait for the next frame in round-robin order.
+
+        Args:
+            timeout: Maximum seconds to wait.
+
+        Returns:
+            Tuple of (read-only frame view, camera index), or None on timeout
+            or close.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._closed:
+            item = self._take()
+            if item is not None:
+                return item
+            remaining = 0.05 if deadline is None else min(deadline - time.monotonic(), 0.05)
+            if remaining <= 0:
+                return None
+            self.ring.ready.wait(remaining)
+            self.ring.ready.clear()
+        return None
+
+    def locate(self, frame: np.ndarray) -> Tuple[int, int]:
+        """Ring (position, slot) of a frame handed out by `get`."""
+        return self._pinned[id(frame)]
+
+    def release(self, cam_idx: int, frame: np.ndarray) -> None:
+        """Unpin a frame once it is no longer used.
+
+        Args:
+            cam_idx: Camera index.
+            frame: Frame returned by `get`.
+        """
+        location = self._pinned.pop(id(frame), None)
+        if location is not None:
+            self.ring.release(*location)
+
+    def pending(self) -> int:
+        """Number of cameras with an unseen frame."""
+        return sum(self.ring.latest_seq(p) > seq for p, seq in enumerate(self._last_seq))
+
+    def close(self) -> None:
+        """Make `get` return None and release every pinned frame."""
+        self._closed = True
+        self.ring.ready.set()
+        for position, slot in self._pinned.values():
+            self.ring.release(position, slot)
+        self._pinned.clear()
+
+    def stats(self) -> Dict[int, Dict[str, int]]:
+        """Snapshot of per-camera captured, dropped, processed and stale counters.
+
+        Returns:
+            Mapping of camera index to its counters.
+        """
+        return {cam_idx: dict(stats, ring_full=self.ring.full_drops(self._positions[cam_idx]))
+                for cam_idx, stats in self._stats.items()}
+
+def capture_process(ring: FrameRing, position: int, source: Union[int, str], stop_event) -> None:
+    """Capture frames from one camera into its ring position until stopped.
+
+    Runs in its own process, so decoding and resizing never contend with
+    analysis for the GIL.
+
+    Args:
+        ring: Frame ring (attached by name in this process).
+        position: Camera position in the ring.
+        source: Camera index, video file or stream URL; files are paced
+            at their own frame rate and end the capture when exhausted.
+        stop_event: multiprocessing.Event ending the capture.
+    """
+    import cv2
+    from logging_config import configure_logging
+    from video_source import VideoSource
+    configure_logging()
+    cap = VideoSource(source, realtime=True)
+    if not cap.isOpened():
+        logger.error("Unable to access camera %s", source)
+        return
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, ring.width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, ring.height)
+    retry_count = 0
+    max_retries = 3
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret and cap.is_file:
+                logger.info("Video %s ended", source)
+                break
+            if not ret:
+                retry_count += 1
+                if retry_count >= max_retries:
+                    logger.error("Camera %s failed after %d retries", source, max_retries)
+                    break
+                time.sleep(1)
+                continue
+            retry_count = 0
+            ring.write(position, frame)
+    finally:
+        cap.release()
+        ring.close()
+
+def start_capture_processes(ring: FrameRing, sources: Sequence[Union[int, str]],
+                            stop_event) -> List[multiprocessing.Process]:
+    """Start one capture process per camera.
+
+    Args:
+        ring: Frame ring with one position per source.
+        sources: Camera index or URL for each ring position.
+        stop_event: multiprocessing.Event created from the spawn context.
+
+    Returns:
+        Started processes.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for position, source in enumerate(sources):
+        process = context.Process(target=capture_process, args=(ring, position, source, stop_event),
+                                  name=f"Capture-{source}", daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
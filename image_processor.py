@@ -1,44 +1,295 @@
 """Module for analyzing images to detect and identify faces."""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 from mtcnn import MTCNN
-from database_manager import connect_to_db, search_database
-from encryption import encrypt_data
-from logging_config import configure_logging
-from concurrent.futures import ThreadPoolExecutor
+from detector_registry import IMAGE_DETECTOR_CONFIG, get_detector
+from face_matcher import get_matcher
+from logging_config import get_logger
+from metrics import MATCHES, STAGE_SECONDS
+from result_cache import face_hash, get_result_cache
 from typing import List, Tuple, Callable, Optional
 
-logger = configure_logging()
+logger = get_logger()
+
+Match = Tuple[Tuple[str, int, str, str, str], float]
+
+DETECTION_MODES = ("fixed", "adaptive")
+DEFAULT_DETECTION_MODE = os.getenv("DETECTION_MODE", "fixed").lower()
+DEFAULT_MIN_FACE_PX = int(os.getenv("DETECT_MIN_FACE_PX", 40))
+DEFAULT_TILE_SIZE = int(os.getenv("DETECT_TILE_SIZE", 640))
+DEFAULT_TILE_OVERLAP = float(os.getenv("DETECT_TILE_OVERLAP", 0.25))
+DEFAULT_TILE_WORKERS = int(os.getenv("DETECT_TILE_WORKERS", min(4, os.cpu_count() or 1)))
+NMS_IOU_THRESHOLD = 0.4
+NMS_CONTAINMENT_THRESHOLD = 0.8
+TILE_EDGE_MARGIN = 2
+
+_tile_executor: Optional[ThreadPoolExecutor] = None
+_tile_executor_lock = threading.Lock()
 
 def initialize_detector() -> MTCNN:
-    """Initialize MTCNN face detector with optimized settings.
+    """Get the shared MTCNN face detector with optimized settings.
 
     Returns:
         Configured MTCNN detector.
     """
-    return MTCNN(min_face_size=40, scale_factor=0.8)
+    return get_detector(*IMAGE_DETECTOR_CONFIG)
 
-def detect_faces(detector: MTCNN, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+def detect_faces(detector: MTCNN, image: np.ndarray, mode: Optional[str] = None,
+                 min_face_px: int = DEFAULT_MIN_FACE_PX) -> List[Tuple[int, int, int, int]]:
     """Detect faces in an image.
 
     Args:
         detector: MTCNN face detector.
         image: Input image as NumPy array.
+        mode: "fixed" or "adaptive"; defaults to DETECTION_MODE.
+        min_face_px: Smallest face to find in adaptive mode, in image pixels.
 
     Returns:
         List of face bounding boxes (top, right, bottom, left).
     """
-    try:
-        image_small = cv2.resize(image, (320, 240))
-        image_rgb = cv2.cvtColor(image_small, cv2.COLOR_BGR2RGB)
+    return detect_faces_batch(detector, [image], mode, min_face_px)[0]
+
+def detect_faces_batch(detector: MTCNN, images: List[np.ndarray], mode: Optional[str] = None,
+                       min_face_px: int = DEFAULT_MIN_FACE_PX) -> List[List[Tuple[int, int, int, int]]]:
+    """Detect faces in several images with one detector.
+
+    "fixed" resizes every image to 320x240. "adaptive" keeps the aspect
+    ratio and picks the working resolution from the image size and
+    `min_face_px`, tiling images larger than DETECT_TILE_SIZE.
+
+    Args:
+        detector: MTCNN face detector.
+        images: Input images as NumPy arrays.
+        mode: "fixed" or "adaptive"; defaults to DETECTION_MODE.
+        min_face_px: Smallest face to find in adaptive mode, in image pixels.
+
+    Returns:
+        For each image, its face bounding boxes (top, right, bottom, left);
+        empty if detection failed.
+    """
+    mode = _resolve_mode(mode)
+    results = []
+    for image in images:
+        try:
+            results.append(_detect_image(detector, image, mode, min_face_px))
+        except Exception as e:
+            logger.error("Face detection error: %s", e)
+            results.append([])
+    return results
+
+def _resolve_mode(mode: Optional[str]) -> str:
+    """Validate a detection mode, defaulting to DETECTION_MODE."""
+    mode = mode or DEFAULT_DETECTION_MODE
+    if mode not in DETECTION_MODES:
+        raise ValueError(f"Invalid detection mode: {mode}")
+    return mode
+
+def _detect_image(detector: MTCNN, image: np.ndarray, mode: str,
+                  min_face_px: int) -> List[Tuple[int, int, int, int]]:
+    """Detect faces in one image, letting detector errors propagate."""
+    if mode == "adaptive":
+        with STAGE_SECONDS.time(stage="detect_faces"):
+            return _detect_adaptive(detector, image, min_face_px)
+    image_small = cv2.resize(image, (320, 240))
+    image_rgb = cv2.cvtColor(image_small, cv2.COLOR_BGR2RGB)
+    with STAGE_SECONDS.time(stage="detect_faces"):
         detections = detector.detect_faces(image_rgb)
-        scale_x, scale_y = image.shape[1] / 320, image.shape[0] / 240
-        return [(int(d["box"][1] * scale_y), int((d["box"][0] + d["box"][2]) * scale_x),
-                 int((d["box"][1] + d["box"][3]) * scale_y), int(d["box"][0] * scale_x))
-                for d in detections]
-    except Exception as e:
-        logger.error(f"Face detection error: {e}")
+    scale_x, scale_y = image.shape[1] / 320, image.shape[0] / 240
+    return [(int(d["box"][1] * scale_y), int((d["box"][0] + d["box"][2]) * scale_x),
+             int((d["box"][1] + d["box"][3]) * scale_y), int(d["box"][0] * scale_x))
+            for d in detections]
+
+def _get_tile_executor() -> ThreadPoolExecutor:
+    """Get the thread pool running tile detections, creating it on first use."""
+    global _tile_executor
+    with _tile_executor_lock:
+        if _tile_executor is None:
+            _tile_executor = ThreadPoolExecutor(max_workers=max(1, DEFAULT_TILE_WORKERS),
+                                                thread_name_prefix="DetectTile")
+        return _tile_executor
+
+def _tile_origins(length: int, tile: int, overlap: int) -> List[int]:
+    """Start offsets of overlapping tiles covering [0, length)."""
+    if length <= tile:
+        return [0]
+    origins = list(range(0, length - tile, max(tile - overlap, 1)))
+    return origins + [length - tile]
+
+def _nms(boxes: np.ndarray, scores: np.ndarray) -> List[int]:
+    """Greedy non-maximum suppression of (x0, y0, x1, y1) boxes.
+
+    A box is dropped when it overlaps a stronger one by more than
+    NMS_IOU_THRESHOLD; a kept box lying mostly inside a larger kept box
+    (a face cut by a tile edge) is dropped afterwards, whatever its score.
+
+    Returns:
+        Indices of the kept boxes, strongest first.
+    """
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+
+    def intersections(best: int, rest: np.ndarray) -> np.ndarray:
+        width = np.clip(np.minimum(boxes[best, 2], boxes[rest, 2]) - np.maximum(boxes[best, 0], boxes[rest, 0]), 0, None)
+        height = np.clip(np.minimum(boxes[best, 3], boxes[rest, 3]) - np.maximum(boxes[best, 1], boxes[rest, 1]), 0, None)
+        return width * height
+
+    order = np.argsort(-scores)
+    keep = []
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(int(best))
+        inter = intersections(best, rest)
+        order = rest[inter / np.maximum(areas[best] + areas[rest] - inter, 1e-6) <= NMS_IOU_THRESHOLD]
+    kept = np.asarray(keep)
+    return [i for i in keep
+            if not np.any((areas[kept] > areas[i])
+                          & (intersections(i, kept) / max(areas[i], 1e-6) > NMS_CONTAINMENT_THRESHOLD))]
+
+def _pyramid_jobs(work: np.ndarray, tile: int, overlap: int) -> list:
+    """Overlapping tiles of `work` and of its successive halvings, down to a level that fits one tile.
+
+    Returns:
+        List of (tile image, x offset, y offset, level-to-work scale,
+        (left, top, right, bottom) edge is interior to the level).
+    """
+    jobs = []
+    level = work
+    while True:
+        height, width = level.shape[:2]
+        factor = work.shape[1] / width
+        if max(width, height) <= tile:
+            jobs.append((level, 0, 0, factor, (False, False, False, False)))
+            return jobs
+        for y in _tile_origins(height, tile, overlap):
+            for x in _tile_origins(width, tile, overlap):
+                jobs.append((level[y:y + tile, x:x + tile], x, y, factor,
+                             (x > 0, y > 0, x + tile < width, y + tile < height)))
+        level = cv2.resize(level, (max(width // 2, 1), max(height // 2, 1)), interpolation=cv2.INTER_AREA)
+
+def _touches_interior_edge(box: List[int], shape: Tuple[int, ...], interior: Tuple[bool, bool, bool, bool]) -> bool:
+    """Whether an MTCNN box reaches a tile edge shared with a neighbouring tile."""
+    x, y, w, h = box
+    height, width = shape[:2]
+    return ((interior[0] and x <= TILE_EDGE_MARGIN) or (interior[1] and y <= TILE_EDGE_MARGIN)
+            or (interior[2] and x + w >= width - TILE_EDGE_MARGIN)
+            or (interior[3] and y + h >= height - TILE_EDGE_MARGIN))
+
+def _detect_adaptive(detector: MTCNN, image: np.ndarray, min_face_px: int) -> List[Tuple[int, int, int, int]]:
+    """Aspect-preserving detection at the resolution needed for `min_face_px` faces.
+
+    The image is only ever downscaled, just enough for a `min_face_px` face
+    to reach the detector's minimum face size; the cost therefore grows
+    with the image area over `min_face_px` squared. A working image larger
+    than DETECT_TILE_SIZE is detected as a pyramid of overlapping tiles,
+    halving the resolution down to a level that fits one tile, all run in
+    parallel. The overlap is at least twice the detector minimum, so a face
+    cut by a tile edge is whole in a neighbouring tile or at a coarser
+    level; boxes touching an interior tile edge are dropped before the
+    remaining ones are merged by NMS.
+    """
+    height, width = image.shape[:2]
+    detector_min = IMAGE_DETECTOR_CONFIG[0]
+    scale = min(1.0, detector_min / max(min_face_px, 1))
+    work = (cv2.resize(image, (max(round(width * scale), 1), max(round(height * scale), 1)),
+                       interpolation=cv2.INTER_AREA) if scale < 1 else image)
+    tile = DEFAULT_TILE_SIZE
+    overlap = min(max(int(tile * DEFAULT_TILE_OVERLAP), 2 * detector_min), tile // 2)
+    # (صورة، إزاحة x، إزاحة y، معامل التحويل إلى الصورة العاملة، الحواف الداخلية)
+    jobs = _pyramid_jobs(work, tile, overlap)
+
+    def run(job) -> list:
+        with STAGE_SECONDS.time(stage="detect_tile"):
+            return detector.detect_faces(cv2.cvtColor(job[0], cv2.COLOR_BGR2RGB))
+
+    detections = list(_get_tile_executor().map(run, jobs)) if len(jobs) > 1 else [run(jobs[0])]
+    boxes, scores = [], []
+    for (tile_image, dx, dy, factor, interior), faces in zip(jobs, detections):
+        factor /= scale
+        for face in faces:
+            if _touches_interior_edge(face["box"], tile_image.shape, interior):
+                continue
+            x, y, w, h = face["box"]
+            boxes.append(((x + dx) * factor, (y + dy) * factor, (x + dx + w) * factor, (y + dy + h) * factor))
+            scores.append(face.get("confidence", 1.0))
+    if not boxes:
         return []
+    boxes_array = np.asarray(boxes, dtype=np.float32)
+    return [(int(boxes_array[i, 1]), int(boxes_array[i, 2]), int(boxes_array[i, 3]), int(boxes_array[i, 0]))
+            for i in _nms(boxes_array, np.asarray(scores, dtype=np.float32))]
+
+def compute_embedding(face_crop: np.ndarray) -> np.ndarray:
+    """Compute the raw embedding of a face crop.
+
+    Args:
+        face_crop: Face region as NumPy array (BGR).
+
+    Returns:
+        Flattened 32x32x3 crop as float32 vector.
+    """
+    return cv2.resize(face_crop, (32, 32)).flatten().astype(np.float32)
+
+def identify_faces(image: np.ndarray, face_locations: List[Tuple[int, int, int, int]],
+                   offline_mode: bool = False) -> List[Optional[Tuple[Tuple[str, int, str, str, str], float]]]:
+    """Identify already-detected faces with one batched watchlist query.
+
+    Faces whose perceptual hash was seen recently against the same watchlist
+    generation reuse the cached result, including "no match".
+
+    Args:
+        image: Image the boxes refer to, as NumPy array.
+        face_locations: Face bounding boxes (top, right, bottom, left).
+        offline_mode: Whether to use offline database.
+
+    Returns:
+        For each box, the best (record, distance) match or None, in box order.
+    """
+    return identify_faces_batch([(image, face_locations)], offline_mode)[0]
+
+def identify_faces_batch(items: List[Tuple[np.ndarray, List[Tuple[int, int, int, int]]]],
+                         offline_mode: bool = False) -> List[List[Optional[Match]]]:
+    """Identify the faces of several images with a single watchlist query.
+
+    Args:
+        items: (image, face bounding boxes) pairs.
+        offline_mode: Whether to use offline database.
+
+    Returns:
+        For each image, the best (record, distance) match or None per box.
+    """
+    results: List[List[Optional[Match]]] = [[None] * len(face_locations) for _, face_locations in items]
+    embeddings, positions, keys = [], [], []
+    matcher = get_matcher(offline_mode)
+    cache = get_result_cache()
+    generation = matcher.generation
+    with STAGE_SECONDS.time(stage="embedding"):
+        for item, (image, face_locations) in enumerate(items):
+            for position, (top, right, bottom, left) in enumerate(face_locations):
+                face_crop = image[max(top, 0):bottom, max(left, 0):right]
+                if face_crop.size == 0:
+                    continue
+                key = (offline_mode, face_hash(face_crop))
+                hit, cached = cache.get(key, generation)
+                if hit:
+                    results[item][position] = cached
+                    MATCHES.inc(result="hit" if cached else "miss")
+                    continue
+                embeddings.append(compute_embedding(face_crop))
+                positions.append((item, position))
+                keys.append(key)
+
+    if embeddings:
+        with STAGE_SECONDS.time(stage="match"):
+            batch_matches = matcher.match(np.stack(embeddings))
+        for (item, position), key, matches in zip(positions, keys, batch_matches):
+            MATCHES.inc(result="hit" if matches else "miss")
+            if matches:
+                record, distance = matches[0]
+                logger.info("Watchlist match: %s (distance %.3f)", record[0], distance)
+                results[item][position] = (record, distance)
+            cache.put(key, results[item][position], generation)
+    return results
 
 def analyze_image(image: np.ndarray, progress_callback: Optional[Callable[[int], None]] = None,
                   offline_mode: bool = False) -> Optional[List[Tuple[str, int, str, str, str]]]:
@@ -53,45 +304,50 @@ def analyze_image(image: np.ndarray, progress_callback: Optional[Callable[[int],
         List of identified individuals (name, age, nationality, crime, danger_level) or None.
     """
     try:
-        if not isinstance(image, np.ndarray) or image.size == 0:
-            logger.error("Invalid image data")
-            return None
-
+        return analyze_image_strict(image, progress_callback, offline_mode) or None
+    except Exception as e:
+        logger.error("Image analysis error: %s", e)
         if progress_callback:
-            progress_callback(10)
+            progress_callback(100)
+        return None
 
-        detector = initialize_detector()
-        face_locations = detect_faces(detector, image)
-        if not face_locations:
-            if progress_callback:
-                progress_callback(100)
-            return None
+def analyze_image_strict(image: np.ndarray, progress_callback: Optional[Callable[[int], None]] = None,
+                         offline_mode: bool = False) -> List[Tuple[str, int, str, str, str]]:
+    """Analyze an image like `analyze_image`, but raise on failure.
 
-        if progress_callback:
-            progress_callback(30)
-
-        db = connect_to_db() if not offline_mode else None
-        results = []
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            futures = []
-            for top, right, bottom, left in face_locations:
-                face_crop = image[top:bottom, left:right]
-                if face_crop.size == 0:
-                    continue
-                face_encoding = cv2.resize(face_crop, (32, 32)).flatten()
-                encrypted_encoding = encrypt_data(str(face_encoding.tolist()))
-                futures.append(executor.submit(search_database, db, encrypted_encoding, offline_mode))
+    Lets callers that record or retry failures (e.g. batch runs) tell an
+    error apart from an image without matches.
 
-            for future in futures:
-                result = future.result()
-                if result:
-                    results.append(result)
+    Args:
+        image: Input image as NumPy array.
+        progress_callback: Optional callback for progress updates.
+        offline_mode: Whether to use offline database.
 
+    Returns:
+        List of identified individuals (name, age, nationality, crime, danger_level); empty if none.
+
+    Raises:
+        ValueError: If the image is empty or not an array.
+        Exception: Detector, database and matcher errors are not caught.
+    """
+    if not isinstance(image, np.ndarray) or image.size == 0:
+        raise ValueError("Invalid image data")
+
+    if progress_callback:
+        progress_callback(10)
+
+    detector = initialize_detector()
+    face_locations = _detect_image(detector, image, _resolve_mode(None), DEFAULT_MIN_FACE_PX)
+    if not face_locations:
         if progress_callback:
             progress_callback(100)
-        return results if results else None
-    except Exception as e:
-        logger.error(f"Image analysis error: {e}")
-        if progress_callback:
-            progress_callback(100)
-        return None
\ No newline at end of file
+        return []
+
+    if progress_callback:
+        progress_callback(30)
+
+    results = [match[0] for match in identify_faces(image, face_locations, offline_mode) if match]
+
+    if progress_callback:
+        progress_callback(100)
+    return results
\ No newline at end of file
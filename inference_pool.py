@@ -0,0 +1,173 @@
+"""Module for batched face detection across cameras in worker processes."""
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+from logging_config import get_logger
+from metrics import QUEUE_DEPTH, STAGE_SECONDS
+from frame_ring import FrameRing
+from motion_gate import MotionGate
+from typing import Iterator, List, Optional, Tuple
+
+logger = get_logger()
+
+_frame_ring: Optional[FrameRing] = None
+
+def _init_detection_worker(min_face_size: int, scale_factor: float, frame_ring: Optional[FrameRing] = None) -> None:
+    """Build and warm the worker's own detector and attach to the frame ring, if any."""
+    global _frame_ring
+    from detector_registry import warm_up
+    from logging_config import configure_logging
+    configure_logging()
+    _frame_ring = frame_ring
+    warm_up(min_face_size, scale_factor)
+
+def _detect_batch(frames: List[np.ndarray], min_face_size: int, scale_factor: float) -> List[list]:
+    """Run the worker's detector on a batch of BGR frames."""
+    import cv2
+    from detector_registry import get_detector
+    detector = get_detector(min_face_size, scale_factor)
+    results = []
+    for frame in frames:
+        try:
+            results.append(detector.detect_faces(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+        except Exception as e:
+            logger.error("Face detection error: %s", e)
+            results.append([])
+    return results
+
+def _detect_ring_batch(refs: List[Tuple[int, int, Optional[Tuple[int, int, int, int]]]],
+                       min_face_size: int, scale_factor: float) -> List[list]:
+    """Run the worker's detector on pinned frame ring slots, read as zero-copy views.
+
+    Args:
+        refs: (ring position, slot, region or None for the full frame).
+        min_face_size: Detector minimum face size.
+        scale_factor: Detector pyramid scale factor.
+    """
+    images = []
+    for position, slot, region in refs:
+        frame = _frame_ring.view(position, slot)
+        images.append(frame if region is None else frame[region[1]:region[3], region[0]:region[2]])
+    return _detect_batch(images, min_face_size, scale_factor)
+
+class DetectionPool:
+    """Micro-batching detection stage backed by worker processes.
+
+    Frames are gathered from the frame scheduler into batches of up to
+    `max_batch_size` frames, waiting at most `max_wait_ms` after the first
+    one. Each worker process holds its own detector. Batches complete in
+    submission order, so frames come back in the order they were captured
+    for every camera.
+
+    With a frame ring, workers attach to the shared memory and read pinned
+    slots directly, so only slot references cross the process boundary.
+    """
+
+    def __init__(self, workers: int, detector_config: Tuple[int, float],
+                 max_batch_size: int = 8, max_wait_ms: int = 20, frame_ring: Optional[FrameRing] = None):
+        """Start the worker processes.
+
+        Args:
+            workers: Number of detection processes.
+            detector_config: (min_face_size, scale_factor) for worker detectors.
+            max_batch_size: Maximum frames per batch.
+            max_wait_ms: Maximum time to fill a batch after its first frame.
+            frame_ring: Shared frame ring the scheduler's frames live in.
+        """
+        self.workers = max(1, workers)
+        self.detector_config = detector_config
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.max_in_flight = self.workers * 2
+        self.frame_ring = frame_ring
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_detection_worker,
+                                             initargs=(*detector_config, frame_ring))
+        logger.info(f"Detection pool started with {self.workers} workers")
+
+    def collect_batch(self, scheduler, timeout: float = 0.5) -> List[Tuple[np.ndarray, int]]:
+        """Gather a micro-batch of (frame, camera index) from the scheduler.
+
+        Args:
+            scheduler: FrameScheduler providing frames.
+            timeout: Maximum seconds to wait for the first frame.
+
+        Returns:
+            Possibly empty list of (frame, camera index).
+        """
+        first = scheduler.get(timeout=timeout)
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            item = scheduler.get(timeout=remaining)
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    def detect_stream(self, scheduler, stop_event,
+                      motion_gate: Optional[MotionGate] = None) -> Iterator[Optional[Tuple[np.ndarray, int, list]]]:
+        """Detect faces on scheduler frames, keeping every worker busy.
+
+        With a motion gate, workers receive only the motion regions of each
+        frame, and batches of static frames never leave the process.
+
+        Args:
+            scheduler: FrameScheduler providing frames.
+            stop_event: Event to signal termination.
+            motion_gate: Optional gate restricting detection to moving regions.
+
+        Yields:
+            (frame, camera index, MTCNN detections) in capture order, or None
+            when no frame arrived within the poll interval.
+        """
+        in_flight = deque()
+        QUEUE_DEPTH.set_function(lambda: len(in_flight), queue="detection_batches")
+        while not stop_event.is_set():
+            batch = self.collect_batch(scheduler) if len(in_flight) < self.max_in_flight else []
+            if batch:
+                plans = [motion_gate.plan(cam_idx, frame) if motion_gate else None for frame, cam_idx in batch]
+                targets = [[None] if regions is None else regions for regions in plans]
+                if not any(targets):
+                    future = Future()
+                    future.set_result([])
+                elif self.frame_ring is not None:
+                    refs = [(*scheduler.locate(frame), region)
+                            for (frame, _), regions in zip(batch, targets) for region in regions]
+                    future = self._executor.submit(_detect_ring_batch, refs, *self.detector_config)
+                else:
+                    images = [image for (frame, _), regions in zip(batch, plans)
+                              for image in MotionGate.crops(frame, regions)]
+                    future = self._executor.submit(_detect_batch, images, *self.detector_config)
+                in_flight.append((batch, plans, [len(t) for t in targets], time.perf_counter(), future))
+            if not in_flight:
+                yield None
+                continue
+            head, plans, counts, submitted, future = in_flight[0]
+            if batch and not future.done() and len(in_flight) < self.max_in_flight:
+                continue
+            in_flight.popleft()
+            try:
+                detections = future.result()
+            except Exception as e:
+                logger.error("Detection batch failed: %s", e)
+                detections = [[] for _ in range(sum(counts))]
+            STAGE_SECONDS.observe(time.perf_counter() - submitted, stage="detect_batch")
+            offset = 0
+            for (frame, cam_idx), regions, count in zip(head, plans, counts):
+                crop_faces = detections[offset:offset + count]
+                offset += count
+                yield frame, cam_idx, (motion_gate.merge(cam_idx, regions, crop_faces) if motion_gate
+                                       else crop_faces[0])
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
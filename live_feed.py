@@ -1,29 +1,157 @@
 """Module for real-time face detection and identification via live camera feed."""
 import cv2
+import multiprocessing
+import os
 import threading
-import queue
 import time
+import numpy as np
 from mtcnn import MTCNN
-from image_processor import analyze_image
-from logging_config import configure_logging
-from typing import List
+from detector_registry import LIVE_FEED_DETECTOR_CONFIG, warm_up
+from face_tracker import FaceTracker
+from frame_ring import DEFAULT_RING_SLOTS, FrameRing, SharedFrameScheduler, start_capture_processes
+from image_processor import identify_faces
+from inference_pool import DetectionPool
+from motion_gate import MotionGate
+from output_sinks import DetectionSink, FrameRenderer
+from result_cache import get_result_cache
+from video_source import Source, VideoSource
+from logging_config import get_logger
+from metrics import CAMERA_FRAMES, QUEUE_DEPTH, STAGE_SECONDS
+from typing import Dict, Iterator, List, Optional, Tuple
 
-logger = configure_logging()
+logger = get_logger()
 FRAME_WIDTH, FRAME_HEIGHT = 640, 480
-FRAME_QUEUE = queue.Queue(maxsize=5)
+STATS_LOG_INTERVAL = 30
+RECORD_FIELDS = ("name", "age", "nationality", "crime", "danger_level")
 
-def capture_frames(cap: cv2.VideoCapture, stop_event: threading.Event, cam_idx: int) -> None:
-    """Capture frames from a camera.
+class FrameScheduler:
+    """Per-camera latest-frame buffers with round-robin hand-out.
+
+    Each camera holds at most one pending frame; a new frame replaces an
+    unconsumed one ("latest frame wins") and counts as dropped. Consumers
+    block on `get` until any camera has a frame and are served in
+    round-robin order so a fast camera cannot starve the others.
+    """
+
+    zero_copy = False
+
+    def __init__(self):
+        """Initialize an empty scheduler."""
+        self._cond = threading.Condition()
+        self._pending: Dict[int, Optional[np.ndarray]] = {}
+        self._order: List[int] = []
+        self._next = 0
+        self._closed = False
+        self._stats: Dict[int, Dict[str, int]] = {}
+
+    def register(self, cam_idx: int) -> None:
+        """Add a camera to the round-robin order.
+
+        Args:
+            cam_idx: Camera index.
+        """
+        with self._cond:
+            if cam_idx not in self._pending:
+                self._pending[cam_idx] = None
+                self._order.append(cam_idx)
+                self._stats[cam_idx] = {"captured": 0, "dropped": 0, "processed": 0}
+
+    def put(self, cam_idx: int, frame: np.ndarray) -> None:
+        """Store the latest frame of a camera, replacing an unconsumed one.
+
+        Args:
+            cam_idx: Camera index.
+            frame: Captured frame.
+        """
+        with self._cond:
+            stats = self._stats[cam_idx]
+            if self._pending[cam_idx] is not None:
+                stats["dropped"] += 1
+                CAMERA_FRAMES.inc(camera=cam_idx, state="dropped")
+            self._pending[cam_idx] = frame
+            stats["captured"] += 1
+            CAMERA_FRAMES.inc(camera=cam_idx, state="captured")
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[np.ndarray, int]]:
+        """Wait for the next frame in round-robin order.
+
+        Args:
+            timeout: Maximum seconds to wait.
+
+        Returns:
+            Tuple of (frame, camera index), or None on timeout or close.
+        """
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._closed or any(f is not None for f in self._pending.values()), timeout)
+            if not ready or self._closed:
+                return None
+            count = len(self._order)
+            for offset in range(count):
+                position = (self._next + offset) % count
+                cam_idx = self._order[position]
+                frame = self._pending[cam_idx]
+                if frame is not None:
+                    self._pending[cam_idx] = None
+                    self._next = (position + 1) % count
+                    self._stats[cam_idx]["processed"] += 1
+                    CAMERA_FRAMES.inc(camera=cam_idx, state="processed")
+                    return frame, cam_idx
+            return None
+
+    def release(self, cam_idx: int, frame: np.ndarray) -> None:
+        """Frames are owned by the consumer once handed out; kept for interface parity."""
+
+    def pending(self) -> int:
+        """Number of cameras with a frame waiting to be processed."""
+        with self._cond:
+            return sum(frame is not None for frame in self._pending.values())
+
+    def close(self) -> None:
+        """Wake all waiting consumers and make `get` return None."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[int, Dict[str, int]]:
+        """Snapshot of per-camera captured, dropped and processed counters.
+
+        Returns:
+            Mapping of camera index to its counters.
+        """
+        with self._cond:
+            return {cam_idx: dict(stats) for cam_idx, stats in self._stats.items()}
+
+def mtcnn_box_to_location(box: List[int]) -> Tuple[int, int, int, int]:
+    """Convert an MTCNN (x, y, width, height) box to (top, right, bottom, left).
+
+    Args:
+        box: MTCNN bounding box.
+
+    Returns:
+        Face location clamped to non-negative coordinates.
+    """
+    x, y, width, height = box
+    return max(y, 0), max(x + width, 0), max(y + height, 0), max(x, 0)
+
+def capture_frames(cap: VideoSource, stop_event: threading.Event, cam_idx: Source,
+                   scheduler: FrameScheduler) -> None:
+    """Capture frames from a camera or video file.
 
     Args:
-        cap: OpenCV VideoCapture object.
+        cap: Video source, paced in real time for files.
         stop_event: Event to signal thread termination.
-        cam_idx: Camera index for logging.
+        cam_idx: Camera index or video path for logging.
+        scheduler: Frame scheduler receiving the captured frames.
     """
     retry_count = 0
     max_retries = 3
     while not stop_event.is_set():
         ret, frame = cap.read()
+        if not ret and cap.is_file:
+            logger.info(f"Video {cam_idx} ended")
+            break
         if not ret:
             retry_count += 1
             if retry_count >= max_retries:
@@ -32,79 +160,263 @@ def capture_frames(cap: cv2.VideoCapture, stop_event: threading.Event, cam_idx:
             time.sleep(1)
             continue
         retry_count = 0
-        frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
-        if not FRAME_QUEUE.full():
-            FRAME_QUEUE.put((frame, cam_idx))
-        time.sleep(0.03)
+        scheduler.put(cam_idx, cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT)))
     cap.release()
 
-def process_frames(detector: MTCNN, stop_event: threading.Event, offline_mode: bool) -> None:
-    """Process captured frames to detect and identify faces.
+def stop_when_sources_end(captures: list, scheduler, stop_event: threading.Event) -> None:
+    """Stop the live feed once every capture has ended and its frames were taken.
+
+    Args:
+        captures: Capture threads or processes.
+        scheduler: Frame scheduler fed by the captures.
+        stop_event: Event stopping frame processing.
+    """
+    for capture in captures:
+        capture.join()
+    while scheduler.pending() and not stop_event.is_set():
+        time.sleep(0.1)
+    stop_event.set()
+
+def detect_inline(detector: MTCNN, scheduler: FrameScheduler, stop_event: threading.Event,
+                  motion_gate: Optional[MotionGate] = None) -> Iterator[Optional[Tuple[np.ndarray, int, list]]]:
+    """Detect faces on scheduler frames in the calling thread.
 
     Args:
         detector: MTCNN face detector.
+        scheduler: Frame scheduler providing the captured frames.
+        stop_event: Event to signal thread termination.
+        motion_gate: Optional gate restricting detection to moving regions.
+
+    Yields:
+        (frame, camera index, MTCNN detections), or None when no frame
+        arrived within the poll interval.
+    """
+    while not stop_event.is_set():
+        item = scheduler.get(timeout=0.5)
+        if item is None:
+            yield None
+            continue
+        frame, cam_idx = item
+        regions = motion_gate.plan(cam_idx, frame) if motion_gate else None
+        crops = MotionGate.crops(frame, regions)
+        crop_faces = []
+        if crops:
+            with STAGE_SECONDS.time(stage="detect_faces"):
+                crop_faces = [detector.detect_faces(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)) for crop in crops]
+        yield frame, cam_idx, (motion_gate.merge(cam_idx, regions, crop_faces) if motion_gate else crop_faces[0])
+
+def detection_event(cam_idx: int, face_locations: List[Tuple[int, int, int, int]], tracks: list) -> Dict:
+    """Build the sink event for one analyzed frame.
+
+    Args:
+        cam_idx: Camera index.
+        face_locations: Face boxes (top, right, bottom, left).
+        tracks: Track for each box.
+
+    Returns:
+        JSON-serializable event.
+    """
+    faces = []
+    for location, track in zip(face_locations, tracks):
+        match = None
+        if track.match:
+            record, distance = track.match
+            match = dict(zip(RECORD_FIELDS, record), distance=round(distance, 4))
+        faces.append({"box": list(location), "track_id": track.track_id,
+                      "confidence": round(float(track.confidence), 4), "match": match})
+    return {"timestamp": time.time(), "camera": cam_idx, "faces": faces}
+
+def annotate_frame(frame: np.ndarray, face_locations: List[Tuple[int, int, int, int]], tracks: list) -> None:
+    """Draw face boxes and match labels onto a frame in place.
+
+    Args:
+        frame: Frame to draw on.
+        face_locations: Face boxes (top, right, bottom, left).
+        tracks: Track for each box.
+    """
+    for (top, right, bottom, left), track in zip(face_locations, tracks):
+        cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+        if track.match:
+            name, age, nationality, crime, danger_level = track.match[0]
+            display_text = f"{name} - {danger_level}"
+            cv2.putText(frame, display_text, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.6, (0, 255, 0), 2)
+
+def process_frames(detector: MTCNN, stop_event: threading.Event, offline_mode: bool,
+                   scheduler: FrameScheduler, detection_pool: Optional[DetectionPool] = None,
+                   sink: Optional[DetectionSink] = None, renderer: Optional[FrameRenderer] = None,
+                   motion_gate: Optional[MotionGate] = None) -> None:
+    """Process captured frames to detect and identify faces.
+
+    Args:
+        detector: MTCNN face detector, used when no detection pool is given.
         stop_event: Event to signal thread termination.
         offline_mode: Whether to use offline database.
+        scheduler: Frame scheduler providing the captured frames.
+        detection_pool: Optional worker pool running detection in micro-batches.
+        sink: Optional sink receiving an event for every frame with faces.
+        renderer: Optional display thread; None runs headless.
+        motion_gate: Optional gate skipping detection on static frames and
+            restricting it to moving regions otherwise.
     """
     fps_start = time.time()
+    stats_logged = time.time()
     frame_count = 0
-    while not stop_event.is_set():
-        if not FRAME_QUEUE.empty():
-            frame, cam_idx = FRAME_QUEUE.get()
-            faces = detector.detect_faces(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-
-            for face in faces:
-                x, y, width, height = face["box"]
-                cv2.rectangle(frame, (x, y), (x + width, y + height), (0, 255, 0), 2)
-                face_crop = frame[y:y + height, x:x + width]
-                if face_crop.size > 0:
-                    result = analyze_image(face_crop, offline_mode=offline_mode)
-                    if result:
-                        name, age, nationality, crime, danger_level = result
-                        display_text = f"{name} - {danger_level}"
-                        cv2.putText(frame, display_text, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                                    0.6, (0, 255, 0), 2)
+    trackers: Dict[int, FaceTracker] = {}
+    detections = (detection_pool.detect_stream(scheduler, stop_event, motion_gate) if detection_pool
+                  else detect_inline(detector, scheduler, stop_event, motion_gate))
+    for item in detections:
+        if time.time() - stats_logged >= STATS_LOG_INTERVAL:
+            logger.info(f"Camera frame stats: {scheduler.stats()}")
+            logger.info(f"Result cache stats: {get_result_cache().stats()}")
+            if motion_gate:
+                logger.info(f"Motion gate stats: {motion_gate.stats()}")
+            stats_logged = time.time()
+        if item is None:
+            continue
+        frame, cam_idx, faces = item
+
+        # يُحرَّر الإطار دائماً حتى لا يبقى مثبّتاً في حلقة الذاكرة المشتركة
+        try:
+            face_locations = [mtcnn_box_to_location(face["box"]) for face in faces]
+            tracker = trackers.setdefault(cam_idx, FaceTracker())
+            tracks = tracker.update(face_locations, [face.get("confidence", 1.0) for face in faces])
+            stale = [i for i, track in enumerate(tracks) if tracker.needs_identification(track)]
+            if stale:
+                try:
+                    matches = identify_faces(frame, [face_locations[i] for i in stale], offline_mode)
+                except Exception as e:
+                    # تبقى المسارات غير معرَّفة فتُعاد محاولة التعرّف في الإطار التالي
+                    logger.error("Live-feed identification error: %s", e)
+                    matches = []
+                for i, match in zip(stale, matches):
+                    tracker.record_identification(tracks[i], match)
+
+            if sink and face_locations:
+                try:
+                    sink.emit(detection_event(cam_idx, face_locations, tracks))
+                except Exception as e:
+                    logger.error("Detection sink error: %s", e)
 
             frame_count += 1
+            fps = None
             if time.time() - fps_start >= 1:
                 fps = frame_count / (time.time() - fps_start)
-                cv2.putText(frame, f"FPS: {fps:.2f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX,
-                            0.6, (0, 255, 255), 2)
                 frame_count = 0
                 fps_start = time.time()
 
-            cv2.imshow(f"Camera {cam_idx}", frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                stop_event.set()
-                break
-    cv2.destroyAllWindows()
+            if renderer:
+                display = frame.copy() if scheduler.zero_copy else frame
+                annotate_frame(display, face_locations, tracks)
+                if fps is not None:
+                    cv2.putText(display, f"FPS: {fps:.2f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX,
+                                0.6, (0, 255, 255), 2)
+                renderer.submit(cam_idx, display)
+        finally:
+            scheduler.release(cam_idx, frame)
 
-def analyze_live_feed(camera_indices: List[int], offline_mode: bool = False) -> None:
+def analyze_live_feed(camera_indices: List[Source], offline_mode: bool = False, workers: int = 0,
+                      max_batch_size: int = 8, max_wait_ms: int = 20, headless: bool = False,
+                      sink: Optional[DetectionSink] = None, motion_gate: bool = False,
+                      motion_thresholds: Optional[Dict[int, float]] = None,
+                      capture_processes: bool = False) -> None:
     """Start live feed analysis for face detection and identification.
 
+    Video files are played back at their own frame rate; when every source
+    is a file, the feed stops after the last frame.
+
     Args:
-        camera_indices: List of camera indices to process.
+        camera_indices: Camera indices, video files or stream URLs to process.
         offline_mode: Whether to use offline database.
+        workers: Detection worker processes; 0 detects in the main process.
+        max_batch_size: Maximum frames per detection batch.
+        max_wait_ms: Maximum time to fill a detection batch.
+        headless: Run without any GUI window.
+        sink: Optional sink receiving detection events.
+        motion_gate: Run the detector only where motion occurred.
+        motion_thresholds: Per-camera motion thresholds (default MOTION_THRESHOLD).
+        capture_processes: Capture each camera in its own process, passing
+            frames through a shared-memory ring instead of threads.
     """
-    caps = [cv2.VideoCapture(i) for i in camera_indices]
-    detector = MTCNN()
+    caps: Dict[Source, VideoSource] = {}
+    ring, captures, capture_stop = None, [], None
     stop_event = threading.Event()
+    if capture_processes:
+        # يجب أن تتسع الحلقة لكل الإطارات المثبّتة في الدفعات الجارية، وإلا أسقط الملتقط الإطارات الأحدث
+        in_flight_frames = 2 * workers * max_batch_size if workers > 0 else 1
+        ring = FrameRing(len(camera_indices), max(DEFAULT_RING_SLOTS, in_flight_frames + 2),
+                         width=FRAME_WIDTH, height=FRAME_HEIGHT)
+        capture_stop = multiprocessing.get_context("spawn").Event()
+        captures = start_capture_processes(ring, camera_indices, capture_stop)
+        scheduler = SharedFrameScheduler(ring, camera_indices)
+    else:
+        caps = {i: VideoSource(i, realtime=True) for i in camera_indices}
+        scheduler = FrameScheduler()
+    detector = warm_up(*LIVE_FEED_DETECTOR_CONFIG) if workers <= 0 else None
+    detection_pool = (DetectionPool(workers, LIVE_FEED_DETECTOR_CONFIG, max_batch_size, max_wait_ms, ring)
+                      if workers > 0 else None)
+    QUEUE_DEPTH.set_function(scheduler.pending, queue="frames")
+    gate = MotionGate(motion_thresholds) if motion_gate else None
 
-    for cap in caps:
+    threads = []
+    for cam_idx, cap in caps.items():
         if not cap.isOpened():
-            logger.error(f"Unable to access camera {caps.index(cap)}")
+            logger.error(f"Unable to access camera {cam_idx}")
             continue
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
-
-    threads = [threading.Thread(target=capture_frames, args=(cap, stop_event, i))
-               for i, cap in enumerate(caps)]
+        scheduler.register(cam_idx)
+        threads.append(threading.Thread(target=capture_frames, args=(cap, stop_event, cam_idx, scheduler)))
     for t in threads:
         t.daemon = True
         t.start()
+    if all(isinstance(i, str) and os.path.isfile(i) for i in camera_indices):
+        threading.Thread(target=stop_when_sources_end, args=(threads or captures, scheduler, stop_event),
+                         name="SourceWatcher", daemon=True).start()
 
-    process_frames(detector, stop_event, offline_mode)
-    stop_event.set()
-    for cap in caps:
-        cap.release()
-    cv2.destroyAllWindows()
\ No newline at end of file
+    renderer = None if headless else FrameRenderer(stop_event)
+    processing, errors = None, []
+
+    def process_in_background() -> None:
+        try:
+            process_frames(detector, stop_event, offline_mode, scheduler, detection_pool, sink, renderer, gate)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop_event.set()
+
+    try:
+        if renderer:
+            # واجهة العرض تعمل في الخيط الرئيسي (شرط Cocoa على macOS)، والمعالجة في خيط خلفي
+            processing = threading.Thread(target=process_in_background, name="FrameProcessor", daemon=True)
+            processing.start()
+            renderer.run()
+            processing.join()
+            if errors:
+                raise errors[0]
+        else:
+            process_frames(detector, stop_event, offline_mode, scheduler, detection_pool, sink, renderer, gate)
+    finally:
+        stop_event.set()
+        scheduler.close()
+        if renderer:
+            renderer.close()
+        if processing:
+            processing.join(timeout=5)
+        if detection_pool:
+            detection_pool.close()
+        if sink:
+            sink.close()
+        QUEUE_DEPTH.set_function(None, queue="frames")
+        logger.info(f"Camera frame stats: {scheduler.stats()}")
+        if gate:
+            logger.info(f"Motion gate stats: {gate.stats()}")
+        for cap in caps.values():
+            cap.release()
+        if capture_stop is not None:
+            capture_stop.set()
+            for process in captures:
+                process.join(timeout=2)
+                if process.is_alive():
+                    process.terminate()
+            ring.close()
\ No newline at end of file
@@ -1,62 +1,185 @@
 """Module for configuring logging system for the Military Image Analysis System."""
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-def configure_logging(log_file: Optional[str] = None, log_level: str = "INFO") -> logging.Logger:
+LOGGER_NAME = "MilitarySystem"
+DEFAULT_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", 10))
+DEFAULT_RATE_BURST = int(os.getenv("LOG_RATE_BURST", 50))
+DEFAULT_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+_listener = None
+_configure_lock = threading.Lock()
+
+def get_logger() -> logging.Logger:
+    """Get the system logger without touching its handlers.
+
+    Modules call this at import; entry points call configure_logging() once.
+
+    Returns:
+        Logger instance.
+    """
+    return logging.getLogger(LOGGER_NAME)
+
+class RateLimitFilter(logging.Filter):
+    """Token-bucket rate limit per call site for records below WARNING.
+
+    Each `logger.info(...)`/`logger.debug(...)` line may emit `rate` records
+    per second with bursts of up to `burst`; the rest are dropped and
+    counted, and the next record that passes reports how many similar
+    messages were suppressed. Warnings and errors always pass.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE_LIMIT, burst: int = DEFAULT_RATE_BURST):
+        """Initialize the filter.
+
+        Args:
+            rate: Sustained records per second per call site.
+            burst: Records a call site may emit at once.
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._buckets: Dict[Tuple[str, int], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                # الرصيد، وقت آخر تحديث، عدد الرسائل المحجوبة
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+            bucket[0] = tokens - 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+def _queue_handler(log_queue: queue.Queue) -> logging.Handler:
+    """Create a QueueHandler that drops INFO and DEBUG records instead of blocking when the queue is full.
+
+    WARNING and above are never dropped: they wait for room in the queue.
+    Drops are counted in the `ips_log_records_dropped_total` metric.
+    """
+    from logging.handlers import QueueHandler
+
+    class NonBlockingQueueHandler(QueueHandler):
+        dropped = 0
+
+        def enqueue(self, record: logging.LogRecord) -> None:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record)
+                return
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                from metrics import LOG_RECORDS_DROPPED
+                self.dropped += 1
+                LOG_RECORDS_DROPPED.inc(level=record.levelname)
+
+    return NonBlockingQueueHandler(log_queue)
+
+def configure_logging(log_file: Optional[str] = None, log_level: Optional[str] = None) -> logging.Logger:
     """Configure the logging system with file and console output.
 
+    Records are put on a bounded queue by the calling thread and written to
+    the rotating file and the console by a background listener thread, so
+    logging never waits on I/O. Configuration happens once per process;
+    later calls return the configured logger.
+
     Args:
-        log_file: Path to the log file. Defaults to 'logs/military_system_{date}.log'.
-        log_level: Logging level (e.g., 'DEBUG', 'INFO', 'ERROR'). Defaults to 'INFO'.
+        log_file: Path to the log file. Defaults to LOG_FILE or
+            'logs/military_system_{date}.log'.
+        log_level: Logging level (e.g., 'DEBUG', 'INFO', 'ERROR'). Defaults
+            to LOG_LEVEL or 'INFO'.
 
     Returns:
         Configured logger instance.
     """
-    # إنشاء اسم ملف السجل إذا لم يُحدد
-    if log_file is None:
-        log_dir = "logs"
-        os.makedirs(log_dir, exist_ok=True)
-        date_str = datetime.now().strftime("%Y%m%d")
-        log_file = os.path.join(log_dir, f"military_system_{date_str}.log")
-
-    # إعداد المُسجّل
-    logger = logging.getLogger("MilitarySystem")
-    logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
-
-    # منع التكرار إذا كان المُسجّل مُهيأ بالفعل
-    if logger.handlers:
-        logger.handlers.clear()
+    global _listener
+    from logging.handlers import QueueListener, RotatingFileHandler
 
-    # تنسيق السجل: الوقت، المستوى، الملف/السطر، والرسالة
-    log_format = logging.Formatter(
-        "%(asctime)s [%(levelname)s] %(filename)s:%(lineno)d - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    logger = get_logger()
+    with _configure_lock:
+        if _listener is not None:
+            return logger
 
-    # معالج ملف السجل مع التدوير (حجم أقصى 5 ميغابايت، 3 نسخ احتياطية)
-    try:
-        file_handler = RotatingFileHandler(
-            log_file, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8"
+        log_file = log_file or os.getenv("LOG_FILE")
+        log_level = (log_level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        level = getattr(logging, log_level, logging.INFO)
+        # إنشاء اسم ملف السجل إذا لم يُحدد
+        if log_file is None:
+            log_dir = "logs"
+            os.makedirs(log_dir, exist_ok=True)
+            date_str = datetime.now().strftime("%Y%m%d")
+            log_file = os.path.join(log_dir, f"military_system_{date_str}.log")
+
+        logger.setLevel(level)
+        logger.handlers.clear()
+
+        # تنسيق السجل: الوقت، المستوى، الملف/السطر، والرسالة
+        log_format = logging.Formatter(
+            "%(asctime)s [%(levelname)s] %(filename)s:%(lineno)d - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
         )
-        file_handler.setFormatter(log_format)
-        file_handler.setLevel(getattr(logging, log_level.upper(), logging.INFO))
-        logger.addHandler(file_handler)
-    except Exception as e:
-        # تسجيل فشل إعداد ملف السجل إلى وحدة التحكم كإجراء احتياطي
-        console_fallback = logging.StreamHandler()
-        console_fallback.setFormatter(log_format)
-        logger.addHandler(console_fallback)
-        logger.error(f"Failed to configure file logging: {e}")
-
-    # معالج وحدة التحكم لعرض السجلات في الطرفية
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(log_format)
-    console_handler.setLevel(getattr(logging, log_level.upper(), logging.INFO))
-    logger.addHandler(console_handler)
 
+        # معالج ملف السجل مع التدوير (حجم أقصى 5 ميغابايت، 3 نسخ احتياطية)
+        handlers = []
+        file_error = None
+        try:
+            file_handler = RotatingFileHandler(
+                log_file, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8"
+            )
+            file_handler.setFormatter(log_format)
+            file_handler.setLevel(level)
+            handlers.append(file_handler)
+        except Exception as e:
+            file_error = e
+
+        # معالج وحدة التحكم لعرض السجلات في الطرفية
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(log_format)
+        console_handler.setLevel(level)
+        handlers.append(console_handler)
+
+        # الكتابة الفعلية تتم في خيط المستمع، والمُسجّل يضع السجلات في الطابور فقط
+        log_queue = queue.Queue(maxsize=DEFAULT_QUEUE_SIZE)
+        queue_handler = _queue_handler(log_queue)
+        if DEFAULT_RATE_LIMIT > 0:
+            queue_handler.addFilter(RateLimitFilter(DEFAULT_RATE_LIMIT, DEFAULT_RATE_BURST))
+        logger.addHandler(queue_handler)
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+    if file_error is not None:
+        logger.error("Failed to configure file logging: %s", file_error)
     # تسجيل بدء إعداد النظام
     logger.info("Logging system configured successfully")
-    return logger
\ No newline at end of file
+    return logger
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the listener thread."""
+    global _listener
+    with _configure_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
@@ -1,19 +1,77 @@
 """Main entry point for the Military Image Analysis System."""
 import argparse
-import cv2
 import os
 import getpass
-from dotenv import load_dotenv
-from image_processor import analyze_image
-from live_feed import analyze_live_feed
-from database_manager import connect_to_db
-from audit_log import log_audit
-from logging_config import configure_logging
-from tqdm import tqdm
-from typing import List
-
-logger = configure_logging()
-load_dotenv()
+import json
+from logging_config import configure_logging, get_logger
+from typing import Dict, List, Optional, Tuple, Union
+
+# الوحدات الثقيلة (cv2 وmtcnn وpsycopg2 وtqdm) تُستورد داخل الأوامر التي تحتاجها فقط
+logger = get_logger()
+
+def log_audit(action: str, user_id: str, details: str) -> None:
+    """Record an audit event, importing the audit writer on first use."""
+    from audit_log import log_audit as _log_audit
+    _log_audit(action, user_id, details)
+
+def video_source(spec: str) -> Union[int, str]:
+    """Parse a live-feed source: a camera index, a video file or a stream URL.
+
+    Args:
+        spec: String such as "0", "clip.mp4" or "rtsp://host/stream".
+
+    Returns:
+        Camera index as int, otherwise the string unchanged.
+    """
+    return int(spec) if spec.isdigit() else spec
+
+def camera_threshold(spec: str) -> Tuple[int, float]:
+    """Parse a CAM=VALUE command-line pair.
+
+    Args:
+        spec: String such as "0=25".
+
+    Returns:
+        Tuple of (camera index, threshold).
+    """
+    cam, sep, value = spec.partition("=")
+    try:
+        if not sep:
+            raise ValueError(spec)
+        return int(cam), float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid camera threshold '{spec}', expected CAM=VALUE")
+
+def time_bound(spec: str) -> float:
+    """Parse a time bound: an ISO date or datetime, or an age such as "7d", "12h" or "30m".
+
+    Args:
+        spec: Command-line value; naive datetimes are local time.
+
+    Returns:
+        Seconds since the epoch.
+    """
+    import time
+    from datetime import datetime
+    units = {"d": 86400, "h": 3600, "m": 60}
+    try:
+        if spec[-1:] in units and spec[:-1].isdigit():
+            return time.time() - int(spec[:-1]) * units[spec[-1]]
+        return datetime.fromisoformat(spec).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time '{spec}', expected ISO date/datetime or e.g. 7d, 12h, 30m")
+
+def print_results(results: Optional[List[Tuple[str, int, str, str, str]]]) -> None:
+    """Print identified individuals in the CLI output format.
+
+    Args:
+        results: (name, age, nationality, crime, danger_level) records, or None.
+    """
+    if results:
+        for name, age, nationality, crime, danger_level in results:
+            print(f"Name: {name}\nAge: {age}\nNationality: {nationality}\nCrime: {crime}\nDanger Level: {danger_level}")
+    else:
+        print("No information found.")
 
 def analyze_image_command(image_path: str, user_id: str, offline_mode: bool) -> None:
     """Analyze a single image for face identification.
@@ -23,6 +81,10 @@ def analyze_image_command(image_path: str, user_id: str, offline_mode: bool) ->
         user_id: Identifier of the user.
         offline_mode: Whether to use offline database.
     """
+    import cv2
+    from image_processor import analyze_image
+    from tqdm import tqdm
+
     if not os.path.exists(image_path):
         logger.error("Image path does not exist")
         print("Error: Image path does not exist")
@@ -38,35 +100,271 @@ def analyze_image_command(image_path: str, user_id: str, offline_mode: bool) ->
         log_audit("analyze_image", user_id, f"Analyzing {image_path}, offline={offline_mode}")
         with tqdm(total=100, desc="Analyzing image") as pbar:
             results = analyze_image(image, progress_callback=lambda x: pbar.update(x), offline_mode=offline_mode)
-        if results:
-            for name, age, nationality, crime, danger_level in results:
-                print(f"Name: {name}\nAge: {age}\nNationality: {nationality}\nCrime: {crime}\nDanger Level: {danger_level}")
-        else:
-            print("No information found.")
+        print_results(results)
         log_audit("analyze_image_complete", user_id, f"Results: {len(results) if results else 0} matches")
     except Exception as e:
         logger.error(f"Analysis error: {e}")
         print(f"Error: {str(e)}")
         log_audit("analyze_image_error", user_id, str(e))
 
-def start_live_feed(cameras: List[int], user_id: str, offline_mode: bool) -> None:
+def analyze_batch_command(source: str, output_path: str, workers: int, resume: bool,
+                          user_id: str, offline_mode: bool) -> None:
+    """Analyze a directory, glob or file list of images with a process pool.
+
+    Args:
+        source: Directory, glob pattern or newline-delimited file list.
+        output_path: JSONL file receiving one result per image.
+        workers: Number of worker processes.
+        resume: Whether to skip images already in the output file.
+        user_id: Identifier of the user.
+        offline_mode: Whether to use offline database.
+    """
+    from batch_processor import run_batch
+
+    try:
+        log_audit("analyze_batch", user_id, f"Source: {source}, offline={offline_mode}")
+        summary = run_batch(source, output_path, offline_mode=offline_mode, workers=workers, resume=resume)
+        print(f"Processed {summary['processed']} images ({summary['skipped']} skipped, "
+              f"{summary['errors']} errors, {summary['matches']} matches) in {summary['elapsed_s']:.1f}s "
+              f"- {summary['images_per_sec']:.2f} images/sec")
+        log_audit("analyze_batch_complete", user_id, json.dumps(summary))
+    except Exception as e:
+        logger.error(f"Batch analysis error: {e}")
+        print(f"Error: {str(e)}")
+        log_audit("analyze_batch_error", user_id, str(e))
+
+def analyze_video_command(source: str, output_path: str, workers: Optional[int], every_nth: int,
+                          sample_fps: Optional[float], segment_seconds: float,
+                          user_id: str, offline_mode: bool) -> None:
+    """Analyze a video file in parallel time segments.
+
+    Args:
+        source: Video file.
+        output_path: JSONL file receiving one event per frame with faces.
+        workers: Number of worker processes.
+        every_nth: Analyze one frame out of every N.
+        sample_fps: Analyze frames at this rate instead.
+        segment_seconds: Maximum segment length.
+        user_id: Identifier of the user.
+        offline_mode: Whether to use offline database.
+    """
+    from video_processor import run_video
+
+    try:
+        log_audit("analyze_video", user_id, f"Source: {source}, offline={offline_mode}")
+        summary = run_video(source, output_path, offline_mode=offline_mode, workers=workers, every_nth=every_nth,
+                            sample_fps=sample_fps, segment_seconds=segment_seconds)
+        print(f"Analyzed {summary['sampled']} frames in {summary['segments']} segments "
+              f"({summary['events']} with faces, {summary['matches']} matches, "
+              f"{summary['failed_segments']} failed segments) in {summary['elapsed_s']:.1f}s "
+              f"- {summary['frames_per_sec']:.2f} frames/sec")
+        log_audit("analyze_video_complete", user_id, json.dumps(summary))
+    except Exception as e:
+        logger.error(f"Video analysis error: {e}")
+        print(f"Error: {str(e)}")
+        log_audit("analyze_video_error", user_id, str(e))
+
+def start_live_feed(cameras: List[Union[int, str]], user_id: str, offline_mode: bool, workers: int = 0,
+                    batch_size: int = 8, batch_wait_ms: int = 20, headless: bool = False,
+                    sink_spec: Optional[str] = None, motion_gate: bool = False,
+                    motion_thresholds: Optional[Dict[int, float]] = None,
+                    capture_processes: bool = False) -> None:
     """Start live feed analysis for face identification.
 
     Args:
-        cameras: List of camera indices.
+        cameras: Camera indices, video files or stream URLs.
         user_id: Identifier of the user.
         offline_mode: Whether to use offline database.
+        workers: Detection worker processes (0 detects in the main process).
+        batch_size: Maximum frames per detection batch.
+        batch_wait_ms: Maximum time to fill a detection batch.
+        headless: Run without any GUI window.
+        sink_spec: Detection sink ("jsonl:PATH", "unix:PATH" or a file path).
+        motion_gate: Run the detector only where motion occurred.
+        motion_thresholds: Per-camera motion thresholds.
+        capture_processes: Capture in separate processes through shared memory.
     """
+    from live_feed import analyze_live_feed
+    from output_sinks import create_sink
+
     try:
         log_audit("start_live_feed", user_id, f"Cameras: {cameras}, offline={offline_mode}")
-        print("Starting live feed (press 'q' to quit)...")
-        analyze_live_feed(cameras, offline_mode)
+        sink = create_sink(sink_spec) if sink_spec else None
+        print("Starting headless live feed (Ctrl+C to quit)..." if headless
+              else "Starting live feed (press 'q' to quit)...")
+        analyze_live_feed(cameras, offline_mode, workers=workers, max_batch_size=batch_size,
+                          max_wait_ms=batch_wait_ms, headless=headless, sink=sink,
+                          motion_gate=motion_gate, motion_thresholds=motion_thresholds,
+                          capture_processes=capture_processes)
         log_audit("live_feed_stopped", user_id, "Live feed terminated")
+    except KeyboardInterrupt:
+        print("Live feed stopped.")
+        log_audit("live_feed_stopped", user_id, "Live feed interrupted")
     except Exception as e:
         logger.error(f"Live feed error: {e}")
         print(f"Error: {str(e)}")
         log_audit("live_feed_error", user_id, str(e))
 
+def serve_command(socket_path: Optional[str], port: Optional[int], batch_size: int, batch_wait_ms: int,
+                  queue_size: int, user_id: str, offline_mode: bool) -> None:
+    """Keep the detector, watchlist and database warm and analyze images for local clients.
+
+    Args:
+        socket_path: Unix socket to listen on.
+        port: Localhost TCP port to listen on instead of the socket.
+        batch_size: Maximum images per analysis batch.
+        batch_wait_ms: Maximum time to fill an analysis batch.
+        queue_size: Queued requests before new ones are rejected.
+        user_id: Identifier of the user.
+        offline_mode: Whether to use offline database.
+    """
+    from analysis_server import serve
+
+    try:
+        log_audit("serve_start", user_id, f"Socket: {socket_path}, port: {port}, offline={offline_mode}")
+        serve(offline_mode, socket_path=socket_path, port=port, max_batch_size=batch_size,
+              max_wait_ms=batch_wait_ms, max_queue=queue_size)
+        log_audit("serve_stopped", user_id, "Analysis server stopped")
+    except Exception as e:
+        logger.error(f"Analysis server error: {e}")
+        print(f"Error: {str(e)}")
+        log_audit("serve_error", user_id, str(e))
+
+def client_command(image_path: str, socket_path: Optional[str], url: Optional[str], user_id: str) -> None:
+    """Analyze an image on a running `serve` process.
+
+    Args:
+        image_path: Path to the image file.
+        socket_path: Server Unix socket.
+        url: Server base URL, used instead of the socket.
+        user_id: Identifier of the user, audited by the server.
+    """
+    from analysis_client import analyze_remote
+
+    if not os.path.exists(image_path):
+        print("Error: Image path does not exist")
+        return
+    try:
+        with open(image_path, "rb") as f:
+            response = analyze_remote(f.read(), user_id, socket_path=socket_path, url=url)
+        print_results([tuple(match[field] for field in ("name", "age", "nationality", "crime", "danger_level"))
+                       for match in response["matches"]])
+    except Exception as e:
+        logger.error(f"Analysis client error: {e}")
+        print(f"Error: {str(e)}")
+
+def migrate_embeddings_command(clear_legacy: bool, user_id: str, offline_mode: bool) -> None:
+    """Convert stored face encodings to the binary embedding format.
+
+    Args:
+        clear_legacy: Whether to drop legacy text encodings once converted.
+        user_id: Identifier of the user.
+        offline_mode: Whether to migrate the offline database.
+    """
+    from database_manager import get_offline_store, get_pool, migrate_online_embeddings
+
+    try:
+        if offline_mode:
+            count = get_offline_store().migrate_embeddings(clear_legacy=clear_legacy)
+        else:
+            with get_pool().connection() as db:
+                count = migrate_online_embeddings(db, clear_legacy=clear_legacy)
+        print(f"Migrated {count} embeddings")
+        log_audit("migrate_embeddings", user_id, f"Rows: {count}, offline={offline_mode}")
+    except Exception as e:
+        logger.error(f"Migration error: {e}")
+        print(f"Error: {str(e)}")
+        log_audit("migrate_embeddings_error", user_id, str(e))
+
+def audit_export_command(output_path: str, since: Optional[float], until: Optional[float],
+                         audit_user: Optional[str], action: Optional[str], user_id: str) -> None:
+    """Stream decrypted audit events matching the filters to JSONL.
+
+    Args:
+        output_path: JSONL file, or "-" for standard output.
+        since: Inclusive lower time bound in seconds since the epoch.
+        until: Exclusive upper time bound in seconds since the epoch.
+        audit_user: Only events of this user.
+        action: Only events of this action.
+        user_id: Identifier of the user running the export.
+    """
+    import sys
+    from audit_log import iter_audit_events
+
+    filters = {"since": since, "until": until, "user": audit_user, "action": action}
+    try:
+        log_audit("audit_export", user_id, json.dumps(filters))
+        count = 0
+        out = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+        try:
+            for event in iter_audit_events(since=since, until=until, user_id=audit_user, action=action):
+                out.write(json.dumps(event, ensure_ascii=False) + "\n")
+                count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if output_path != "-":
+            print(f"Exported {count} audit events to {output_path}")
+        log_audit("audit_export_complete", user_id, f"Events: {count}")
+    except Exception as e:
+        logger.error(f"Audit export error: {e}")
+        print(f"Error: {str(e)}")
+        log_audit("audit_export_error", user_id, str(e))
+
+def migrate_audit_command(legacy_path: str, user_id: str) -> None:
+    """Import the old single-file audit log into the partitioned store.
+
+    The legacy file is renamed with a ".migrated" suffix afterwards so it
+    cannot be imported twice.
+
+    Args:
+        legacy_path: Path to the old audit database.
+        user_id: Identifier of the user.
+    """
+    from audit_log import import_legacy_audit
+
+    if not os.path.exists(legacy_path):
+        print(f"Error: {legacy_path} does not exist")
+        return
+    try:
+        count = import_legacy_audit(legacy_path)
+        os.replace(legacy_path, f"{legacy_path}.migrated")
+        print(f"Imported {count} audit events from {legacy_path}")
+        log_audit("migrate_audit", user_id, f"Imported {count} events from {legacy_path}")
+    except Exception as e:
+        logger.error(f"Audit migration error: {e}")
+        print(f"Error: {str(e)}")
+        log_audit("migrate_audit_error", user_id, str(e))
+
+def sync_watchlist_command(full: bool, prepare: bool, batch_size: int, user_id: str, offline_mode: bool) -> None:
+    """Copy changed online watchlist rows into the offline store.
+
+    Args:
+        full: Copy every row instead of only those changed since the last sync.
+        prepare: Add change tracking to the online table first.
+        batch_size: Rows fetched and written per batch.
+        user_id: Identifier of the user.
+        offline_mode: Whether the online database is unavailable.
+    """
+    from database_manager import get_pool, prepare_watchlist_sync
+    from watchlist_sync import sync_watchlist
+
+    if offline_mode:
+        print("Error: Watchlist sync requires the online database")
+        return
+    try:
+        with get_pool().connection() as db:
+            if prepare:
+                prepare_watchlist_sync(db)
+            summary = sync_watchlist(db, full=full, batch_size=batch_size)
+        print(f"Synced watchlist: {summary['upserted']} rows upserted, {summary['deleted']} deleted "
+              f"in {summary['elapsed_s']:.1f}s (watermark {summary['watermark']})")
+        log_audit("sync_watchlist", user_id, json.dumps(summary))
+    except Exception as e:
+        logger.error(f"Watchlist sync error: {e}")
+        print(f"Error: {str(e)}")
+        log_audit("sync_watchlist_error", user_id, str(e))
+
 def main() -> None:
     """Parse command-line arguments and run the system."""
     parser = argparse.ArgumentParser(description="Military Image Analysis System")
@@ -76,38 +374,159 @@ def main() -> None:
     analyze_parser = subparsers.add_parser("analyze", help="Analyze an image")
     analyze_parser.add_argument("image_path", type=str, help="Path to the image file")
 
+    batch_parser = subparsers.add_parser("analyze-batch", help="Analyze a directory, glob or file list of images")
+    batch_parser.add_argument("source", type=str, help="Directory, glob pattern or newline-delimited file list")
+    batch_parser.add_argument("--output", type=str, default="batch_results.jsonl", help="JSONL results file")
+    batch_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    batch_parser.add_argument("--no-resume", dest="resume", action="store_false",
+                              help="Reprocess images already present in the results file")
+
+    video_parser = subparsers.add_parser("analyze-video", help="Analyze a video file in parallel segments")
+    video_parser.add_argument("source", type=str, help="Video file")
+    video_parser.add_argument("--output", type=str, default="video_results.jsonl", help="JSONL results file")
+    video_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    sampling = video_parser.add_mutually_exclusive_group()
+    sampling.add_argument("--every", type=int, default=1, metavar="N", help="Analyze one frame out of every N")
+    sampling.add_argument("--fps", type=float, default=None, help="Analyze frames at this rate")
+    video_parser.add_argument("--segment-seconds", type=float, default=60.0,
+                              help="Maximum length of the segments processed in parallel")
+
+    serve_parser = subparsers.add_parser("serve", help="Serve image analysis from a warm process")
+    serve_listen = serve_parser.add_mutually_exclusive_group()
+    serve_listen.add_argument("--socket", type=str, default=None,
+                              help="Unix socket path (default: ANALYSIS_SOCKET or analysis.sock)")
+    serve_listen.add_argument("--port", type=int, default=None,
+                              help="Listen on 127.0.0.1:PORT instead of a socket (requires ANALYSIS_TOKEN)")
+    serve_parser.add_argument("--batch-size", type=int, default=8, help="Maximum images per analysis batch")
+    serve_parser.add_argument("--batch-wait-ms", type=int, default=10,
+                              help="Maximum milliseconds to fill an analysis batch")
+    serve_parser.add_argument("--queue-size", type=int, default=64,
+                              help="Queued requests before new ones are rejected with 503")
+
+    client_parser = subparsers.add_parser("client", help="Analyze an image on a running server")
+    client_parser.add_argument("image_path", type=str, help="Path to the image file")
+    client_target = client_parser.add_mutually_exclusive_group()
+    client_target.add_argument("--socket", type=str, default=None,
+                               help="Server Unix socket (default: ANALYSIS_SOCKET or analysis.sock)")
+    client_target.add_argument("--url", type=str, default=None, help="Server URL, e.g. http://127.0.0.1:8765")
+
+    migrate_parser = subparsers.add_parser("migrate-embeddings", help="Convert stored encodings to the binary format")
+    migrate_parser.add_argument("--clear-legacy", action="store_true", help="Drop legacy text encodings after conversion")
+
+    sync_parser = subparsers.add_parser("sync-watchlist", help="Copy changed watchlist rows into the offline store")
+    sync_parser.add_argument("--full", action="store_true", help="Copy every row and drop rows deleted upstream")
+    sync_parser.add_argument("--prepare", action="store_true",
+                             help="Add change tracking (updated_at column, triggers) to the online table first")
+    sync_parser.add_argument("--batch-size", type=int, default=1000, help="Rows per batch")
+
+    export_parser = subparsers.add_parser("audit-export", help="Export decrypted audit events as JSONL")
+    export_parser.add_argument("--output", type=str, default="-", help="JSONL file (default: standard output)")
+    export_parser.add_argument("--since", type=time_bound, default=None,
+                               help="Start time: ISO date/datetime or age such as 7d, 12h")
+    export_parser.add_argument("--until", type=time_bound, default=None, help="End time (exclusive), same formats")
+    export_parser.add_argument("--user", type=str, default=None, help="Only events of this user")
+    export_parser.add_argument("--action", type=str, default=None, help="Only events of this action")
+
+    audit_migrate_parser = subparsers.add_parser("migrate-audit",
+                                                 help="Import the old single-file audit log into partitions")
+    audit_migrate_parser.add_argument("--legacy", type=str, default="audit_log.db", help="Old audit database")
+
     live_feed_parser = subparsers.add_parser("live-feed", help="Start live feed analysis")
-    live_feed_parser.add_argument("--cameras", type=int, nargs="+", default=[0], help="Camera indices")
+    live_feed_parser.add_argument("--cameras", type=video_source, nargs="+", default=[0],
+                                  help="Camera indices, video files or stream URLs")
+    live_feed_parser.add_argument("--workers", type=int, default=0,
+                                  help="Detection worker processes (0: detect in the main process)")
+    live_feed_parser.add_argument("--batch-size", type=int, default=8, help="Maximum frames per detection batch")
+    live_feed_parser.add_argument("--batch-wait-ms", type=int, default=20,
+                                  help="Maximum milliseconds to fill a detection batch")
+    live_feed_parser.add_argument("--headless", action="store_true", help="Run without display windows")
+    live_feed_parser.add_argument("--sink", type=str, default=None,
+                                  help="Detection output: jsonl:PATH, unix:PATH or a JSONL file path")
+    live_feed_parser.add_argument("--motion-gate", action="store_true",
+                                  help="Skip detection on static frames and detect only where motion occurred")
+    live_feed_parser.add_argument("--motion-threshold", type=camera_threshold, nargs="+", default=[], metavar="CAM=VALUE",
+                                  help="Per-camera motion threshold (default: MOTION_THRESHOLD or 25)")
+    live_feed_parser.add_argument("--capture-processes", action="store_true",
+                                  help="Capture each camera in its own process and share frames through shared memory")
 
     args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+        return
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    configure_logging()
+    if args.command in ("audit-export", "migrate-audit"):
+        # لا يحتاج سجل التدقيق إلى قاعدة البيانات المركزية
+        if args.command == "audit-export":
+            audit_export_command(args.output, args.since, args.until, args.user, args.action, getpass.getuser())
+        else:
+            migrate_audit_command(args.legacy, getpass.getuser())
+        return
+    if args.command == "client":
+        # العميل خفيف: لا قاعدة بيانات ولا مُكتشف، فالخادم يملكهما جاهزين
+        client_command(args.image_path, args.socket, args.url, getpass.getuser())
+        return
+    from database_manager import close_pool, get_pool
+    from metrics import start_exporters_from_env, write_textfile
+
     user_id = getpass.getuser()
     offline_mode = args.offline
 
-    db = None
     try:
+        start_exporters_from_env()
         if not offline_mode:
-            db = connect_to_db()
-            if not db:
-                logger.warning("Falling back to offline mode")
+            try:
+                get_pool()
+            except Exception as e:
+                logger.warning(f"Database unavailable ({e}), falling back to offline mode")
                 offline_mode = True
 
+        if args.command in ("analyze", "live-feed", "serve"):
+            from face_matcher import get_matcher
+            try:
+                get_matcher(offline_mode)
+            except Exception as e:
+                logger.error(f"Watchlist preload failed: {e}")
+
         if args.command == "analyze":
+            from detector_registry import IMAGE_DETECTOR_CONFIG, warm_up
+            warm_up(*IMAGE_DETECTOR_CONFIG)
             analyze_image_command(args.image_path, user_id, offline_mode)
+        elif args.command == "analyze-batch":
+            analyze_batch_command(args.source, args.output, args.workers, args.resume, user_id, offline_mode)
+        elif args.command == "analyze-video":
+            analyze_video_command(args.source, args.output, args.workers, args.every, args.fps,
+                                  args.segment_seconds, user_id, offline_mode)
+        elif args.command == "serve":
+            serve_command(args.socket, args.port, args.batch_size, args.batch_wait_ms, args.queue_size,
+                          user_id, offline_mode)
+        elif args.command == "migrate-embeddings":
+            migrate_embeddings_command(args.clear_legacy, user_id, offline_mode)
+        elif args.command == "sync-watchlist":
+            sync_watchlist_command(args.full, args.prepare, args.batch_size, user_id, offline_mode)
         elif args.command == "live-feed":
-            start_live_feed(args.cameras, user_id, offline_mode)
-        else:
-            parser.print_help()
+            if args.workers <= 0:
+                from detector_registry import LIVE_FEED_DETECTOR_CONFIG, warm_up
+                warm_up(*LIVE_FEED_DETECTOR_CONFIG)
+            start_live_feed(args.cameras, user_id, offline_mode, args.workers, args.batch_size,
+                            args.batch_wait_ms, args.headless, args.sink, args.motion_gate,
+                            dict(args.motion_threshold), args.capture_processes)
     except Exception as e:
         logger.error(f"Execution error: {e}")
         print(f"Error: {str(e)}")
         log_audit("main_error", user_id, str(e))
     finally:
-        if db:
+        if os.getenv("METRICS_TEXTFILE"):
             try:
-                db.close()
-                logger.info("Database connection closed")
+                write_textfile(os.getenv("METRICS_TEXTFILE"))
             except Exception as e:
-                logger.error(f"Error closing database: {e}")
+                logger.error(f"Metrics export error: {e}")
+        try:
+            close_pool()
+        except Exception as e:
+            logger.error(f"Error closing database pool: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""Module for lightweight runtime metrics with a Prometheus exporter."""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging_config import get_logger
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = get_logger()
+
+LabelValues = Tuple[str, ...]
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    """Render a Prometheus label set."""
+    parts = [f'{n}="{str(v)}"'.replace("\n", " ") for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    """Base class holding name, help text and label names."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        """Order label values by the declared label names."""
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Render the metric in Prometheus text format."""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase the counter.
+
+        Args:
+            amount: Non-negative increment.
+            **labels: Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """Current value for a label set."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return super().render() + [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed when scraped."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase (or with a negative amount, decrease) the gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_function(self, fn: Optional[Callable[[], float]], **labels) -> None:
+        """Compute the gauge on every scrape; costs nothing between scrapes.
+
+        Args:
+            fn: Callable returning the value, or None to remove it.
+            **labels: Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            if fn is None:
+                self._functions.pop(key, None)
+            else:
+                self._functions[key] = fn
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, fn in functions:
+            try:
+                values[key] = float(fn())
+            except Exception:
+                continue
+        return super().render() + [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in values.items()]
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; `observe` is one bisect and one locked update."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation.
+
+        Args:
+            value: Observed value (seconds for latency histograms).
+            **labels: Label values.
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # عدّادات الفئات ثم +Inf ثم المجموع
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of a block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines = super().render()
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric and return it."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ips_stage_seconds", "Latency of pipeline stages in seconds", ["stage"]))
+CAMERA_FRAMES = REGISTRY.register(Counter(
+    "ips_camera_frames_total", "Live-feed frames per camera by state (captured, dropped, processed)",
+    ["camera", "state"]))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "ips_queue_depth", "Items waiting in internal queues", ["queue"]))
+MATCHES = REGISTRY.register(Counter(
+    "ips_watchlist_matches_total", "Faces matched against the watchlist by result", ["result"]))
+MOTION_FRAMES = REGISTRY.register(Counter(
+    "ips_motion_gate_frames_total", "Live-feed frames by motion gate decision (full, roi, skipped)",
+    ["camera", "decision"]))
+DETECTOR_PIXELS = REGISTRY.register(Counter(
+    "ips_motion_gate_pixels_total", "Frame pixels sent to the detector or avoided by the motion gate",
+    ["camera", "state"]))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "ips_result_cache_lookups_total", "Match result cache lookups by result (hit, miss)", ["result"]))
+SERVE_REQUESTS = REGISTRY.register(Counter(
+    "ips_serve_requests_total", "Analysis server requests by result (ok, rejected, unauthorized, overloaded, timeout, error)",
+    ["result"]))
+LOG_RECORDS_DROPPED = REGISTRY.register(Counter(
+    "ips_log_records_dropped_total", "Log records dropped because the log queue was full", ["level"]))
+
+def write_textfile(path: str) -> None:
+    """Atomically write all metrics to a file for the node_exporter textfile collector.
+
+    Args:
+        path: Destination `.prom` file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)
+
+def start_textfile_exporter(path: str, interval: float = 15.0) -> threading.Thread:
+    """Rewrite the metrics file periodically from a daemon thread.
+
+    Args:
+        path: Destination `.prom` file.
+        interval: Seconds between writes.
+
+    Returns:
+        The exporter thread.
+    """
+    def run() -> None:
+        while True:
+            try:
+                write_textfile(path)
+            except Exception as e:
+                logger.error(f"Metrics textfile export failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="MetricsTextfile", daemon=True)
+    thread.start()
+    logger.info(f"Writing metrics to {path} every {interval:.0f}s")
+    return thread
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serve the registry on GET /metrics."""
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+def start_http_server(port: int, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve metrics over HTTP at /metrics from a daemon thread.
+
+    Args:
+        port: TCP port.
+        addr: Bind address; localhost by default.
+
+    Returns:
+        The running server.
+    """
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="MetricsHTTP", daemon=True).start()
+    logger.info(f"Serving metrics on http://{addr}:{server.server_port}/metrics")
+    return server
+
+def start_exporters_from_env() -> None:
+    """Start the exporters configured by METRICS_PORT and METRICS_TEXTFILE."""
+    port = os.getenv("METRICS_PORT")
+    if port:
+        start_http_server(int(port), os.getenv("METRICS_ADDR", "127.0.0.1"))
+    textfile = os.getenv("METRICS_TEXTFILE")
+    if textfile:
+        start_textfile_exporter(textfile, float(os.getenv("METRICS_TEXTFILE_INTERVAL", 15)))
@@ -0,0 +1,222 @@
+"""Module for gating live-feed face detection on motion."""
+import os
+import time
+import cv2
+import numpy as np
+from metrics import DETECTOR_PIXELS, MOTION_FRAMES
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Region = Tuple[int, int, int, int]
+
+DEFAULT_MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", 25))
+DEFAULT_MOTION_MIN_AREA = float(os.getenv("MOTION_MIN_AREA", 0.002))
+DEFAULT_MOTION_REFRESH_SECONDS = float(os.getenv("MOTION_REFRESH_SECONDS", 2.0))
+
+def _merge_regions(regions: List[Region]) -> List[Region]:
+    """Merge overlapping (x0, y0, x1, y1) regions until none overlap."""
+    merged = list(regions)
+    changed = True
+    while changed:
+        changed = False
+        result: List[Region] = []
+        for region in merged:
+            for i, other in enumerate(result):
+                if region[0] < other[2] and other[0] < region[2] and region[1] < other[3] and other[1] < region[3]:
+                    result[i] = (min(region[0], other[0]), min(region[1], other[1]),
+                                 max(region[2], other[2]), max(region[3], other[3]))
+                    changed = True
+                    break
+            else:
+                result.append(region)
+        merged = result
+    return merged
+
+class MotionDetector:
+    """Frame differencing against a running-average background for one camera.
+
+    Works on a downscaled, blurred grayscale copy of the frame, so the cost is
+    a small fraction of one detector pass.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_MOTION_THRESHOLD, min_area: float = DEFAULT_MOTION_MIN_AREA,
+                 scale: float = 0.25, padding: float = 0.3, min_padding: int = 24, max_coverage: float = 0.6,
+                 refresh_seconds: float = DEFAULT_MOTION_REFRESH_SECONDS, alpha: float = 0.5):
+        """Initialize the detector.
+
+        Args:
+            threshold: Minimum gray-level difference counted as motion.
+            min_area: Minimum changed area as a fraction of the frame.
+            scale: Downscale factor applied before differencing.
+            padding: Padding around motion as a fraction of its size.
+            min_padding: Minimum padding in full-resolution pixels.
+            max_coverage: Motion covering more of the frame than this runs a
+                full-frame detection instead of regions.
+            refresh_seconds: Interval of forced full-frame detections.
+            alpha: Background update rate.
+        """
+        self.threshold = threshold
+        self.min_area = min_area
+        self.scale = scale
+        self.padding = padding
+        self.min_padding = min_padding
+        self.max_coverage = max_coverage
+        self.refresh_seconds = refresh_seconds
+        self.alpha = alpha
+        self._background: Optional[np.ndarray] = None
+        self._last_full = 0.0
+
+    def regions(self, frame: np.ndarray, now: Optional[float] = None) -> Optional[List[Region]]:
+        """Find the frame regions that need face detection.
+
+        Args:
+            frame: BGR frame.
+            now: Current time; defaults to time.monotonic().
+
+        Returns:
+            None when the whole frame must be detected, an empty list for a
+            static frame, otherwise padded (x0, y0, x1, y1) regions.
+        """
+        now = time.monotonic() if now is None else now
+        height, width = frame.shape[:2]
+        small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), None, fx=self.scale, fy=self.scale,
+                           interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        if (self._background is None or self._background.shape != small.shape
+                or now - self._last_full >= self.refresh_seconds):
+            self._background = small.astype(np.float32)
+            self._last_full = now
+            return None
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self._background))
+        cv2.accumulateWeighted(small, self._background, self.alpha)
+        mask = cv2.dilate((diff > self.threshold).astype(np.uint8), None, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_pixels = self.min_area * small.shape[0] * small.shape[1]
+        regions = []
+        for contour in contours:
+            if cv2.contourArea(contour) < min_pixels:
+                continue
+            x, y, w, h = (v / self.scale for v in cv2.boundingRect(contour))
+            pad = max(self.padding * max(w, h), self.min_padding)
+            regions.append((max(int(x - pad), 0), max(int(y - pad), 0),
+                            min(int(x + w + pad), width), min(int(y + h + pad), height)))
+        regions = _merge_regions(regions)
+        if sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions) > self.max_coverage * width * height:
+            self._last_full = now
+            return None
+        return regions
+
+def _offset_face(face: Dict, dx: int, dy: int) -> Dict:
+    """Translate an MTCNN detection from region to frame coordinates."""
+    x, y, w, h = face["box"]
+    moved = dict(face, box=[x + dx, y + dy, w, h])
+    if "keypoints" in face:
+        moved["keypoints"] = {name: (px + dx, py + dy) for name, (px, py) in face["keypoints"].items()}
+    return moved
+
+def _center_in(face: Dict, regions: Sequence[Region]) -> bool:
+    """Whether the centre of an MTCNN box lies inside any region."""
+    x, y, w, h = face["box"]
+    cx, cy = x + w / 2, y + h / 2
+    return any(x0 <= cx < x1 and y0 <= cy < y1 for x0, y0, x1, y1 in regions)
+
+class MotionGate:
+    """Per-camera motion gating of the detector.
+
+    `plan` decides what to detect on each frame: nothing for a static frame,
+    padded motion regions, or the full frame (first frame, periodic refresh,
+    widespread motion). `merge` combines the region detections with the
+    camera's previous faces outside the regions. Both must be called in
+    capture order for a camera.
+    """
+
+    def __init__(self, thresholds: Optional[Dict[int, float]] = None, **detector_options):
+        """Initialize the gate.
+
+        Args:
+            thresholds: Per-camera motion thresholds overriding MOTION_THRESHOLD.
+            **detector_options: Further MotionDetector settings.
+        """
+        self.thresholds = thresholds or {}
+        self.detector_options = detector_options
+        self._detectors: Dict[int, MotionDetector] = {}
+        self._faces: Dict[int, list] = {}
+        self._stats: Dict[int, Dict[str, int]] = {}
+
+    def plan(self, cam_idx: int, frame: np.ndarray) -> Optional[List[Region]]:
+        """Decide which parts of a frame to run the detector on.
+
+        Args:
+            cam_idx: Camera index.
+            frame: BGR frame.
+
+        Returns:
+            None for the full frame, otherwise (x0, y0, x1, y1) regions
+            (empty for a static frame).
+        """
+        detector = self._detectors.get(cam_idx)
+        if detector is None:
+            options = dict(self.detector_options)
+            options.setdefault("threshold", self.thresholds.get(cam_idx, DEFAULT_MOTION_THRESHOLD))
+            detector = self._detectors[cam_idx] = MotionDetector(**options)
+        regions = detector.regions(frame)
+
+        total = frame.shape[0] * frame.shape[1]
+        detected = total if regions is None else sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions)
+        decision = "full" if regions is None else "roi" if regions else "skipped"
+        stats = self._stats.setdefault(cam_idx, {"full": 0, "roi": 0, "skipped": 0,
+                                                 "pixels_detected": 0, "pixels_avoided": 0})
+        stats[decision] += 1
+        stats["pixels_detected"] += detected
+        stats["pixels_avoided"] += total - detected
+        MOTION_FRAMES.inc(camera=cam_idx, decision=decision)
+        DETECTOR_PIXELS.inc(detected, camera=cam_idx, state="detected")
+        DETECTOR_PIXELS.inc(total - detected, camera=cam_idx, state="avoided")
+        return regions
+
+    @staticmethod
+    def crops(frame: np.ndarray, regions: Optional[List[Region]]) -> List[np.ndarray]:
+        """Cut the images to run the detector on for a plan.
+
+        Args:
+            frame: BGR frame.
+            regions: Result of `plan`.
+
+        Returns:
+            The full frame, or one crop per region.
+        """
+        if regions is None:
+            return [frame]
+        return [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in regions]
+
+    def merge(self, cam_idx: int, regions: Optional[List[Region]], crop_faces: List[list]) -> list:
+        """Combine region detections with the faces carried over from earlier frames.
+
+        Args:
+            cam_idx: Camera index.
+            regions: Result of `plan` for the frame.
+            crop_faces: MTCNN detections for each crop from `crops`.
+
+        Returns:
+            MTCNN detections for the whole frame.
+        """
+        if regions is None:
+            faces = list(crop_faces[0]) if crop_faces else []
+        else:
+            faces = [face for face in self._faces.get(cam_idx, []) if not _center_in(face, regions)]
+            for (x0, y0, _, _), detections in zip(regions, crop_faces):
+                faces.extend(_offset_face(face, x0, y0) for face in detections)
+        self._faces[cam_idx] = faces
+        return faces
+
+    def stats(self) -> Dict[int, Dict[str, float]]:
+        """Per-camera decision counts and the share of detector pixels avoided.
+
+        Returns:
+            Mapping of camera index to statistics.
+        """
+        result = {}
+        for cam_idx, stats in self._stats.items():
+            pixels = stats["pixels_detected"] + stats["pixels_avoided"]
+            result[cam_idx] = dict(stats, avoided_ratio=round(stats["pixels_avoided"] / pixels, 4) if pixels else 0.0)
+        return result
@@ -0,0 +1,169 @@
+"""Module for live-feed outputs: detection sinks and the display renderer."""
+import json
+import socket
+from abc import ABC, abstractmethod
+import threading
+import time
+import numpy as np
+from logging_config import get_logger
+from typing import Dict, Optional
+
+logger = get_logger()
+
+class DetectionSink(ABC):
+    """Base class for consumers of per-frame detection events."""
+
+    @abstractmethod
+    def emit(self, event: Dict) -> None:
+        """Publish one detection event.
+
+        Args:
+            event: JSON-serializable event.
+        """
+
+    def close(self) -> None:
+        """Release resources held by the sink."""
+
+class JsonlFileSink(DetectionSink):
+    """Append detection events to a JSON Lines file."""
+
+    def __init__(self, path: str):
+        """Open the output file for appending.
+
+        Args:
+            path: Path to the JSONL file.
+        """
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict) -> None:
+        """Append one event as a line and flush it to the file."""
+        with self._lock:
+            self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close the output file."""
+        with self._lock:
+            self._file.close()
+
+class UnixSocketSink(DetectionSink):
+    """Stream detection events as JSON lines to a Unix domain socket.
+
+    Sends never block the analysis loop for more than `send_timeout`; events
+    are dropped while the peer is unavailable and the connection is retried
+    at most every `retry_interval` seconds.
+    """
+
+    def __init__(self, path: str, send_timeout: float = 0.05, retry_interval: float = 2.0):
+        """Initialize the sink; the connection is opened lazily.
+
+        Args:
+            path: Filesystem path of the listening socket.
+            send_timeout: Maximum seconds a single send may block.
+            retry_interval: Minimum seconds between reconnection attempts.
+        """
+        self.path = path
+        self.send_timeout = send_timeout
+        self.retry_interval = retry_interval
+        self.dropped = 0
+        self._sock: Optional[socket.socket] = None
+        self._last_attempt = 0.0
+
+    def _connect(self) -> Optional[socket.socket]:
+        """Connect to the socket if not connected and the retry interval elapsed."""
+        if self._sock is None and time.monotonic() - self._last_attempt >= self.retry_interval:
+            self._last_attempt = time.monotonic()
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.send_timeout)
+                sock.connect(self.path)
+                self._sock = sock
+                logger.info(f"Detection sink connected to {self.path}")
+            except OSError as e:
+                logger.warning("Detection sink unavailable (%s): %s", self.path, e)
+        return self._sock
+
+    def emit(self, event: Dict) -> None:
+        """Send one event as a JSON line, dropping it if the peer is unavailable."""
+        sock = self._connect()
+        if sock is None:
+            self.dropped += 1
+            return
+        try:
+            sock.sendall((json.dumps(event, ensure_ascii=False) + "\n").encode())
+        except OSError as e:
+            logger.warning("Detection sink send failed: %s", e)
+            self.dropped += 1
+            self.close()
+
+    def close(self) -> None:
+        """Close the connection; the next `emit` reconnects."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+def create_sink(spec: str) -> DetectionSink:
+    """Create a sink from a CLI specification.
+
+    Args:
+        spec: "unix:/path/to.sock", "jsonl:/path/to/file.jsonl" or a plain
+            file path (JSONL).
+
+    Returns:
+        Configured DetectionSink.
+    """
+    kind, _, target = spec.partition(":")
+    if kind == "unix" and target:
+        return UnixSocketSink(target)
+    if kind == "jsonl" and target:
+        return JsonlFileSink(target)
+    return JsonlFileSink(spec)
+
+class FrameRenderer:
+    """Display loop showing the latest annotated frame of every camera.
+
+    `submit` only swaps a reference, so the analysis loop never waits for
+    drawing or the GUI event loop. `run` must be called from the main thread,
+    because HighGUI backends such as Cocoa on macOS only work there; the
+    analysis then runs in a background thread. Pressing 'q' in a window sets
+    the stop event.
+    """
+
+    def __init__(self, stop_event: threading.Event, refresh_ms: int = 15):
+        """Initialize the renderer; windows open once `run` is called.
+
+        Args:
+            stop_event: Event set when the user quits; also ends `run`.
+            refresh_ms: GUI event loop interval in milliseconds.
+        """
+        self.stop_event = stop_event
+        self.refresh_ms = refresh_ms
+        self._latest: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, cam_idx: int, frame: np.ndarray) -> None:
+        """Replace the frame shown for a camera.
+
+        Args:
+            cam_idx: Camera index.
+            frame: Annotated frame; must not be modified afterwards.
+        """
+        with self._lock:
+            self._latest[cam_idx] = frame
+
+    def run(self) -> None:
+        """Show pending frames and pump the GUI event loop until stopped; call from the main thread."""
+        import cv2
+        while not self.stop_event.is_set():
+            with self._lock:
+                pending, self._latest = self._latest, {}
+            for cam_idx, frame in pending.items():
+                cv2.imshow(f"Camera {cam_idx}", frame)
+            if cv2.waitKey(self.refresh_ms) & 0xFF == ord('q'):
+                self.stop_event.set()
+        cv2.destroyAllWindows()
+
+    def close(self) -> None:
+        """Make `run` return and close its windows."""
+        self.stop_event.set()
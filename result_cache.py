@@ -0,0 +1,131 @@
+"""Module for caching watchlist match results by perceptual face hash."""
+import os
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+from metrics import CACHE_LOOKUPS
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+DEFAULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 4096))
+DEFAULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 300))
+DEFAULT_HASH_SIZE = int(os.getenv("RESULT_CACHE_HASH_SIZE", 16))
+
+def face_hash(face_crop: np.ndarray, hash_size: int = DEFAULT_HASH_SIZE) -> bytes:
+    """Compute a difference hash (dHash) of a face crop.
+
+    The crop is converted to grayscale, resized to (hash_size + 1, hash_size)
+    and contrast-normalized, so the same face under small lighting or
+    resampling changes hashes identically.
+
+    Args:
+        face_crop: Face region as BGR array.
+        hash_size: Hash side length; the hash has hash_size**2 bits.
+
+    Returns:
+        Packed hash bytes.
+    """
+    gray = cv2.cvtColor(face_crop, cv2.COLOR_BGR2GRAY) if face_crop.ndim == 3 else face_crop
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    small = cv2.equalizeHist(small)
+    return np.packbits(small[:, 1:] > small[:, :-1]).tobytes()
+
+class ResultCache:
+    """Bounded LRU cache with TTL for positive and negative match results.
+
+    Entries remember the watchlist generation they were computed against; a
+    reloaded watchlist makes them misses, so no explicit purge is needed.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, ttl_seconds: float = DEFAULT_CACHE_TTL):
+        """Initialize an empty cache.
+
+        Args:
+            max_size: Maximum number of entries; 0 disables caching.
+            ttl_seconds: Lifetime of an entry.
+        """
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidated": 0}
+
+    def get(self, key: Hashable, generation: int) -> Tuple[bool, Any]:
+        """Look up a cached result.
+
+        Args:
+            key: Cache key.
+            generation: Current watchlist generation.
+
+        Returns:
+            Tuple of (hit, value); value is meaningful only on a hit and may
+            be None for a cached negative result.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, entry_generation = entry
+                if entry_generation != generation:
+                    del self._entries[key]
+                    self._stats["invalidated"] += 1
+                elif expires_at < time.monotonic():
+                    del self._entries[key]
+                    self._stats["expired"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    CACHE_LOOKUPS.inc(result="hit")
+                    return True, value
+            self._stats["misses"] += 1
+        CACHE_LOOKUPS.inc(result="miss")
+        return False, None
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        """Store a result, evicting the least recently used entries if full.
+
+        Args:
+            key: Cache key.
+            value: Result to cache (None for "no match").
+            generation: Watchlist generation the result was computed against.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Snapshot of cache counters, size and hit ratio.
+
+        Returns:
+            Mapping of statistic name to value.
+        """
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+def get_result_cache() -> ResultCache:
+    """Get the process-wide result cache configured by RESULT_CACHE_SIZE and RESULT_CACHE_TTL.
+
+    Returns:
+        Shared ResultCache instance.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
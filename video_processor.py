@@ -0,0 +1,187 @@
+"""Module for analyzing recorded video files in parallel time segments."""
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from logging_config import get_logger
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = get_logger()
+
+RECORD_FIELDS = ("name", "age", "nationality", "crime", "danger_level")
+DEFAULT_SEGMENT_SECONDS = float(os.getenv("VIDEO_SEGMENT_SECONDS", 60))
+MIN_SEGMENT_SECONDS = 5.0
+
+def plan_segments(frame_count: int, fps: float, workers: int,
+                  segment_seconds: float = DEFAULT_SEGMENT_SECONDS) -> List[Tuple[int, Optional[int]]]:
+    """Split a video into contiguous frame ranges.
+
+    Files are cut every `segment_seconds`, and short files into one segment
+    per worker as long as each lasts at least MIN_SEGMENT_SECONDS. The last
+    segment is open-ended because container frame counts can be inexact.
+
+    Args:
+        frame_count: Reported number of frames (0 if unknown).
+        fps: Frames per second.
+        workers: Number of worker processes.
+        segment_seconds: Maximum segment length.
+
+    Returns:
+        List of (start frame, end frame or None).
+    """
+    if frame_count <= 0:
+        return [(0, None)]
+    count = max(math.ceil(frame_count / max(segment_seconds * fps, 1)),
+                min(workers, int(frame_count / (MIN_SEGMENT_SECONDS * fps)) or 1))
+    bounds = [round(i * frame_count / count) for i in range(count)]
+    return list(zip(bounds, bounds[1:] + [None]))
+
+def _init_worker(offline_mode: bool, key: bytes) -> None:
+    """Install the parent's key and warm the detector and watchlist index once per worker."""
+    from detector_registry import LIVE_FEED_DETECTOR_CONFIG, warm_up
+    from encryption import install_key
+    from face_matcher import get_matcher
+    from logging_config import configure_logging
+    configure_logging()
+    install_key(key)
+    warm_up(*LIVE_FEED_DETECTOR_CONFIG)
+    try:
+        get_matcher(offline_mode)
+    except Exception as e:
+        logger.error(f"Worker watchlist preload failed: {e}")
+
+def _analyze_segment(path: str, start: int, end: Optional[int], every_nth: int,
+                     sample_fps: Optional[float], offline_mode: bool) -> Dict:
+    """Detect and identify faces on the sampled frames of one segment inside a worker process."""
+    import cv2
+    from detector_registry import LIVE_FEED_DETECTOR_CONFIG, get_detector
+    from face_tracker import FaceTracker
+    from image_processor import identify_faces
+    from live_feed import mtcnn_box_to_location
+    from video_source import VideoSource
+
+    began = time.perf_counter()
+    detector = get_detector(*LIVE_FEED_DETECTOR_CONFIG)
+    source = VideoSource(path, every_nth, sample_fps, start_frame=start, end_frame=end)
+    if not source.isOpened():
+        raise IOError(f"Unable to open video {path}")
+    tracker = FaceTracker()
+    events, sampled = [], 0
+    try:
+        for index, timestamp, frame in source.frames():
+            sampled += 1
+            faces = detector.detect_faces(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if not faces:
+                tracker.update([])
+                continue
+            locations = [mtcnn_box_to_location(face["box"]) for face in faces]
+            tracks = tracker.update(locations, [face.get("confidence", 1.0) for face in faces])
+            # زمن الفيديو هو المرجع لإعادة التعرّف، لا زمن المعالجة
+            stale = [i for i, track in enumerate(tracks) if tracker.needs_identification(track, timestamp)]
+            if stale:
+                matches = identify_faces(frame, [locations[i] for i in stale], offline_mode)
+                for i, match in zip(stale, matches):
+                    tracker.record_identification(tracks[i], match, timestamp)
+            events.append({"source": path, "frame": index, "timestamp": round(timestamp, 3),
+                           "faces": [{"box": list(location), "confidence": round(float(track.confidence), 4),
+                                      "match": (dict(zip(RECORD_FIELDS, track.match[0]),
+                                                     distance=round(track.match[1], 4)) if track.match else None)}
+                                     for location, track in zip(locations, tracks)]})
+    finally:
+        source.release()
+    return {"start": start, "end": end, "sampled": sampled, "events": events,
+            "elapsed_ms": round((time.perf_counter() - began) * 1000, 1)}
+
+def iter_video_events(path: str, offline_mode: bool = False, workers: Optional[int] = None,
+                      every_nth: int = 1, sample_fps: Optional[float] = None,
+                      segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+                      stats: Optional[Dict] = None) -> Iterator[Dict]:
+    """Analyze a video file in parallel segments, yielding events in timestamp order.
+
+    Segments finish in any order; finished ones are held back until every
+    earlier segment has been yielded. At most two segments per worker are
+    submitted or held at a time.
+
+    Args:
+        path: Video file.
+        offline_mode: Whether to use offline database.
+        workers: Number of worker processes; defaults to the CPU count.
+        every_nth: Analyze one frame out of every N.
+        sample_fps: Analyze frames at this rate instead of `every_nth`.
+        segment_seconds: Maximum segment length.
+        stats: Optional dict receiving segment and sampled-frame counts.
+
+    Yields:
+        One event per analyzed frame with faces, ordered by timestamp.
+    """
+    from encryption import export_key
+    from video_source import VideoSource
+
+    probe = VideoSource(path)
+    if not probe.isOpened():
+        raise IOError(f"Unable to open video {path}")
+    segments = plan_segments(probe.frame_count, probe.fps, workers or os.cpu_count() or 1, segment_seconds)
+    probe.release()
+    workers = min(workers or os.cpu_count() or 1, len(segments))
+    stats = stats if stats is not None else {}
+    stats.update(segments=len(segments), sampled=0, failed_segments=0)
+    logger.info(f"Video {path}: {len(segments)} segments on {workers} workers")
+
+    context = multiprocessing.get_context("spawn")
+    pending, finished = {}, {}
+    next_submit = next_yield = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(offline_mode, export_key())) as executor:
+        while next_yield < len(segments):
+            while next_submit < len(segments) and len(pending) + len(finished) < workers * 2:
+                start, end = segments[next_submit]
+                future = executor.submit(_analyze_segment, path, start, end, every_nth, sample_fps, offline_mode)
+                pending[future] = next_submit
+                next_submit += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                position = pending.pop(future)
+                try:
+                    finished[position] = future.result()
+                except Exception as e:
+                    logger.error("Video segment %s of %s failed: %s", segments[position], path, e)
+                    stats["failed_segments"] += 1
+                    finished[position] = {"sampled": 0, "events": []}
+            while next_yield in finished:
+                result = finished.pop(next_yield)
+                stats["sampled"] += result["sampled"]
+                next_yield += 1
+                yield from result["events"]
+
+def run_video(path: str, output_path: str, offline_mode: bool = False, workers: Optional[int] = None,
+              every_nth: int = 1, sample_fps: Optional[float] = None,
+              segment_seconds: float = DEFAULT_SEGMENT_SECONDS) -> Dict:
+    """Analyze a video file and stream its events to JSONL in timestamp order.
+
+    Args:
+        path: Video file.
+        output_path: JSONL file receiving one event per frame with faces.
+        offline_mode: Whether to use offline database.
+        workers: Number of worker processes; defaults to the CPU count.
+        every_nth: Analyze one frame out of every N.
+        sample_fps: Analyze frames at this rate instead of `every_nth`.
+        segment_seconds: Maximum segment length.
+
+    Returns:
+        Summary with counts, elapsed seconds and analyzed frames per second.
+    """
+    summary = {"events": 0, "faces": 0, "matches": 0}
+    stats: Dict = {}
+    start = time.perf_counter()
+    with open(output_path, "w", encoding="utf-8") as out:
+        for event in iter_video_events(path, offline_mode, workers, every_nth, sample_fps, segment_seconds, stats):
+            out.write(json.dumps(event, ensure_ascii=False) + "\n")
+            summary["events"] += 1
+            summary["faces"] += len(event["faces"])
+            summary["matches"] += sum(face["match"] is not None for face in event["faces"])
+    summary.update(stats)
+    summary["elapsed_s"] = round(time.perf_counter() - start, 3)
+    summary["frames_per_sec"] = round(summary["sampled"] / summary["elapsed_s"], 2) if summary["elapsed_s"] else 0.0
+    return summary
@@ -0,0 +1,177 @@
+"""Module for reading frames from cameras and video files with sampling and seeking."""
+import os
+import time
+import cv2
+import numpy as np
+from logging_config import get_logger
+from typing import Iterator, Optional, Tuple, Union
+
+logger = get_logger()
+
+Source = Union[int, str]
+
+DEFAULT_VIDEO_FPS = 30.0
+DEFAULT_SEEK_GAP = int(os.getenv("VIDEO_SEEK_GAP_FRAMES", 150))
+
+class VideoSource:
+    """Camera, stream or video file read through OpenCV.
+
+    `read` behaves like cv2.VideoCapture.read, so capture loops handle every
+    kind of source the same way. On files, frames are taken by index: with
+    `sample_fps` the frame is kept whenever the sampled clock ticks, else
+    every `every_nth` frame, so a segment opened at any `start_frame` keeps
+    exactly the frames a sequential read would. Skipped frames are only
+    grabbed, not converted, and gaps of `seek_gap` frames or more are jumped
+    with a container seek (nearest keyframe, then decode to the frame).
+    """
+
+    def __init__(self, source: Source, every_nth: int = 1, sample_fps: Optional[float] = None,
+                 start_frame: int = 0, end_frame: Optional[int] = None, realtime: bool = False,
+                 seek_gap: int = DEFAULT_SEEK_GAP):
+        """Open the source.
+
+        Args:
+            source: Camera index, video file path or stream URL.
+            every_nth: Keep one frame out of every N.
+            sample_fps: Keep frames at this rate instead; overrides `every_nth`.
+            start_frame: First frame index to read (files only).
+            end_frame: Frame index to stop before (files only); None reads to the end.
+            realtime: Pace file reads to the file's frame rate, as a camera would.
+            seek_gap: Minimum skipped frames that are jumped by seeking.
+        """
+        self.source = source
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.every_nth = max(1, every_nth)
+        self.sample_fps = sample_fps
+        self.end_frame = end_frame
+        self.realtime = realtime
+        self.seek_gap = max(1, seek_gap)
+        self._cap = cv2.VideoCapture(source)
+        fps = self._cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if 0 < fps < 1000 else DEFAULT_VIDEO_FPS
+        count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT)) if self.is_file else 0
+        self.frame_count = max(count, 0)
+        self.position = 0
+        self.index = -1
+        self.seeks = 0
+        self._paced_from: Optional[Tuple[float, int]] = None
+        if start_frame > 0 and self.is_file:
+            self.seek(start_frame)
+
+    def isOpened(self) -> bool:
+        """Whether the source could be opened."""
+        return self._cap.isOpened()
+
+    def set(self, prop: int, value: float) -> bool:
+        """Set a capture property such as the camera resolution."""
+        return self._cap.set(prop, value)
+
+    @property
+    def duration(self) -> Optional[float]:
+        """File length in seconds, or None for cameras and unknown lengths."""
+        return self.frame_count / self.fps if self.frame_count else None
+
+    @property
+    def timestamp(self) -> float:
+        """Media time in seconds of the last frame returned by `read`."""
+        return self.index / self.fps
+
+    def _sampled(self, index: int) -> bool:
+        """Whether a frame index is kept by the sampling settings."""
+        if self.sample_fps and self.sample_fps < self.fps:
+            # يُؤخذ الإطار عند كل نبضة من ساعة المعاينة، فلا يتغيّر الاختيار بتغيّر نقطة البدء
+            ratio = self.sample_fps / self.fps
+            return index == 0 or int(index * ratio) != int((index - 1) * ratio)
+        return index % self.every_nth == 0
+
+    def _next_sampled(self, index: int) -> int:
+        """First kept frame index at or after `index`."""
+        if not (self.sample_fps and self.sample_fps < self.fps):
+            return -(-index // self.every_nth) * self.every_nth
+        while not self._sampled(index):
+            index += 1
+        return index
+
+    def seek(self, frame_index: int) -> None:
+        """Position the source so the next decoded frame is `frame_index`.
+
+        Uses the container's seek (nearest preceding keyframe, then decode
+        forward) and falls back to decoding frame by frame when the backend
+        cannot seek accurately.
+
+        Args:
+            frame_index: Frame to read next.
+        """
+        if (self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+                and int(self._cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_index):
+            self.position = frame_index
+            self.seeks += 1
+            return
+        logger.debug("Seek to frame %d not supported by %s, decoding instead", frame_index, self.source)
+        if frame_index < self.position or not self._cap.set(cv2.CAP_PROP_POS_FRAMES, self.position):
+            self._cap.release()
+            self._cap = cv2.VideoCapture(self.source)
+            self.position = 0
+        while self.position < frame_index and self._cap.grab():
+            self.position += 1
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Read the next kept frame.
+
+        Returns:
+            Tuple of (success, BGR frame), like cv2.VideoCapture.read.
+        """
+        if not self.is_file:
+            while True:
+                ret, frame = self._cap.read()
+                if not ret:
+                    return False, None
+                self.position += 1
+                if self._sampled(self.position - 1):
+                    self.index = self.position - 1
+                    return True, frame
+
+        target = self._next_sampled(self.position)
+        if self.end_frame is not None and target >= self.end_frame:
+            return False, None
+        if target - self.position >= self.seek_gap:
+            self.seek(target)
+        while self.position < target:
+            if not self._cap.grab():
+                return False, None
+            self.position += 1
+        ret, frame = self._cap.read()
+        if not ret:
+            return False, None
+        self.position += 1
+        self.index = target
+        if self.realtime:
+            self._pace()
+        return True, frame
+
+    def _pace(self) -> None:
+        """Sleep until the current frame is due at the file's frame rate."""
+        now = time.monotonic()
+        if self._paced_from is None:
+            self._paced_from = (now, self.index)
+            return
+        started, first = self._paced_from
+        delay = started + (self.index - first) / self.fps - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def frames(self) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """Iterate over the kept frames until the source ends.
+
+        Yields:
+            (frame index, media time in seconds, BGR frame).
+        """
+        while True:
+            ret, frame = self.read()
+            if not ret:
+                return
+            yield self.index, self.timestamp, frame
+
+    def release(self) -> None:
+        """Close the underlying capture."""
+        self._cap.release()
@@ -0,0 +1,91 @@
+"""Module for incrementally syncing the online watchlist into the offline store."""
+import os
+import time
+from datetime import datetime, timedelta
+from database_manager import (OfflineStore, decode_stored_embedding, fetch_watchlist_deletions, get_offline_store,
+                              iter_watchlist_changes)
+from face_matcher import apply_watchlist_changes
+from logging_config import get_logger
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = get_logger()
+
+SYNC_SOURCE = "wanted_individuals"
+DEFAULT_SYNC_BATCH_SIZE = int(os.getenv("WATCHLIST_SYNC_BATCH_SIZE", 1000))
+DEFAULT_SYNC_OVERLAP_SECONDS = float(os.getenv("WATCHLIST_SYNC_OVERLAP_SECONDS", 60))
+MAX_PATCH_ROWS = 10000
+
+def sync_watchlist(db: Any, store: Optional[OfflineStore] = None, full: bool = False,
+                   batch_size: int = DEFAULT_SYNC_BATCH_SIZE,
+                   overlap_seconds: float = DEFAULT_SYNC_OVERLAP_SECONDS) -> Dict:
+    """Copy watchlist rows changed since the last sync into the offline store.
+
+    Rows are selected by `updated_at` at or after the stored watermark minus
+    `overlap_seconds`, so transactions that committed late are not missed;
+    re-applying a row is harmless. The first sync, or one with `full`, copies
+    every row and removes local rows that no longer exist upstream. All
+    batches and deletions are applied in one local transaction, and the new
+    watermark is stored only if it commits. Matchers loaded in this process
+    are patched with the changed rows.
+
+    Args:
+        db: PostgreSQL connection; change tracking must be prepared with
+            `prepare_watchlist_sync`.
+        store: Offline store; defaults to the process-wide one.
+        full: Ignore the watermark and copy everything.
+        batch_size: Rows fetched and written per batch.
+        overlap_seconds: Safety margin subtracted from the watermark.
+
+    Returns:
+        Summary with upserted and deleted counts, the watermark and timing.
+    """
+    start = time.perf_counter()
+    store = store or get_offline_store()
+    watermark = None if full else store.sync_state(SYNC_SOURCE)
+    since = datetime.fromisoformat(watermark) - timedelta(seconds=overlap_seconds) if watermark else None
+    deletions = dict(fetch_watchlist_deletions(db, since)) if since is not None else {}
+    latest = [max(deletions.values())] if deletions else []
+    changes: List[tuple] = []
+    patchable = since is not None
+
+    def batches() -> Iterator[List[tuple]]:
+        nonlocal patchable
+        for rows in iter_watchlist_changes(db, since, batch_size):
+            kept = []
+            for entry_id, blob, legacy_encoding, *record, updated_at in rows:
+                if entry_id in deletions and deletions[entry_id] > updated_at:
+                    continue
+                kept.append((entry_id, bytes(blob) if blob is not None else None, legacy_encoding, *record))
+                if patchable:
+                    changes.append((entry_id, blob, legacy_encoding, tuple(record)))
+            latest.append(rows[-1][-1])
+            if len(changes) > MAX_PATCH_ROWS:
+                patchable = False
+                changes.clear()
+            yield kept
+
+    def new_watermark() -> Optional[str]:
+        return max(latest).isoformat() if latest else None
+
+    upserted, deleted = store.apply_sync(SYNC_SOURCE, batches(), list(deletions), new_watermark,
+                                         replace_all=since is None)
+
+    if upserted or deleted:
+        if patchable:
+            fresh = []
+            for entry_id, blob, legacy_encoding, record in changes:
+                try:
+                    vector, _ = decode_stored_embedding(blob, legacy_encoding)
+                except Exception as e:
+                    logger.error(f"Skipping unreadable watchlist entry {entry_id}: {e}")
+                    continue
+                if vector is not None:
+                    fresh.append((entry_id, vector, record))
+            apply_watchlist_changes(fresh, list(deletions))
+        else:
+            apply_watchlist_changes([], reload=True)
+
+    summary = {"upserted": upserted, "deleted": deleted, "full": since is None,
+               "watermark": new_watermark() or watermark, "elapsed_s": round(time.perf_counter() - start, 3)}
+    logger.info(f"Watchlist sync: {summary}")
+    return summary